@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from model import Scenario, NoSolutionError
+from solvers.registry import SOLVERS, make_solver
+
+
+def scenario_files(path):
+    if os.path.isdir(path):
+        return sorted(f for f in glob.glob(os.path.join(path, '*.yaml'))
+                      if not os.path.basename(f).startswith('_'))
+    return sorted(glob.glob(path))
+
+
+def jobs(inputs, solver, time_limit):
+    # manifest lines look like {"scenario": "path.yaml", "solver": "cpsat", "time_limit": 10},
+    # scenario paths are relative to the manifest
+    for path in inputs:
+        if path.endswith('.jsonl'):
+            with open(path) as f:
+                for line in filter(str.strip, f):
+                    job = json.loads(line)
+                    yield {'scenario': os.path.join(os.path.dirname(path), job['scenario']),
+                           'solver': job.get('solver', solver),
+                           'time_limit': job.get('time_limit', time_limit)}
+        else:
+            for scenario in scenario_files(path):
+                yield {'scenario': scenario, 'solver': solver, 'time_limit': time_limit}
+
+
+def run(job, seed, workers, cache):
+    random.seed(seed)
+    result = job | {'status': 'solved', 'cost': None, 'mapping': None}
+    start = time.perf_counter()
+
+    try:
+        with open(job['scenario'], 'rb') as f:
+            scenario = Scenario(f, cache)
+
+        solver = make_solver(job['solver'], scenario, job['time_limit'], workers)
+        solver.solve()
+
+        result |= solver.solution().to_dict()
+    except NoSolutionError:
+        result['status'] = 'no_solution'
+    except Exception as e:
+        logging.exception(f'Failed to solve scenario "{job["scenario"]}"')
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    result['runtime'] = time.perf_counter() - start
+    return result
+
+
+def results(jobs, processes, *args):
+    # results as they are ready; a worker that crashes breaks the whole pool, so the jobs that were
+    # running are solved again one by one in pools of their own to tell which one crashed
+    jobs = iter(jobs)
+    pool = ProcessPoolExecutor(processes)
+    running = {}
+
+    try:
+        while True:
+            while len(running) < processes and (job := next(jobs, None)) is not None:
+                running[pool.submit(run, job, *args)] = job
+            if not running:
+                return
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if not any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                for future in done:
+                    yield future.result()
+                    del running[future]
+                continue
+
+            logging.error('A worker process crashed, solving the jobs it may have been running one by one')
+            wait(running)
+            suspects = []
+            for future, job in running.items():
+                if future.exception() is None:
+                    yield future.result()
+                else:
+                    suspects.append(job)
+            running.clear()
+
+            pool.shutdown()
+            pool = ProcessPoolExecutor(processes)
+            for job in suspects:
+                yield isolated(job, *args)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def isolated(job, *args):
+    with ProcessPoolExecutor(1) as pool:
+        try:
+            return pool.submit(run, job, *args).result()
+        except BrokenProcessPool:
+            logging.error(f'Worker process crashed solving scenario "{job["scenario"]}"')
+            return job | {'status': 'error', 'cost': None, 'mapping': None, 'error': 'worker process crashed'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve many node-container placements in parallel.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('-o', '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='output JSONL file')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='random number generator seed used for every scenario')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='number of scenarios solved in parallel')
+    parser.add_argument('--solver',
+                        choices=tuple(SOLVERS),
+                        default='cpsat-agg',
+                        help='default name of the solver')
+    parser.add_argument('--time-limit',
+                        type=float,
+                        help='default wall-clock limit per scenario in seconds')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='number of parallel search workers per scenario')
+    parser.add_argument('--cache',
+                        metavar='DIR',
+                        help='directory for compiled scenarios, reused across runs')
+    parser.add_argument('inputs',
+                        nargs='+',
+                        help='scenario directories, glob patterns or JSONL manifests')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    for result in results(jobs(args.inputs, args.solver, args.time_limit), args.jobs,
+                          args.seed, args.workers, args.cache):
+        print(json.dumps(result), file=args.output, flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import glob
+import io
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+import yaml
+
+from itertools import product
+from multiprocessing import Pipe, Process
+
+import generate_scenario
+
+from model import Scenario, NoSolutionError
+from solvers.registry import SOLVERS, make_solver
+
+
+FIELDS = ('solver', 'scenario', 'status', 'cost', 'objective', 'wall_time', 'solve_time', 'peak_rss_kib',
+          'variables', 'constraints', 'evaluations', 'evaluations_per_second', 'history')
+
+
+def sweep(spec, seed):
+    # spec looks like ['micros=5,10', 'containers=4', 'nodes=15,40', 'zones=1,3']
+    axes = dict(micros=[5], containers=[4], nodes=[15], zones=[3])
+    for axis in spec:
+        name, values = axis.split('=')
+        axes[name] = [int(v) for v in values.split(',')]
+
+    for m, c, n, z in product(axes['micros'], axes['containers'], axes['nodes'], axes['zones']):
+        # petname draws from the system entropy pool, so generated scenarios use indexed names
+        random.seed(seed)
+        m_names = [f'micro-{i}' for i in range(m)]
+        n_names = [f'node-{i}' for i in range(n)]
+        scenario = generate_scenario.scenario(m_names, c, c, False, 1, 10, n_names, z)
+        yield f'gen-m{m}c{c}n{n}z{z}', yaml.dump(scenario)
+
+
+def shipped(directory):
+    for path in sorted(glob.glob(os.path.join(directory, '*.yaml'))):
+        if not os.path.basename(path).startswith('_'):
+            with open(path) as f:
+                yield os.path.basename(path).removesuffix('.yaml'), f.read()
+
+
+def run(connection, solver_name, name, text, seed, time_limit):
+    random.seed(seed)
+    result = {'solver': solver_name, 'scenario': name, 'status': 'solved'}
+
+    try:
+        start = time.perf_counter()
+        scenario = Scenario(io.StringIO(text))
+        solver = make_solver(solver_name, scenario, time_limit)
+
+        solve_start = time.perf_counter()
+        solver.solve()
+        result['solve_time'] = time.perf_counter() - solve_start
+
+        try:
+            solution = solver.solution()
+            result['cost'] = solution.cost
+            result['objective'] = solution.objective
+        except NoSolutionError:
+            result['status'] = 'no_solution'
+        result['wall_time'] = time.perf_counter() - start
+
+        result['peak_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if hasattr(solver, 'model'):
+            result['variables'] = len(solver.model.Proto().variables)
+            result['constraints'] = len(solver.model.Proto().constraints)
+
+        if hasattr(solver, 'evaluations'):
+            result['evaluations'] = solver.evaluations
+            result['evaluations_per_second'] = solver.evaluations / result['solve_time']
+
+        result['history'] = solver.history
+    except Exception as e:
+        logging.exception(f'Solver "{solver_name}" failed on scenario "{name}"')
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    connection.send(result)
+
+
+def measure(solver_name, name, text, seed, time_limit, timeout):
+    # every run gets a fresh process so that peak RSS and imports do not leak between runs
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=run, args=(sender, solver_name, name, text, seed, time_limit))
+    process.start()
+
+    if receiver.poll(timeout):
+        result = receiver.recv()
+    else:
+        process.terminate()
+        result = {'solver': solver_name, 'scenario': name, 'status': 'timeout', 'wall_time': timeout}
+
+    process.join()
+    return result
+
+
+def compare(results, baseline, time_tolerance, cost_tolerance):
+    base = {(r['solver'], r['scenario']): r for r in baseline}
+    regressions = []
+
+    for r in results:
+        b = base.get((r['solver'], r['scenario']))
+        if b is None:
+            continue
+
+        if b['status'] == 'solved' and r['status'] != 'solved':
+            regressions.append(f'{r["solver"]} on {r["scenario"]}: {b["status"]} -> {r["status"]}')
+            continue
+        if r['status'] != 'solved' or b['status'] != 'solved':
+            continue
+
+        if r['cost'] > b['cost'] * (1 + cost_tolerance) + 1e-9:
+            regressions.append(f'{r["solver"]} on {r["scenario"]}: cost {b["cost"]:.2f} -> {r["cost"]:.2f}')
+        if r['wall_time'] > b['wall_time'] * (1 + time_tolerance):
+            regressions.append(f'{r["solver"]} on {r["scenario"]}: '
+                               f'time {b["wall_time"]:.2f}s -> {r["wall_time"]:.2f}s')
+
+    return regressions
+
+
+def write(results, output, fmt):
+    if fmt == 'json':
+        json.dump(results, output, indent=2)
+        print(file=output)
+        return
+
+    writer = csv.DictWriter(output, FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for r in results:
+        writer.writerow(r | {'history': json.dumps(r.get('history', []))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark node-container placement solvers.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('-o', '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='report file')
+    parser.add_argument('--format',
+                        choices=('json', 'csv'),
+                        default='json',
+                        help='report format')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='random number generator seed')
+    parser.add_argument('-s', '--solvers',
+                        nargs='+',
+                        choices=tuple(SOLVERS),
+                        default=tuple(SOLVERS),
+                        help='solvers to benchmark')
+    parser.add_argument('--scenarios',
+                        default='scenarios',
+                        help='directory with shipped scenarios, empty to skip them')
+    parser.add_argument('--sweep',
+                        nargs='*',
+                        help='generated scenario grid, e.g. micros=5,10 containers=4 nodes=15,40 zones=1,3')
+    parser.add_argument('--time-limit',
+                        type=float,
+                        default=60,
+                        help='wall-clock limit for the search in seconds')
+    parser.add_argument('--timeout',
+                        type=float,
+                        default=600,
+                        help='hard limit for a single run in seconds')
+    parser.add_argument('--baseline',
+                        type=argparse.FileType('r'),
+                        help='JSON report to compare against')
+    parser.add_argument('--time-tolerance',
+                        type=float,
+                        default=0.25,
+                        help='allowed relative wall time increase over the baseline')
+    parser.add_argument('--cost-tolerance',
+                        type=float,
+                        default=0.01,
+                        help='allowed relative cost increase over the baseline')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    scenarios = list(shipped(args.scenarios)) if args.scenarios else []
+    if args.sweep is not None:
+        scenarios += list(sweep(args.sweep, args.seed))
+
+    results = []
+    for (name, text), solver_name in product(scenarios, args.solvers):
+        result = measure(solver_name, name, text, args.seed, args.time_limit, args.timeout)
+        logging.info(f'{solver_name} on {name}: {result["status"]}, cost {result.get("cost")}, '
+                     f'{result.get("wall_time", 0):.2f}s')
+        results.append(result)
+
+    write(results, args.output, args.format)
+
+    if args.baseline:
+        regressions = compare(results, json.load(args.baseline), args.time_tolerance, args.cost_tolerance)
+        for regression in regressions:
+            logging.error(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
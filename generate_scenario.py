@@ -1,9 +1,23 @@
 #!/usr/bin/env python3
 import argparse
+import itertools
 import petname
 import random
+import sys
+import textwrap
 import yaml
 
+from model.compiled import CompiledScenario
+from model.microservice import Microservice
+from model.node import Node
+
+
+Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+# pet name words limited to six letters, like petname.Generate does by default
+ADJECTIVES = [w for w in petname.adjectives if len(w) <= 6]
+NAMES = [w for w in petname.names if len(w) <= 6]
 
 zones = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta', 'iota',
          'kappa', 'lambda', 'mu', 'nu', 'xi', 'omicron', 'pi', 'rho', 'sigma', 'tau',
@@ -20,15 +34,51 @@ def microservice(min, max):
             'containers': containers}
 
 
-def datarate(microservice_list, no_data, min, max):
+def datarate(microservice_list, no_data, min, max, graph='tree', fanout=3, density=0.05):
     if no_data:
         return {}
 
-    length = int(len(microservice_list) * random.uniform(0.6, 0.8))
-    micros = random.sample(microservice_list, length)
-    tree = Tree(micros)
+    if graph == 'tree':
+        length = int(len(microservice_list) * random.uniform(0.6, 0.8))
+        micros = random.sample(microservice_list, length)
+        tree = Tree(micros)
+
+        return tree.dict(min, max)
+
+    edges = {'fanout': fanout_edges, 'density': density_edges, 'powerlaw': powerlaw_edges}[graph]
+    rates = {}
+    for p, c in edges(microservice_list, fanout, density):
+        rates.setdefault(p, {})[c] = round(random.uniform(min, max), 2)
+
+    return rates
+
+
+def fanout_edges(micros, fanout, density):
+    # every microservice sends data to a fixed number of microservices further down the list
+    for i, p in enumerate(micros):
+        for c in random.sample(micros[i + 1:], min(fanout, len(micros) - i - 1)):
+            yield p, c
 
-    return tree.dict(min, max)
+
+def density_edges(micros, fanout, density):
+    # every ordered pair of microservices communicates with the given probability
+    for p, c in itertools.permutations(micros, 2):
+        if random.random() < density:
+            yield p, c
+
+
+def powerlaw_edges(micros, fanout, density):
+    # preferential attachment: new microservices consume data of already well-connected ones
+    degrees = micros[:1]
+    for i, c in enumerate(micros[1:], 1):
+        producers = []
+        while len(producers) < min(fanout, i):
+            p = random.choice(degrees)
+            if p not in producers:
+                producers.append(p)
+        for p in producers:
+            yield p, c
+        degrees += producers + [c]
 
 
 def node(zone_num):
@@ -46,12 +96,67 @@ def node(zone_num):
             'zone': zone}
 
 
+def scenario(m_names, minc, maxc, no_data, mind, maxd, n_names, zones):
+    microservices = {'microservices': {m: microservice(minc, maxc)
+                                       for m in m_names}}
+    nodes = {'nodes': {n: node(zones) for n in n_names}}
+    data = {'datarate': datarate(m_names, no_data, mind, maxd)}
+    data_cost = {'data_cost': {'intrazone': 0.01, 'interzone': 0.02}}
+
+    return microservices | data | nodes | data_cost
+
+
+def unique_names(prefix, words, count, indexed=False):
+    # petname has only a few hundred words, repeated names get a numeric suffix
+    seen = {}
+    for i in range(count):
+        if indexed:
+            yield f'{prefix}-{i}'
+            continue
+
+        name = '-'.join([random.choice(ADJECTIVES) for _ in range(words - 1)] + [random.choice(NAMES)])
+        seen[name] = seen.get(name, 0) + 1
+        yield name if seen[name] == 1 else f'{name}-{seen[name]}'
+
+
+def sections(m_names, minc, maxc, no_data, mind, maxd, n_names, zones, graph, fanout, density):
+    # same draws in the same order as scenario(), but entries are produced lazily,
+    # so the nodes come before the datarate in the output too
+    yield 'microservices', ((m, microservice(minc, maxc)) for m in m_names)
+    yield 'nodes', ((n, node(zones)) for n in n_names)
+    yield 'datarate', datarate(m_names, no_data, mind, maxd, graph, fanout, density).items()
+    yield 'data_cost', {'intrazone': 0.01, 'interzone': 0.02}.items()
+
+
+def write_yaml(file, sections):
+    for section, entries in sections:
+        entries = iter(entries)
+        first = next(entries, None)
+        if first is None:
+            file.write(f'{section}: {{}}\n')
+            continue
+
+        file.write(f'{section}:\n')
+        for name, value in itertools.chain([first], entries):
+            file.write(textwrap.indent(yaml.dump({name: value}, Dumper=Dumper), '  '))
+
+
+def write_compiled(file, sections):
+    scenario = {section: dict(entries) for section, entries in sections}
+
+    micros = tuple(Microservice(m, **micro) for m, micro in scenario['microservices'].items())
+    nodes = tuple(Node(n, **node) for n, node in scenario['nodes'].items())
+
+    CompiledScenario(micros, nodes, scenario['datarate'],
+                     scenario['data_cost']['intrazone'], scenario['data_cost']['interzone']).save(file)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate scenario for node-container placement.')
     parser.add_argument('-m', '--micros',
-                        type=int, default=random.randint(20, 40),
-                        help='number of microservices to generate')
+                        type=int,
+                        help='number of microservices to generate (default: random from 20 to 40)')
     parser.add_argument('--minc', '--min-containers',
                         type=int, default=1,
                         help='minimum number of containers in microservice')
@@ -67,26 +172,54 @@ def main():
     parser.add_argument('--maxd', '--max-datarate',
                         type=int, default=10,
                         help='maximum amount of data moved between two microservices')
+    parser.add_argument('--graph',
+                        choices=('tree', 'fanout', 'density', 'powerlaw'),
+                        default='tree',
+                        help='shape of the communication graph')
+    parser.add_argument('--fanout',
+                        type=int, default=3,
+                        help='consumers per microservice (fanout) or producers per new microservice (powerlaw)')
+    parser.add_argument('--density',
+                        type=float, default=0.05,
+                        help='probability that two microservices communicate (density)')
     parser.add_argument('-n', '--nodes',
-                        type=int, default=random.randint(50, 150),
-                        help='number of nodes to generate')
+                        type=int,
+                        help='number of nodes to generate (default: random from 50 to 150)')
     parser.add_argument('-z',  '--zones',
                         type=int, default=3,
                         help = 'maximum number of zones to use')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='random number generator seed, the same seed gives the same scenario')
+    parser.add_argument('--indexed-names',
+                        action='store_true',
+                        help='name entities micro-0, node-0, ... instead of random pet names')
+    parser.add_argument('--format',
+                        choices=('yaml', 'compiled'),
+                        default='yaml',
+                        help='output format, compiled scenarios are NumPy archives')
+    parser.add_argument('-o', '--output',
+                        help='output file (default: standard output)')
     args = parser.parse_args()
 
-    m_names = [petname.Generate(2) for _ in range(args.micros)]
-    n_names = [petname.Generate(1) for _ in range(args.nodes)]
+    random.seed(args.seed)
 
-    microservices = {'microservices': {m: microservice(args.minc, args.maxc)
-                                       for m in m_names}}
-    nodes = {'nodes': {n: node(args.zones) for n in n_names}}
-    data = {'datarate': datarate(m_names, args.no_data, args.mind, args.maxd)}
-    data_cost = {'data_cost': {'intrazone': 0.01, 'interzone': 0.02}}
+    micros = args.micros if args.micros is not None else random.randint(20, 40)
+    nodes = args.nodes if args.nodes is not None else random.randint(50, 150)
+
+    # all names are drawn before the entities, as for scenario(), so the same seed gives the same scenario
+    m_names = list(unique_names('micro', 2, micros, args.indexed_names))
+    n_names = list(unique_names('node', 1, nodes, args.indexed_names))
 
-    scenario = microservices | data | nodes | data_cost
+    scenario = sections(m_names, args.minc, args.maxc, args.no_data, args.mind, args.maxd,
+                        n_names, args.zones, args.graph, args.fanout, args.density)
 
-    print(yaml.dump(scenario))
+    if args.format == 'compiled':
+        with open(args.output, 'wb') if args.output else sys.stdout.buffer as f:
+            write_compiled(f, scenario)
+    else:
+        with open(args.output, 'w') if args.output else sys.stdout as f:
+            write_yaml(f, scenario)
 
 
 class Tree:
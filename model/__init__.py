@@ -1,2 +1,5 @@
 from model.scenario import Scenario
 from model.solver import NoSolutionError
+from model.trace import tracer
+from model.tracker import PlacementTracker
+from model.memo import ObjectiveCache
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def node_bound(sc):
+    # cheapest fractional cover of the CPU, memory and container demand, each resource on its own
+    demand = (sc.containers @ sc.cpureq, sc.containers @ sc.memreq, sc.containers.sum())
+    bound = 0.0
+
+    for need, limits in zip(demand, (sc.cpulim, sc.memlim, sc.contlim)):
+        if need <= 0:
+            continue
+        order = np.argsort(sc.cost / np.maximum(limits, 1e-12), kind='stable')
+        covered = np.cumsum(limits[order])
+        last = int(np.searchsorted(covered, need))
+        if last == len(order):
+            return float('inf')
+        full = sc.cost[order[:last]].sum()
+        rest = (need - (covered[last - 1] if last else 0)) / limits[order[last]]
+        bound = max(bound, float(full + rest * sc.cost[order[last]]))
+
+    # at least one node is paid for, and it has to host the largest container
+    fits = (sc.cpulim >= sc.cpureq.max(initial=0)) & (sc.memlim >= sc.memreq.max(initial=0))
+    if sc.containers.sum():
+        bound = max(bound, float(sc.cost[fits].min(initial=np.inf)))
+
+    return bound
+
+
+def data_bound(sc):
+    # co-located microservices communicate for free, only those too large for any node
+    # must send some of their traffic to another node
+    spread = (sc.containers > sc.contlim.max(initial=0)) | \
+             (sc.containers * sc.cpureq > sc.cpulim.max(initial=0)) | \
+             (sc.containers * sc.memreq > sc.memlim.max(initial=0))
+
+    rate = sum(r for p, c, r in sc.edges if spread[p] or spread[c])
+    return float(rate * min(sc.intrazone, sc.interzone))
+
+
+def lower_bound(scenario):
+    # no placement of the scenario costs less, the bound is infinite when demand exceeds all nodes
+    sc = scenario.compiled
+    return node_bound(sc) + data_bound(sc)
+
+
+def gap(cost, bound):
+    # relative distance of a cost to the lower bound, as reported by CP-SAT
+    if bound is None or cost == float('inf'):
+        return None
+    return max(cost - bound, 0) / max(abs(cost), 1e-9)
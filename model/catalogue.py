@@ -0,0 +1,151 @@
+import json
+import logging
+import mmap
+import os
+import tempfile
+import yaml
+
+import numpy as np
+
+
+# first bytes of a compiled catalogue, followed by the header length, a JSON header and the arrays
+MAGIC = b'PLCAT\x00\x01\x00'
+
+# array offsets are aligned for vectorized loads
+ALIGNMENT = 64
+
+# catalogues attached by this process, shared by all of its scenarios
+_attached = {}
+
+
+class Catalogue:
+    # node set shared by many scenarios, compiled once into a file of contiguous arrays that
+    # processes map into memory instead of each parsing and allocating its own copy
+    def __init__(self, header, buffer, start=0):
+        self.path = header['path']
+        self.source = header.get('source')  # YAML the catalogue was compiled from
+        self.node_names = tuple(header['nodes'])
+        self.zone_names = tuple(header['zones'])
+        self.node_index = {n: k for k, n in enumerate(self.node_names)}
+        self.intrazone = header['intrazone']
+        self.interzone = header['interzone']
+
+        self._buffer = buffer  # keeps the mapping open as long as the arrays live
+        for name, (offset, dtype, shape) in header['arrays'].items():
+            array = np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)), offset=start + offset)
+            array = array.reshape(shape)
+            setattr(self, name, array)
+
+        self.node_classes = tuple(tuple(np.flatnonzero(self.node_class == c).tolist())
+                                  for c in range(int(self.node_class.max(initial=-1)) + 1))
+
+    def __reduce__(self):
+        # the mapping cannot be pickled, processes that receive a catalogue attach its file themselves
+        return Catalogue.attach, (self.path,)
+
+    @classmethod
+    def attach(cls, path):
+        # compiled catalogues are mapped as they are, YAML ones are compiled next to them first;
+        # either is compiled again when its YAML changed since
+        path = os.path.abspath(path)
+        catalogue = _attached.get(path)
+        if catalogue is not None and not stale(catalogue.source, catalogue.path):
+            return catalogue
+
+        with open(path, 'rb') as f:
+            compiled = f.read(len(MAGIC)) == MAGIC
+            source = header_of(f).get('source') if compiled else path
+        target = path if compiled else os.path.splitext(path)[0] + '.catalogue'
+
+        if source is not None and stale(source, target):
+            try:
+                compile_catalogue(source, target)
+            except OSError as e:
+                logging.warning(f'Failed to write compiled catalogue "{target}", keeping it in memory: {e}')
+                _attached[path] = cls(*layout(source, source))
+                return _attached[path]
+
+        with open(target, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+        header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        header['path'] = target
+
+        _attached[path] = cls(header, buffer, aligned(len(MAGIC) + 8 + length))
+        logging.debug(f'Attached catalogue "{target}" with {len(header["nodes"])} nodes')
+        return _attached[path]
+
+
+def header_of(f):
+    # JSON header of a compiled catalogue, read after its magic bytes
+    length = int.from_bytes(f.read(8), 'little')
+    return json.loads(f.read(length))
+
+
+def stale(source, target):
+    # a compiled catalogue is out of date when it is missing or older than the YAML it was compiled from
+    if source is None or source == target or not os.path.exists(source):
+        return False
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def layout(source, path):
+    # header and contiguous buffer of a YAML catalogue: node limits, costs, zones, classes and transfer costs
+    with open(source) as f:
+        data = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    nodes = data['nodes']
+    if 'data_cost' not in data:
+        raise ValueError(f'Catalogue "{source}" has no data_cost')
+
+    names = list(nodes)
+    zones = list(dict.fromkeys(node['zone'] for node in nodes.values()))
+    zone = np.array([zones.index(node['zone']) for node in nodes.values()], dtype=np.int64)
+    intrazone, interzone = data['data_cost']['intrazone'], data['data_cost']['interzone']
+
+    transfer = np.where(zone[:, None] == zone[None, :], intrazone, interzone).astype(float)
+    np.fill_diagonal(transfer, 0)
+
+    arrays = {
+        'cpulim': np.array([node['cpulim'] for node in nodes.values()], dtype=np.int64),
+        'memlim': np.array([node['memlim'] for node in nodes.values()], dtype=np.int64),
+        'contlim': np.array([node['contlim'] for node in nodes.values()], dtype=np.int64),
+        'cost': np.array([node['cost'] for node in nodes.values()], dtype=float),
+        'zone': zone,
+        'transfer': transfer
+    }
+
+    # interchangeable nodes, numbered in the order of their first node as in CompiledScenario.classify
+    rows = np.stack([arrays['cost'], arrays['cpulim'], arrays['memlim'], arrays['contlim'], zone], axis=1)
+    _, first, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+    arrays['node_class'] = np.argsort(np.argsort(first))[inverse.reshape(-1)].astype(np.int64)
+
+    offset, offsets = 0, {}
+    for name, array in arrays.items():
+        offset = aligned(offset)
+        offsets[name] = (offset, array.dtype.str, list(array.shape))
+        offset += array.nbytes
+
+    buffer = bytearray(offset)
+    for name, array in arrays.items():
+        start = offsets[name][0]
+        buffer[start:start + array.nbytes] = array.tobytes()
+
+    header = {'path': path, 'source': os.path.abspath(source), 'nodes': names, 'zones': zones, 'intrazone': intrazone, 'interzone': interzone,
+              'arrays': offsets}
+    return header, bytes(buffer)
+
+
+def compile_catalogue(source, target):
+    header, buffer = layout(source, target)
+    text = json.dumps(header).encode()
+    padding = b'\0' * (aligned(len(MAGIC) + 8 + len(text)) - len(MAGIC) - 8 - len(text))
+
+    # written under a temporary name first, so concurrent workers never map a partial file
+    directory = os.path.dirname(os.path.abspath(target))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.catalogue', delete=False) as f:
+        f.write(MAGIC + len(text).to_bytes(8, 'little') + text + padding + buffer)
+    os.replace(f.name, target)
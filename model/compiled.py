@@ -0,0 +1,222 @@
+import hashlib
+
+import numpy as np
+
+from model.catalogue import Catalogue
+
+
+# bump whenever the saved arrays change, old cache entries are ignored then
+FORMAT_VERSION = 2
+
+
+class CompiledScenario:
+    __slots__ = ('micro_names', 'node_names', 'zone_names', 'micro_index', 'node_index',
+                 'cpureq', 'memreq', 'containers', 'cont_micro',
+                 'cpulim', 'memlim', 'contlim', 'cost', 'zone',
+                 'edges', 'datarate', 'intrazone', 'interzone', '_transfer',
+                 'node_class', 'node_classes', 'catalogue')
+
+    def __init__(self, micros, nodes, datarate, intrazone, interzone, catalogue=None):
+        # with a catalogue the node arrays are views of it and nodes are not read
+        def frozen(values, dtype):
+            array = np.array(values, dtype=dtype)
+            array.flags.writeable = False
+            return array
+
+        self.micro_names = tuple(m.name for m in micros)
+        self.micro_index = {m: i for i, m in enumerate(self.micro_names)}
+
+        self.cpureq = frozen([m.cpureq for m in micros], np.int64)
+        self.memreq = frozen([m.memreq for m in micros], np.int64)
+        self.containers = frozen([m.containers for m in micros], np.int64)
+        self.cont_micro = frozen(np.repeat(np.arange(len(micros)), self.containers), np.int64)
+
+        # (producer, consumer, rate) triples of the sparse communication graph
+        self.edges = tuple((self.micro_index[p], self.micro_index[c], rate)
+                           for p in datarate for c, rate in datarate[p].items()
+                           if rate and p in self.micro_index and c in self.micro_index)
+
+        rates = np.zeros((len(micros), len(micros)))
+        for p, c, rate in self.edges:
+            rates[p, c] = rate
+        self.datarate = frozen(rates, float)
+
+        self.intrazone = intrazone
+        self.interzone = interzone
+
+        if catalogue is not None:
+            self.attach(catalogue)
+            return
+
+        self.catalogue = None
+        self.node_names = tuple(n.name for n in nodes)
+        self.zone_names = tuple(dict.fromkeys(n.zone for n in nodes))
+        self.node_index = {n: k for k, n in enumerate(self.node_names)}
+        zone_index = {z: i for i, z in enumerate(self.zone_names)}
+
+        self.cpulim = frozen([n.cpulim for n in nodes], np.int64)
+        self.memlim = frozen([n.memlim for n in nodes], np.int64)
+        self.contlim = frozen([n.contlim for n in nodes], np.int64)
+        self.cost = frozen([n.cost for n in nodes], float)
+        self.zone = frozen([zone_index[n.zone] for n in nodes], np.int64)
+        self._transfer = None
+
+        self.classify()
+
+    def attach(self, catalogue):
+        # node arrays, classes and the transfer matrix are shared with every scenario of the catalogue
+        self.catalogue = catalogue
+        for name in ('node_names', 'zone_names', 'node_index', 'cpulim', 'memlim', 'contlim', 'cost', 'zone',
+                     'node_class', 'node_classes'):
+            setattr(self, name, getattr(catalogue, name))
+        self._transfer = catalogue.transfer
+
+    def save(self, file):
+        # scenarios on a catalogue refer to its file instead of copying the nodes
+        nodes = {'catalogue': np.array(self.catalogue.path)} if self.catalogue is not None else {
+            'node_names': np.array(self.node_names, dtype=str),
+            'zone_names': np.array(self.zone_names, dtype=str),
+            'cpulim': self.cpulim, 'memlim': self.memlim, 'contlim': self.contlim,
+            'cost': self.cost, 'zone': self.zone}
+        p, c, rate = zip(*self.edges) if self.edges else ((), (), ())
+        np.savez(file,
+                 version=FORMAT_VERSION,
+                 micro_names=np.array(self.micro_names, dtype=str),
+                 cpureq=self.cpureq, memreq=self.memreq, containers=self.containers,
+                 **nodes,
+                 edge_producer=np.array(p, dtype=np.int64),
+                 edge_consumer=np.array(c, dtype=np.int64),
+                 edge_rate=np.array(rate, dtype=float),
+                 data_cost=np.array([self.intrazone, self.interzone], dtype=float))
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file, allow_pickle=False) as data:
+            if data['version'] != FORMAT_VERSION:
+                raise ValueError(f'Unsupported compiled scenario version {data["version"]}')
+            arrays = {name: data[name] for name in data.files}
+
+        self = cls.__new__(cls)
+        for name in ('cpureq', 'memreq', 'containers'):
+            arrays[name].flags.writeable = False
+            setattr(self, name, arrays[name])
+
+        self.micro_names = tuple(arrays['micro_names'].tolist())
+        self.micro_index = {m: i for i, m in enumerate(self.micro_names)}
+
+        self.cont_micro = np.repeat(np.arange(len(self.micro_names)), self.containers)
+        self.cont_micro.flags.writeable = False
+
+        self.edges = tuple(zip(arrays['edge_producer'].tolist(), arrays['edge_consumer'].tolist(),
+                               arrays['edge_rate'].tolist()))
+
+        rates = np.zeros((len(self.micro_names), len(self.micro_names)))
+        for p, c, rate in self.edges:
+            rates[p, c] = rate
+        rates.flags.writeable = False
+        self.datarate = rates
+
+        self.intrazone, self.interzone = arrays['data_cost'].tolist()
+
+        if 'catalogue' in arrays:
+            self.attach(Catalogue.attach(str(arrays['catalogue'])))
+            return self
+
+        self.catalogue = None
+        for name in ('cpulim', 'memlim', 'contlim', 'cost', 'zone'):
+            arrays[name].flags.writeable = False
+            setattr(self, name, arrays[name])
+        self.node_names = tuple(arrays['node_names'].tolist())
+        self.zone_names = tuple(arrays['zone_names'].tolist())
+        self.node_index = {n: k for k, n in enumerate(self.node_names)}
+        self._transfer = None
+
+        self.classify()
+
+        return self
+
+    def classify(self):
+        # nodes with the same cost, limits and zone are interchangeable in any placement
+        rows = np.stack([self.cost, self.cpulim, self.memlim, self.contlim, self.zone], axis=1)
+        _, first, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+
+        # classes are numbered in the order of their first node
+        order = np.argsort(np.argsort(first))
+        self.node_class = order[inverse.reshape(-1)]
+        self.node_class.flags.writeable = False
+        self.node_classes = tuple(tuple(np.flatnonzero(self.node_class == c).tolist()) for c in range(len(first)))
+
+    def fingerprint(self):
+        # digest of everything the cost of a placement depends on
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.cpureq, self.memreq, self.containers, self.cpulim, self.memlim, self.contlim,
+                      self.cost, self.zone, self.datarate, np.array([self.intrazone, self.interzone], dtype=float)):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.digest()
+
+    @property
+    def transfer(self):
+        # dense node x node data cost matrix, built on first use as it is quadratic in nodes
+        if self._transfer is None:
+            self._transfer = self.transfer_between(np.arange(len(self.node_names)))
+        return self._transfer
+
+    def transfer_between(self, nodes):
+        zones = self.zone[nodes]
+        transfer = np.where(zones[:, None] == zones[None, :], self.intrazone, self.interzone)
+        np.fill_diagonal(transfer, 0)
+        transfer.flags.writeable = False
+        return transfer
+
+    def max_cost(self):
+        # cost of every node hosting every microservice, an upper bound for any placement
+        nodes_per_zone = np.bincount(self.zone)
+        same_zone = np.sum(nodes_per_zone ** 2) - len(self.node_names)
+        other_zone = len(self.node_names) ** 2 - np.sum(nodes_per_zone ** 2)
+        transfer = self.intrazone * same_zone + self.interzone * other_zone
+
+        return float(self.cost.sum() + self.datarate.sum() * transfer)
+
+    def counts(self, mapping):
+        counts = np.zeros((len(self.node_names), len(self.micro_names)), dtype=np.int64)
+        for n in mapping:
+            for m, num in mapping[n].items():
+                counts[self.node_index[n], self.micro_index[m]] += num
+        return counts
+
+    def cost_of(self, counts):
+        return sum(self.cost_breakdown(counts))
+
+    def cost_breakdown(self, counts):
+        # infrastructure and data transfer cost of a node x microservice container count matrix
+        used = np.flatnonzero(counts.any(axis=1))
+        present = (counts[used] > 0).astype(float)
+
+        infra_cost = self.cost[used].sum()
+        data_cost = np.sum((present @ self.datarate) * (self.transfer_between(used) @ present))
+
+        return float(infra_cost), float(data_cost)
+
+    def usage(self, counts):
+        # CPU, memory and containers taken on every node
+        return counts @ self.cpureq, counts @ self.memreq, counts.sum(axis=1)
+
+    def violations(self, counts):
+        # every way a container count matrix breaks the scenario, empty for a valid placement
+        problems = []
+
+        if (counts < 0).any():
+            problems.append('negative container counts')
+
+        placed = counts.sum(axis=0)
+        for i in np.flatnonzero(placed != self.containers).tolist():
+            problems.append(f'microservice "{self.micro_names[i]}" has {placed[i]} containers '
+                            f'instead of {self.containers[i]}')
+
+        for resource, used, limits in zip(('CPU', 'memory', 'containers'), self.usage(counts),
+                                          (self.cpulim, self.memlim, self.contlim)):
+            for k in np.flatnonzero(used > limits).tolist():
+                problems.append(f'node "{self.node_names[k]}" exceeds its {resource} limit: '
+                                f'{used[k]} > {limits[k]}')
+
+        return problems
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+
+import numpy as np
+
+
+KEY_SIZE = 16
+
+
+class ObjectiveCache:
+    def __init__(self, scenario, maxsize=2 ** 15):
+        sc = scenario.compiled
+
+        self.maxsize = maxsize
+        self.fingerprint = sc.fingerprint()
+        self.hits, self.misses = 0, 0
+
+        # key -> (violation, cost), least recently used first; a plain dict pickles fast,
+        # which matters as caches travel to worker processes with PSO islands
+        self.__entries = {}
+        self.__fresh = []  # keys computed here and not yet merged into another cache
+
+        # rows are sorted by node class and then by content, so that permutations of
+        # interchangeable nodes share a key
+        self.__classes = sc.node_class if len(sc.node_classes) < len(sc.node_names) else None
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def key(self, counts):
+        if self.__classes is not None:
+            counts = counts[np.lexsort((*counts.T[::-1], self.__classes))]
+        return hashlib.blake2b(counts.tobytes(), digest_size=KEY_SIZE).digest()
+
+    def get(self, key):
+        value = self.__entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.__entries[key] = value
+        return value
+
+    def put(self, key, value):
+        self.__fresh.append(key)
+        self.__store(key, value)
+
+    def add(self, entries):
+        # entries computed elsewhere, they are not passed on by merge()
+        for key, value in entries.items():
+            self.__store(key, value)
+
+    def merge(self, other):
+        # takes over the entries and statistics the other cache gathered since its last merge,
+        # returns the new entries
+        if other.fingerprint != self.fingerprint:
+            raise ValueError('Objective caches of different scenarios cannot be merged')
+
+        entries = {key: other.__entries[key] for key in other.__fresh if key in other.__entries}
+        for key, value in entries.items():
+            self.put(key, value)
+
+        self.hits += other.hits
+        self.misses += other.misses
+        other.hits, other.misses, other.__fresh = 0, 0, []
+
+        return entries
+
+    def fork(self):
+        # copy holding the same entries, with nothing to merge back yet
+        cache = ObjectiveCache.__new__(ObjectiveCache)
+        cache.maxsize = self.maxsize
+        cache.fingerprint = self.fingerprint
+        cache.hits, cache.misses = 0, 0
+        cache.__entries = dict(self.__entries)
+        cache.__fresh = []
+        cache.__classes = self.__classes
+        return cache
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.__entries),
+                'hit_rate': self.hits / lookups if lookups else 0}
+
+    def save(self, file):
+        keys = np.frombuffer(b''.join(self.__entries), dtype=np.uint8)
+        values = np.array(list(self.__entries.values()), dtype=float).reshape(-1, 2)
+        np.savez(file, fingerprint=np.frombuffer(self.fingerprint, dtype=np.uint8), keys=keys, values=values)
+
+    def load(self, file):
+        with np.load(file, allow_pickle=False) as data:
+            if data['fingerprint'].tobytes() != self.fingerprint:
+                logging.warning('Objective cache belongs to a different scenario, ignoring it')
+                return
+
+            keys = data['keys'].tobytes()
+            for i, value in enumerate(data['values'].tolist()):
+                self.__store(keys[i * KEY_SIZE:(i + 1) * KEY_SIZE], tuple(value))
+
+    def __store(self, key, value):
+        self.__entries.pop(key, None)
+        self.__entries[key] = value
+        if len(self.__entries) > self.maxsize:
+            del self.__entries[next(iter(self.__entries))]
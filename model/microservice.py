@@ -2,6 +2,8 @@ from model.utils import to_cpu
 
 
 class Microservice:
+    __slots__ = ('name', 'cpureq', 'memreq', 'containers')
+
     def __init__(self, name, cpureq, memreq, containers):
         self.name = name
         self.cpureq = cpureq
@@ -1,7 +1,9 @@
-from model.utils import to_cpu
+from model.utils import utilization
 
 
 class Node:
+    __slots__ = ('name', 'cost', 'cpu', 'cpulim', 'mem', 'memlim', 'cont', 'contlim', 'zone')
+
     def __init__(self, name, cost, cpulim, memlim, contlim, zone):
         self.name = name
         self.cost = cost
@@ -11,14 +13,7 @@ class Node:
         self.zone = zone
 
     def info(self):
-        def percentage(x, y):
-            return f'{round(x / y * 100, 2)}%'
-
-        cpu = f'{to_cpu(self.cpu)}/{to_cpu(self.cpulim)} ({percentage(self.cpu, self.cpulim)}) CPU'
-        mem = f'{self.mem}/{self.memlim} ({percentage(self.mem, self.memlim)}) MiB RAM'
-        cont = f'{self.cont}/{self.contlim} ({percentage(self.cont, self.contlim)}) containers'
-
-        return f'{cpu}, {mem}, {cont}'
+        return utilization(self.cpu, self.cpulim, self.mem, self.memlim, self.cont, self.contlim)
 
     def __str__(self):
         return f'Node "{self.name}" in zone "{self.zone}": ${self.cost}, {self.info()}'
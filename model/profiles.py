@@ -0,0 +1,45 @@
+import os
+import yaml
+
+from model.scenario import SafeLoader
+
+
+# named PSO settings, written by tune.py and read by place.py
+PROFILES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles.yaml')
+
+# PSO settings of the "default" profile, also the base of every other profile
+DEFAULT_PSO = {
+    'particles': 30,
+    'iterations': 100,
+    'inertia': 0.9,
+    'cognitive': 2.5,
+    'social': 2.5,
+    'boundary_handling': 'absorbing'
+}
+
+
+def load_profiles(path=PROFILES):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return yaml.load(f, Loader=SafeLoader) or {}
+
+
+def load_profile(name, path=PROFILES):
+    profiles = load_profiles(path)
+    if name not in profiles:
+        if name == 'default':
+            return dict(DEFAULT_PSO)
+        raise ValueError(f'Unknown profile "{name}" in {path}')
+
+    if unknown := set(profiles[name]) - set(DEFAULT_PSO):
+        raise ValueError(f'Profile "{name}" has unknown settings: {", ".join(sorted(unknown))}')
+    return DEFAULT_PSO | profiles[name]
+
+
+def save_profile(name, settings, path=PROFILES):
+    # other profiles of the file are kept
+    profiles = load_profiles(path)
+    profiles[name] = settings
+    with open(path, 'w') as f:
+        yaml.dump(profiles, f, sort_keys=False)
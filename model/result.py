@@ -0,0 +1,77 @@
+import json
+import time
+
+import yaml
+
+from model.bounds import gap
+from model.utils import clean_double_dict, utilization
+
+
+class Result:
+    def __init__(self, scenario, mapping, objective, bound=None, stats=None):
+        sc = scenario.compiled
+
+        self.mapping = clean_double_dict(mapping)
+        self.objective = objective  # cost as the solver sees it, e.g. the count-weighted CP-SAT objective
+        self.bound = bound  # lower bound on the objective
+        self.stats = stats or {}
+
+        # usage and costs are recomputed from the mapping, independently of the solver
+        counts = sc.counts(self.mapping)
+        self.infra_cost, self.data_cost = sc.cost_breakdown(counts)
+        self.cost = self.infra_cost + self.data_cost
+
+        cpu, mem, cont = sc.usage(counts)
+        self.nodes = {sc.node_names[k]: {'zone': sc.zone_names[sc.zone[k]],
+                                         'cost': float(sc.cost[k]),
+                                         'cpu': int(cpu[k]), 'cpulim': int(sc.cpulim[k]),
+                                         'mem': int(mem[k]), 'memlim': int(sc.memlim[k]),
+                                         'containers': int(cont[k]), 'contlim': int(sc.contlim[k])}
+                      for k in sorted(sc.node_index[n] for n in self.mapping)}
+
+    @classmethod
+    def of(cls, solver):
+        stats = {'solver': type(solver).__name__,
+                 'runtime': time.perf_counter() - solver.started,
+                 'history': [[t, c] for t, c in solver.history]}
+        for name in ('evaluations', 'infeasible', 'moves'):
+            if hasattr(solver, name):
+                stats[name] = int(getattr(solver, name))
+
+        return cls(solver.scenario, solver.mapping, float(solver.cost), solver.bound, stats)
+
+    @property
+    def gap(self):
+        return gap(self.objective, self.bound)
+
+    def to_dict(self):
+        return {'cost': self.cost,
+                'objective': self.objective,
+                'bound': self.bound,
+                'gap': self.gap,
+                'breakdown': {'infrastructure': self.infra_cost, 'data': self.data_cost},
+                'mapping': self.mapping,
+                'nodes': self.nodes,
+                'stats': self.stats}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_yaml(self):
+        return yaml.safe_dump(self.to_dict(), sort_keys=False)
+
+    def __str__(self):
+        lines = [f'Total cost: {self.cost:.2f}']
+        if abs(self.objective - self.cost) > 1e-6 * max(1.0, abs(self.cost)):
+            lines.append(f'Solver objective: {self.objective:.2f}')
+        if self.bound is not None:
+            lines.append(f'Lower bound: {self.bound:.2f} (gap {self.gap:.2%})')
+
+        for n, micros in self.mapping.items():
+            node = self.nodes[n]
+            lines += ['', f'Node "{n}":']
+            lines += [f'  - {num} containers of microservice "{m}"' for m, num in micros.items()]
+            lines.append(utilization(node['cpu'], node['cpulim'], node['mem'], node['memlim'],
+                                     node['containers'], node['contlim']))
+
+        return '\n'.join(lines) + '\n'
@@ -1,16 +1,111 @@
-from itertools import product
-from yaml import safe_load
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import yaml
+import zipfile
 
+from model.catalogue import Catalogue
+from model.compiled import CompiledScenario, FORMAT_VERSION
 from model.microservice import Microservice
 from model.node import Node
-from model.utils import clean_double_dict
+
+
+# libyaml is several times faster than the pure-Python loader
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class Scenario:
-    def __init__(self, file):
-        scenario = {}
+    def __init__(self, file, cache=None):
+        # catalogues are referenced relative to the scenario file
+        name = getattr(file, 'name', None)
+        directory = os.path.dirname(os.path.abspath(name)) if isinstance(name, str) and \
+            not name.startswith('<') else None
+
         with file as f:
-            scenario = safe_load(f)
+            text = f.read()
+        data = text.encode() if isinstance(text, str) else text
+
+        # compiled scenarios are zip archives written by CompiledScenario.save
+        if data.startswith(b'PK\x03\x04'):
+            self.__from_compiled(CompiledScenario.load(io.BytesIO(data)))
+            return
+
+        path = None
+        if cache is not None:
+            key = hashlib.sha256(data + f'\0{FORMAT_VERSION}'.encode())
+            stamp = self.__stamp(data, directory)
+            if stamp is not None:
+                key.update(stamp)
+                path = os.path.join(cache, f'{key.hexdigest()}.npz')
+
+        if path is not None and os.path.exists(path):
+            try:
+                self.__from_compiled(CompiledScenario.load(path))
+                logging.debug(f'Scenario loaded from cache "{path}"')
+                return
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                logging.warning(f'Ignoring unreadable scenario cache "{path}": {e}')
+
+        self.__from_dict(yaml.load(data, Loader=SafeLoader), directory)
+
+        if path is not None:
+            self.__save(cache, path)
+
+    @classmethod
+    def from_dict(cls, scenario):
+        self = cls.__new__(cls)
+        self.__from_dict(scenario)
+        return self
+
+    def subset(self, micros, nodes):
+        # scenario restricted to some microservices and nodes, communication with the rest is dropped
+        micros, nodes = set(micros), set(nodes)
+        scenario = self.to_dict()
+        scenario['microservices'] = {m: micro for m, micro in scenario['microservices'].items() if m in micros}
+        scenario['nodes'] = {n: node for n, node in scenario['nodes'].items() if n in nodes}
+        scenario['datarate'] = {p: {c: rate for c, rate in rates.items() if c in micros}
+                                for p, rates in scenario['datarate'].items() if p in micros}
+        return Scenario.from_dict(scenario)
+
+    def perturbed(self, remove_nodes=(), containers=None, capacity=None):
+        # what-if copy with nodes taken away, microservices rescaled and node CPU and memory scaled by a factor
+        scenario = self.to_dict()
+        for n in list(remove_nodes) + list(capacity or ()):
+            if n not in scenario['nodes']:
+                raise ValueError(f'Unknown node "{n}"')
+        for m in containers or ():
+            if m not in scenario['microservices']:
+                raise ValueError(f'Unknown microservice "{m}"')
+
+        for n in remove_nodes:
+            del scenario['nodes'][n]
+        for m, num in (containers or {}).items():
+            scenario['microservices'][m]['containers'] = num
+        for n, factor in (capacity or {}).items():
+            if n in scenario['nodes']:
+                node = scenario['nodes'][n]
+                node['cpulim'], node['memlim'] = int(node['cpulim'] * factor), int(node['memlim'] * factor)
+
+        return Scenario.from_dict(scenario)
+
+    def to_dict(self):
+        # the scenario as read from YAML, safe to modify
+        return {
+            'microservices': {m: {'cpureq': micro.cpureq, 'memreq': micro.memreq, 'containers': micro.containers}
+                              for m, micro in self.micros.items()},
+            'nodes': {n: {'cost': node.cost, 'cpulim': node.cpulim, 'memlim': node.memlim,
+                          'contlim': node.contlim, 'zone': node.zone}
+                      for n, node in self.nodes.items()},
+            'datarate': {p: dict(rates) for p, rates in self.__datarate.items()},
+            'data_cost': {'intrazone': self.__intra, 'interzone': self.__inter}}
+
+    def __from_dict(self, scenario, directory=None):
+        catalogue = None
+        if 'infrastructure' in scenario:
+            catalogue = self.__catalogue(scenario, directory)
 
         self.micros = {
             m: Microservice(
@@ -20,33 +115,105 @@ class Scenario:
                 scenario['microservices'][m]['containers']
             ) for m in scenario['microservices']}
 
-        self.nodes = {
-            n: Node(
-                n,
-                scenario['nodes'][n]['cost'],
-                scenario['nodes'][n]['cpulim'],
-                scenario['nodes'][n]['memlim'],
-                scenario['nodes'][n]['contlim'],
-                scenario['nodes'][n]['zone'],
-            ) for n in scenario['nodes']}
+        if catalogue is not None:
+            self.nodes = self.__nodes(catalogue)
+        else:
+            self.nodes = {
+                n: Node(
+                    n,
+                    scenario['nodes'][n]['cost'],
+                    scenario['nodes'][n]['cpulim'],
+                    scenario['nodes'][n]['memlim'],
+                    scenario['nodes'][n]['contlim'],
+                    scenario['nodes'][n]['zone'],
+                ) for n in scenario['nodes']}
 
         self.__datarate = scenario['datarate']
-        self.__intra = scenario['data_cost']['intrazone']
-        self.__inter = scenario['data_cost']['interzone']
+        data_cost = scenario['data_cost'] if catalogue is None else \
+            {'intrazone': catalogue.intrazone, 'interzone': catalogue.interzone}
+        self.__intra = data_cost['intrazone']
+        self.__inter = data_cost['interzone']
 
         self.micros_tpl = tuple(self.micros.keys())
         self.nodes_tpl = tuple(self.nodes.keys())
 
         self.conts = sum(map(lambda m: m.containers, self.micros.values()))
 
-    def cost(self, mapping):
-        mp = clean_double_dict(mapping)
+        self.compiled = CompiledScenario(tuple(self.micros.values()), tuple(self.nodes.values()),
+                                         self.__datarate, self.__intra, self.__inter, catalogue)
 
-        infra_cost = sum(self.nodes[node].cost for node in mp)
-        data_cost = sum(sum(self.data_rate(prod, cons) for prod, cons in product(mp[n1], mp[n2])) *\
-                        self.data_cost(n1, n2) for n1, n2 in product(mp, mp))
+    @staticmethod
+    def __catalogue(scenario, directory):
+        # nodes and data costs come from the catalogue, a scenario may only repeat the same data costs
+        if 'nodes' in scenario:
+            raise ValueError('Scenario has both nodes and an infrastructure catalogue')
 
-        return infra_cost + data_cost
+        path = os.path.join(directory or os.getcwd(), scenario['infrastructure'])
+        catalogue = Catalogue.attach(path)
+
+        data_cost = scenario.get('data_cost')
+        if data_cost is not None and (data_cost['intrazone'], data_cost['interzone']) != \
+                (catalogue.intrazone, catalogue.interzone):
+            raise ValueError(f'Scenario data costs differ from those of catalogue "{path}"')
+        return catalogue
+
+    @staticmethod
+    def __stamp(data, directory):
+        # cached scenarios on a catalogue depend on which file it is and on its contents, the reference
+        # is found without parsing the whole scenario; None when the catalogue cannot be read
+        match = re.search(rb'^infrastructure:.*$', data, re.MULTILINE)
+        if match is None:
+            return b''
+
+        try:
+            path = os.path.abspath(os.path.join(directory or os.getcwd(),
+                                                yaml.load(match.group(0), Loader=SafeLoader)['infrastructure']))
+            stat = os.stat(path)
+        except (OSError, TypeError, yaml.YAMLError):
+            return None
+        return f'\0{path}\0{stat.st_mtime_ns}\0{stat.st_size}'.encode()
+
+    @staticmethod
+    def __nodes(source):
+        # Node objects of a compiled scenario or catalogue
+        return {n: Node(n, cost, cpulim, memlim, contlim, source.zone_names[zone])
+                for n, cost, cpulim, memlim, contlim, zone in zip(source.node_names, source.cost.tolist(),
+                                                                  source.cpulim.tolist(), source.memlim.tolist(),
+                                                                  source.contlim.tolist(), source.zone.tolist())}
+
+    def __from_compiled(self, sc):
+        self.micros = {
+            m: Microservice(m, cpureq, memreq, containers)
+            for m, cpureq, memreq, containers in zip(sc.micro_names, sc.cpureq.tolist(),
+                                                     sc.memreq.tolist(), sc.containers.tolist())}
+
+        self.nodes = self.__nodes(sc)
+
+        self.__datarate = {}
+        for p, c, rate in sc.edges:
+            self.__datarate.setdefault(sc.micro_names[p], {})[sc.micro_names[c]] = rate
+        self.__intra = sc.intrazone
+        self.__inter = sc.interzone
+
+        self.micros_tpl = sc.micro_names
+        self.nodes_tpl = sc.node_names
+
+        self.conts = len(sc.cont_micro)
+
+        self.compiled = sc
+
+    def __save(self, cache, path):
+        # written under a temporary name first, so concurrent loads never see a partial file
+        try:
+            os.makedirs(cache, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=cache, suffix='.npz', delete=False) as f:
+                self.compiled.save(f)
+            os.replace(f.name, path)
+        except OSError as e:
+            logging.warning(f'Failed to write scenario cache "{path}": {e}')
+
+    def cost(self, mapping):
+        return self.compiled.cost_of(self.compiled.counts(mapping))
 
     def data_rate(self, prod, cons):
         return self.__datarate.get(prod, {}).get(cons, 0)
@@ -59,6 +226,19 @@ class Scenario:
         else:
             return self.__inter
 
+    @property
+    def node_classes(self):
+        # names of interchangeable nodes, the multiplicity of a class is its length
+        return tuple(tuple(self.compiled.node_names[k] for k in nodes) for nodes in self.compiled.node_classes)
+
+    @property
+    def intrazone_cost(self):
+        return self.__intra
+
+    @property
+    def interzone_cost(self):
+        return self.__inter
+
     def reset_nodes(self):
         for n in self.nodes.values():
             n.cpu, n.mem, n.cont = 0, 0, 0
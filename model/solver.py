@@ -1,33 +1,34 @@
-from model.utils import clean_double_dict
+import time
+
+from model.result import Result
+from model.trace import tracer
 
 
 class Solver:
     def __init__(self, scenario):
         self.scenario = scenario
-        self.mapping = {n: {m: 0 for m in scenario.micros} for n in scenario.nodes}
+        self.mapping = None
+        self.clear_mapping()
         self.cost = float('inf')
+        self.bound = None  # lower bound on the cost of any placement, when the solver knows one
+
+        self.started = time.perf_counter()
+        self.history = []  # (seconds since start, cost) of every improving solution
 
     def solve(self):
         raise NotImplementedError()
 
-    def solution(self):
-        mapping = clean_double_dict(self.mapping)
-
-        res = f'Total cost: {self.cost:.2f}\n'
+    def record(self, cost):
+        self.history.append((time.perf_counter() - self.started, cost))
+        tracer.count('incumbents')
+        tracer.event('incumbent', cost=cost)
 
-        for n in mapping:
-            node = self.scenario.nodes[n]
+    def clear_mapping(self):
+        # solvers fill the mapping from scratch, so that solution() can be called repeatedly
+        self.mapping = {n: {m: 0 for m in self.scenario.micros} for n in self.scenario.nodes}
 
-            res += f'\nNode "{n}":'
-
-            for m in mapping[n]:
-                num = mapping[n][m]
-                node.add(self.scenario.micros[m], num)
-                res += f'\n  - {num} containers of microservice "{m}"'
-
-            res += f'\n{node.info()}\n'
-
-        return res
+    def solution(self):
+        return Result.of(self)
 
 
 class NoSolutionError(RuntimeError):
@@ -0,0 +1,50 @@
+import json
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.phases = []
+        self.counters = Counter()
+        self.events = []
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({'name': name,
+                                'start': start - self.started,
+                                'duration': time.perf_counter() - start})
+
+    def count(self, name, num=1):
+        if self.enabled:
+            self.counters[name] += num
+
+    def event(self, name, **data):
+        if self.enabled:
+            self.events.append({'name': name, 'time': time.perf_counter() - self.started} | data)
+
+    def export(self, file):
+        json.dump({'phases': self.phases,
+                   'counters': dict(self.counters),
+                   'events': self.events}, file, indent=2)
+        print(file=file)
+
+
+# process-wide tracer, disabled unless a trace file is requested
+tracer = Tracer()
@@ -0,0 +1,129 @@
+class PlacementTracker:
+    def __init__(self, scenario, position):
+        self.scenario = scenario
+
+        sc = scenario.compiled
+        m_range, n_range = range(len(sc.micro_names)), range(len(sc.node_names))
+
+        self.__micros = [scenario.micros[m] for m in sc.micro_names]
+        self.__nodes = [scenario.nodes[n] for n in sc.node_names]
+        self.__cont_micro = sc.cont_micro.tolist()
+
+        self.__zone = sc.zone.tolist()
+        self.__intra = sc.intrazone
+        self.__inter = sc.interzone
+
+        # microservices sending data to / receiving data from a microservice
+        self.__out = [[] for _ in m_range]
+        self.__in = [[] for _ in m_range]
+        for p, c, rate in sc.edges:
+            self.__out[p].append((c, rate))
+            self.__in[c].append((p, rate))
+
+        self.counts = [[0] * len(m_range) for _ in n_range]
+        self.cpu = [0] * len(n_range)
+        self.mem = [0] * len(n_range)
+        self.cont = [0] * len(n_range)
+
+        # number of nodes hosting a microservice, in total and per zone
+        self.__hosts = [0] * len(m_range)
+        self.__zone_hosts = [[0] * len(sc.zone_names) for _ in m_range]
+
+        self.__overflowing = 0
+        self.infra_cost = 0
+        self.data_cost = 0
+
+        self.position = [-1] * len(self.__cont_micro)
+        for c, k in enumerate(position):
+            if k >= 0:
+                self.__place(c, k)
+
+    @property
+    def cost(self):
+        return self.infra_cost + self.data_cost
+
+    @property
+    def feasible(self):
+        return self.__overflowing == 0
+
+    def move(self, container, to_node):
+        # containers at -1 are not placed, moving one to -1 takes it out
+        if self.position[container] != to_node:
+            if self.position[container] >= 0:
+                self.__unplace(container)
+            if to_node >= 0:
+                self.__place(container, to_node)
+
+        return self.cost, self.feasible
+
+    def swap(self, container1, container2):
+        k1, k2 = self.position[container1], self.position[container2]
+
+        self.move(container1, k2)
+        return self.move(container2, k1)
+
+    def mapping(self):
+        mapping = {n.name: {m.name: 0 for m in self.__micros} for n in self.__nodes}
+        for k, counts in enumerate(self.counts):
+            for i, num in enumerate(counts):
+                mapping[self.__nodes[k].name][self.__micros[i].name] += num
+        return mapping
+
+    def __place(self, c, k):
+        i = self.__cont_micro[c]
+        self.position[c] = k
+
+        if not self.cont[k]:
+            self.infra_cost += self.__nodes[k].cost
+
+        was_over = self.__overflows(k)
+        self.__load(k, i, 1)
+        self.__overflowing += self.__overflows(k) - was_over
+
+        if not self.counts[k][i]:
+            self.data_cost += self.__data_terms(k, i)
+            self.__host(k, i, 1)
+
+        self.counts[k][i] += 1
+
+    def __unplace(self, c):
+        i, k = self.__cont_micro[c], self.position[c]
+        self.position[c] = -1
+
+        was_over = self.__overflows(k)
+        self.__load(k, i, -1)
+        self.__overflowing += self.__overflows(k) - was_over
+
+        if not self.cont[k]:
+            self.infra_cost -= self.__nodes[k].cost
+
+        self.counts[k][i] -= 1
+
+        if not self.counts[k][i]:
+            self.__host(k, i, -1)
+            self.data_cost -= self.__data_terms(k, i)
+
+    def __load(self, k, i, num):
+        micro = self.__micros[i]
+        self.cpu[k] += micro.cpureq * num
+        self.mem[k] += micro.memreq * num
+        self.cont[k] += num
+
+    def __overflows(self, k):
+        node = self.__nodes[k]
+        return self.cpu[k] > node.cpulim or self.mem[k] > node.memlim or self.cont[k] > node.contlim
+
+    def __host(self, k, i, num):
+        self.__hosts[i] += num
+        self.__zone_hosts[i][self.__zone[k]] += num
+
+    def __data_terms(self, k, i):
+        # data cost between microservice i on node k and all other hosted microservices
+        return sum(rate * self.__transfer(k, j) for j, rate in self.__out[i]) + \
+               sum(rate * self.__transfer(k, j) for j, rate in self.__in[i])
+
+    def __transfer(self, k, j):
+        # sum of data costs between node k and all nodes hosting microservice j
+        same_zone = self.__zone_hosts[j][self.__zone[k]] - (self.counts[k][j] > 0)
+        other_zone = self.__hosts[j] - self.__zone_hosts[j][self.__zone[k]]
+        return self.__intra * same_zone + self.__inter * other_zone
@@ -6,6 +6,17 @@ def clean_double_dict(d):
     return res
 
 
+def utilization(cpu, cpulim, mem, memlim, cont, contlim):
+    def percentage(x, y):
+        return f'{round(x / y * 100, 2)}%'
+
+    cpu = f'{to_cpu(cpu)}/{to_cpu(cpulim)} ({percentage(cpu, cpulim)}) CPU'
+    mem = f'{mem}/{memlim} ({percentage(mem, memlim)}) MiB RAM'
+    cont = f'{cont}/{contlim} ({percentage(cont, contlim)}) containers'
+
+    return f'{cpu}, {mem}, {cont}'
+
+
 def to_cpu(value):
     cpu = value / 1000
     return round(cpu, 2) if cpu % 1 else int(cpu)
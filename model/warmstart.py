@@ -0,0 +1,71 @@
+import logging
+import numpy as np
+
+from yaml import safe_load
+
+
+def read_mapping(file):
+    # accepts a plain {node: {microservice: containers}} mapping or a result with a "mapping" key
+    with file as f:
+        data = safe_load(f) or {}
+    return data.get('mapping', data)
+
+
+def initial_counts(scenario, mapping):
+    sc = scenario.compiled
+    counts = np.zeros((len(sc.node_names), len(sc.micro_names)), dtype=np.int64)
+
+    for n in mapping:
+        if n not in sc.node_index:
+            logging.info(f'Node "{n}" of the initial placement is not in the scenario, its containers will move')
+            continue
+        for m, num in mapping[n].items():
+            if m in sc.micro_index:
+                counts[sc.node_index[n], sc.micro_index[m]] += num
+
+    return trimmed(sc, counts)
+
+
+def trimmed(sc, counts):
+    # microservices that were scaled down keep their containers on the first nodes
+    counts = counts.copy()
+    for i, containers in enumerate(sc.containers):
+        excess = counts[:, i].sum() - containers
+        for k in np.flatnonzero(counts[:, i]):
+            drop = min(excess, counts[k, i])
+            if drop <= 0:
+                break
+            counts[k, i] -= drop
+            excess -= drop
+
+    return counts
+
+
+def initial_position(scenario, counts):
+    # node of every container in the initial placement, -1 for containers that have none
+    sc = scenario.compiled
+    position = []
+
+    for i, containers in enumerate(sc.containers):
+        nodes = np.repeat(np.arange(len(sc.node_names)), counts[:, i]).tolist()
+        position += nodes + [-1] * (containers - len(nodes))
+
+    return position
+
+
+def moved(initial, counts):
+    # containers that left the node they were running on, those on nodes missing from the scenario are displaced
+    return int(np.maximum(initial - counts, 0).sum())
+
+
+def displaced(scenario, mapping, initial):
+    # containers of the initial placement on nodes missing from the scenario, which have to move
+    # but are not in the initial counts; containers removed by scaling down are not counted
+    sc = scenario.compiled
+    missing = np.zeros(len(sc.micro_names), dtype=np.int64)
+    for n in mapping:
+        if n not in sc.node_index:
+            for m, num in mapping[n].items():
+                if m in sc.micro_index:
+                    missing[sc.micro_index[m]] += num
+    return int(np.minimum(missing, np.maximum(sc.containers - initial.sum(axis=0), 0)).sum())
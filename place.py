@@ -1,11 +1,38 @@
 #!/usr/bin/env python3
 import argparse
 import logging
+import os
 import random
 import sys
 
-from solvers import PSOSolver, CPSATSolver
-from model import Scenario, NoSolutionError
+from yaml import load
+
+from model import Scenario, NoSolutionError, ObjectiveCache, tracer
+from model.profiles import PROFILES, load_profile
+from model.scenario import SafeLoader
+from model.warmstart import read_mapping, initial_counts, moved, displaced
+from solvers.registry import SOLVERS, SUBSOLVERS, make_solver, members, parse
+
+
+class ListSolvers(argparse.Action):
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, default=argparse.SUPPRESS, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        for spec in SOLVERS.values():
+            print(f'{spec.name}: {spec.description}')
+            for name, param in spec.params.items():
+                if param.type is not object:
+                    print(f'  {name}={param.default}  {param.help}')
+        parser.exit()
+
+
+def read_config(file, solver):
+    # parameters of every solver, overridden by a section named after the selected one
+    config = {k.replace('-', '_') if k not in SOLVERS else k: v
+              for k, v in (load(file, Loader=SafeLoader) or {}).items()}
+    options = {k: v for k, v in config.items() if k not in SOLVERS}
+    return options | {k.replace('-', '_'): v for k, v in (config.get(solver) or {}).items()}
 
 
 def main():
@@ -22,63 +49,175 @@ def main():
                         type=argparse.FileType('w'),
                         default=sys.stdout,
                         help='output file')
+    parser.add_argument('--format',
+                        choices=('text', 'json', 'yaml'),
+                        default='text',
+                        help='output format, JSON and YAML include node usage, cost breakdown and solver stats')
     parser.add_argument('--seed',
                         type=int,
                         help='random number generator seed')
+    parser.add_argument('--time-limit',
+                        type=float,
+                        help='wall-clock limit for the search in seconds')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='number of parallel search workers')
+    parser.add_argument('--islands',
+                        type=int,
+                        help='number of swarms in island PSO (default: 8)')
+    parser.add_argument('--repair',
+                        action='store_true',
+                        default=None,
+                        help='move containers off overflowing nodes before PSO evaluation')
+    parser.add_argument('--penalty',
+                        action='store_true',
+                        default=None,
+                        help='grade infeasible PSO positions by violation instead of discarding them')
+    parser.add_argument('--no-symmetry-breaking',
+                        dest='symmetry',
+                        action='store_false',
+                        default=None,
+                        help='do not order interchangeable nodes in CP-SAT models')
+    parser.add_argument('--canonical',
+                        action='store_true',
+                        default=None,
+                        help='relabel interchangeable nodes of PSO positions in the order of first use')
+    parser.add_argument('--memo-size',
+                        type=int,
+                        default=0,
+                        help='number of PSO objective values to memoize, 0 disables memoization')
+    parser.add_argument('--memo-file',
+                        help='file with memoized PSO objective values, loaded before and saved after solving')
+    parser.add_argument('--fit',
+                        choices=('first', 'best'),
+                        help='greedy construction: first open node with room or cheapest placement')
+    parser.add_argument('--stagnation',
+                        type=int,
+                        help='stop PSO after this many iterations without improvement')
+    parser.add_argument('--target-gap',
+                        type=float,
+                        help='stop PSO once the cost is within this fraction of the lower bound, e.g. 0.05')
+    parser.add_argument('--max-evaluations',
+                        type=int,
+                        help='stop PSO after this many objective evaluations')
+    parser.add_argument('--profile',
+                        default='default',
+                        help='named PSO settings, e.g. written by tune.py')
+    parser.add_argument('--profiles',
+                        metavar='FILE',
+                        default=PROFILES,
+                        help='file with PSO profiles')
+    parser.add_argument('--parts',
+                        type=int,
+                        help='number of microservice groups in decomposition (default: one per 10 microservices)')
+    parser.add_argument('--subsolver',
+                        choices=SUBSOLVERS,
+                        help='solver for decomposition subproblems (default: cpsat-agg)')
+    parser.add_argument('--members',
+                        type=lambda members: tuple(members.split(',')),
+                        help=f'comma-separated solvers of the portfolio, any of {", ".join(members())} '
+                             f'(default: cpsat-agg,vmpso,greedy-ls)')
+    parser.add_argument('-P', '--param',
+                        metavar='NAME=VALUE',
+                        action='append',
+                        default=[],
+                        help='solver parameter, repeatable, see --list-solvers')
+    parser.add_argument('--config',
+                        type=argparse.FileType('r'),
+                        help='YAML file with solver parameters, optionally in sections named after solvers')
+    parser.add_argument('--list-solvers',
+                        action=ListSolvers,
+                        help='list solvers with their parameters and defaults, then exit')
+    parser.add_argument('--cache',
+                        metavar='DIR',
+                        help='directory for compiled scenarios, reused across runs')
+    parser.add_argument('--initial',
+                        type=argparse.FileType('r'),
+                        help='current placement YAML/JSON file to start from')
+    parser.add_argument('--migration-budget',
+                        type=int,
+                        help='maximum number of containers moved off their initial node')
+    parser.add_argument('--trace',
+                        type=argparse.FileType('w'),
+                        help='write per-phase timings and solver counters to a JSON file')
     parser.add_argument('solver',
-                        choices=('cpsat', 'pso', 'mpso'),
+                        choices=tuple(SOLVERS),
                         help='name of the solver')
     parser.add_argument('scenario',
-                        type=argparse.FileType('r'),
-                        help='scenario YAML file')
+                        type=argparse.FileType('rb'),
+                        help='scenario YAML or compiled file, - for standard input')
     args = parser.parse_args()
 
+    # profile, then configuration file, then flags, then --param, the later ones taking precedence
+    try:
+        options = load_profile(args.profile, args.profiles)
+        if args.config:
+            options |= read_config(args.config, args.solver)
+        options |= {name: value for name in ('islands', 'repair', 'penalty', 'symmetry', 'canonical', 'fit',
+                                             'stagnation', 'target_gap', 'max_evaluations', 'parts',
+                                             'subsolver', 'members')
+                    if (value := getattr(args, name)) is not None}
+        options |= parse(args.param)
+    except ValueError as e:
+        parser.error(str(e))
+
     random.seed(args.seed)
 
-    scenario = Scenario(args.scenario)
-
-    solvers = {
-        'cpsat': CPSATSolver,
-        'pso': PSOSolver,
-        'mpso': PSOSolver
-    }
-    Solver = solvers[args.solver]
-
-    extra_args = {
-        'cpsat': {},
-        'pso': {
-            'particles': 30,
-            'iterations': 100,
-            'inertia': 0.9,
-            'cognitive': 2.5,
-            'social': 2.5,
-            'random_init_position': True,
-            'zero_init_velocity': False,
-            'boundary_handling': 'absorbing'
-        },
-        'mpso': {
-            'particles': 30,
-            'iterations': 100,
-            'inertia': 0.9,
-            'cognitive': 2.5,
-            'social': 2.5,
-            'random_init_position': False,
-            'zero_init_velocity': False,
-            'boundary_handling': 'absorbing'
-        }
-    }
+    if args.trace:
+        tracer.enable()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
                         level=args.log_level,
                         stream=args.log_file)
 
-    solver = Solver(scenario, **extra_args[args.solver])
-    solver.solve()
-
     try:
-        print(solver.solution(), file=args.output)
+        with tracer.phase('load'):
+            scenario = Scenario(args.scenario, args.cache)
+            mapping = read_mapping(args.initial) if args.initial else None
+            initial = initial_counts(scenario, mapping) if mapping is not None else None
+
+        if args.migration_budget is not None and initial is None:
+            parser.error('--migration-budget requires --initial')
+        if args.migration_budget is not None and args.solver in ('decomp', 'greedy', 'greedy-ls', 'portfolio'):
+            parser.error(f'--migration-budget is not supported by {args.solver}')
+
+        cache = None
+        if args.memo_size:
+            cache = ObjectiveCache(scenario, args.memo_size)
+            if args.memo_file and os.path.exists(args.memo_file):
+                cache.load(args.memo_file)
+
+        with tracer.phase('init'):
+            try:
+                solver = make_solver(args.solver, scenario, args.time_limit, args.workers, initial,
+                                     args.migration_budget, cache=cache, **options)
+            except ValueError as e:
+                parser.error(str(e))
+
+        with tracer.phase('solve'):
+            solver.solve()
+
+        if cache is not None and args.memo_file:
+            cache.save(args.memo_file)
+
+        with tracer.phase('solution'):
+            result = solver.solution()
+            if args.format == 'json':
+                print(result.to_json(), file=args.output)
+            elif args.format == 'yaml':
+                print(result.to_yaml(), end='', file=args.output)
+            else:
+                print(result, file=args.output)
+
+        if initial is not None:
+            logging.info(f'{moved(initial, scenario.compiled.counts(solver.mapping))} containers moved '
+                         f'from the initial placement, {displaced(scenario, mapping, initial)} more '
+                         f'from nodes missing from the scenario')
     except NoSolutionError:
         sys.exit(1)
+    finally:
+        if args.trace:
+            tracer.export(args.trace)
 
 
 if __name__ == '__main__':
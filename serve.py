@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+from model import Scenario, NoSolutionError, ObjectiveCache
+from model.warmstart import initial_counts, moved, displaced
+from solvers.registry import SOLVERS, make_solver
+
+
+# scenarios and objective caches every worker process keeps between requests
+WORKER_SCENARIOS = 32
+
+# seconds a response may lag behind the deadline before the request is given up
+DEADLINE_GRACE = 1.0
+
+_scenarios = OrderedDict()
+_caches = {}
+
+
+def scenario_id(scenario):
+    # the fingerprint covers numbers only, names decide the keys of the returned mapping
+    digest = hashlib.blake2b(scenario.compiled.fingerprint(), digest_size=16)
+    digest.update('\0'.join(scenario.micros_tpl + scenario.nodes_tpl).encode())
+    return digest.hexdigest()
+
+
+def load_scenario(path):
+    # scenarios are read once per worker, the least recently used are dropped first
+    scenario = _scenarios.pop(path, None)
+    if scenario is None:
+        with open(path, 'rb') as f:
+            scenario = Scenario(f)
+    _scenarios[path] = scenario
+    if len(_scenarios) > WORKER_SCENARIOS:
+        _caches.pop(_scenarios.popitem(last=False)[0], None)
+    return scenario
+
+
+def run(path, request, deadline):
+    start = time.perf_counter()
+    result = {'status': 'solved', 'cost': None, 'mapping': None}
+
+    try:
+        random.seed(request.get('seed'))
+
+        scenario = load_scenario(path)
+        what_if = 'remove_nodes' in request or 'containers' in request
+        if what_if:
+            scenario = scenario.perturbed(request.get('remove_nodes', ()), request.get('containers'))
+
+        initial = None
+        if request.get('initial') is not None:
+            initial = initial_counts(scenario, request['initial'])
+
+        cache = None
+        if request.get('memo_size') and not what_if:
+            cache = _caches.get(path)
+            if cache is None:
+                cache = _caches[path] = ObjectiveCache(scenario, request['memo_size'])
+
+        time_limit = request.get('time_limit')
+        if deadline is not None:
+            # queueing and loading count against the deadline, a tenth of the rest is left for the answer
+            remaining = (deadline - time.time()) * 0.9
+            if remaining <= 0:
+                return result | {'status': 'deadline_exceeded', 'runtime': time.perf_counter() - start}
+            time_limit = min(time_limit or remaining, remaining)
+
+        solver = make_solver(request.get('solver', 'cpsat-agg'), scenario, time_limit, request.get('workers'),
+                             initial=initial, budget=request.get('migration_budget'), cache=cache,
+                             **request.get('options', {}))
+        if deadline is not None and hasattr(solver, 'build'):
+            # CP-SAT builds its model before the search, which counts against the deadline as well
+            solver.build()
+            solver.solver.parameters.max_time_in_seconds = max(0.0, min(time_limit, (deadline - time.time()) * 0.9))
+
+        solve_start = time.perf_counter()
+        solver.solve()
+        result['solve_time'] = time.perf_counter() - solve_start
+
+        result |= solver.solution().to_dict()
+        if initial is not None:
+            result['moved'] = moved(initial, scenario.compiled.counts(solver.mapping))
+            result['displaced'] = displaced(scenario, request['initial'], initial)
+    except NoSolutionError:
+        result['status'] = 'no_solution'
+    except Exception as e:
+        logging.exception('Failed to solve placement request')
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    result['runtime'] = time.perf_counter() - start
+    return result
+
+
+def work(connection):
+    # worker process loop, one request at a time, in a process group of its own
+    # so that stopping it stops the processes of multi-process solvers as well
+    os.setpgid(0, 0)
+    while True:
+        try:
+            args = connection.recv()
+        except EOFError:
+            return
+        connection.send(run(*args))
+
+
+class Worker:
+    def __init__(self):
+        self.connection, child = multiprocessing.Pipe()
+        # not a daemon, daemonic processes cannot start the processes of ipso, decomp or portfolio
+        self.process = multiprocessing.Process(target=work, args=(child,))
+        self.process.start()
+        child.close()
+
+    def run(self, path, request, deadline, timeout):
+        # None when the answer does not come within the timeout
+        self.connection.send((path, request, deadline))
+        if not self.connection.poll(timeout):
+            return None
+        return self.connection.recv()
+
+    def stop(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            # the worker has not made its process group yet
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class PlacementService:
+    def __init__(self, jobs, limit, state):
+        self.slots = threading.BoundedSemaphore(limit)  # requests in progress, waiting or running
+        self.state = state
+
+        self.lock = threading.Lock()
+        self.scenarios = {}  # id -> compiled scenario file
+        self.last = {}  # id -> mapping of the last solved placement
+
+        self.workers = set()
+        self.idle = queue.Queue()  # workers without a request
+        for _ in range(jobs):
+            self.start_worker()
+
+    def start_worker(self):
+        worker = Worker()
+        with self.lock:
+            self.workers.add(worker)
+        self.idle.put(worker)
+
+    def stop_worker(self, worker):
+        with self.lock:
+            self.workers.discard(worker)
+        worker.stop()
+
+    def register(self, body):
+        if 'path' in body:
+            with open(body['path'], 'rb') as f:
+                scenario = Scenario(f)
+        elif 'yaml' in body:
+            scenario = Scenario(io.BytesIO(body['yaml'].encode()))
+        elif isinstance(body.get('scenario'), dict):
+            scenario = Scenario.from_dict(body['scenario'])
+        else:
+            # a string scenario is an id everywhere, scenario text is given as yaml
+            raise ValueError('Expected "path", "yaml" or a "scenario" object')
+
+        key = scenario_id(scenario)
+        with self.lock:
+            if key not in self.scenarios:
+                path = os.path.join(self.state, f'{key}.npz')
+                scenario.compiled.save(path)
+                self.scenarios[key] = path
+                logging.info(f'Registered scenario {key} with {len(scenario.micros)} microservices '
+                             f'and {len(scenario.nodes)} nodes')
+
+        return {'id': key, 'microservices': len(scenario.micros), 'nodes': len(scenario.nodes)}
+
+    def unregister(self, key):
+        with self.lock:
+            path = self.scenarios.pop(key)
+            self.last.pop(key, None)
+        os.remove(path)
+
+    def solve(self, body):
+        # requests name a registered scenario by its id or carry one as for registration
+        key = body['scenario'] if isinstance(body.get('scenario'), str) else self.register(body)['id']
+        with self.lock:
+            path = self.scenarios[key]
+
+        solver = body.get('solver', 'cpsat-agg')
+        if solver not in SOLVERS:
+            raise ValueError(f'Unknown solver "{solver}"')
+
+        request = {k: v for k, v in body.items() if k not in ('scenario', 'path', 'yaml', 'deadline', 'warm_start')}
+        what_if = 'remove_nodes' in body or 'containers' in body
+        if body.get('warm_start') and 'initial' not in body and not what_if:
+            request['initial'] = self.last.get(key)
+
+        deadline = time.time() + body['deadline'] if body.get('deadline') is not None else None
+
+        if not self.slots.acquire(blocking=False):
+            return 503, {'status': 'busy'}
+
+        try:
+            # waiting for a free worker counts against the deadline
+            timeout = deadline - time.time() if deadline is not None else None
+            try:
+                worker = self.idle.get(timeout=max(0.0, timeout) if timeout is not None else None)
+            except queue.Empty:
+                return 504, {'status': 'deadline_exceeded'}
+
+            timeout = deadline - time.time() + DEADLINE_GRACE if deadline is not None else None
+            try:
+                result = worker.run(path, request, deadline, timeout)
+            except (EOFError, OSError) as e:
+                logging.error(f'Placement worker failed: {e}')
+                self.stop_worker(worker)
+                self.start_worker()
+                return 500, {'status': 'error', 'error': 'worker failed'}
+
+            if result is None:
+                # a job past its deadline, e.g. still building its model, would hold the worker
+                # for later requests, so the worker is replaced
+                logging.warning('Placement request missed its deadline, restarting its worker')
+                self.stop_worker(worker)
+                self.start_worker()
+                return 504, {'status': 'deadline_exceeded'}
+            self.idle.put(worker)
+        finally:
+            self.slots.release()
+
+        if result['status'] == 'solved' and not what_if:
+            self.last[key] = result['mapping']
+
+        result['scenario'] = key
+        return 200, result
+
+    def info(self):
+        with self.lock:
+            return {'status': 'ok', 'scenarios': sorted(self.scenarios)}
+
+    def shutdown(self):
+        with self.lock:
+            workers = list(self.workers)
+        for worker in workers:
+            worker.stop()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        if self.path in ('/', '/health', '/scenarios'):
+            self.reply(200, self.service.info())
+        else:
+            self.reply(404, {'error': f'Unknown path "{self.path}"'})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+            if self.path == '/scenarios':
+                self.reply(200, self.service.register(body))
+            elif self.path in ('/place', '/whatif'):
+                self.reply(*self.service.solve(body))
+            else:
+                self.reply(404, {'error': f'Unknown path "{self.path}"'})
+        except KeyError as e:
+            self.reply(400, {'error': f'Missing or unknown {e}'})
+        except (ValueError, TypeError, OSError, yaml.YAMLError) as e:
+            self.reply(400, {'error': str(e)})
+
+    def do_DELETE(self):
+        key = self.path.removeprefix('/scenarios/')
+        try:
+            self.service.unregister(key)
+            self.reply(200, {'id': key})
+        except KeyError:
+            self.reply(404, {'error': f'Unknown scenario "{key}"'})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logging.debug(f'{self.address_string()} - {format % args}')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve node-container placements over HTTP.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('--host',
+                        default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('--port',
+                        type=int,
+                        default=8080,
+                        help='port to listen on')
+    parser.add_argument('--socket',
+                        help='Unix socket to listen on instead of TCP')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='number of placements solved in parallel')
+    parser.add_argument('--queue',
+                        type=int,
+                        help='maximum number of requests in progress, more are rejected (default: 4 per job)')
+    parser.add_argument('--state',
+                        metavar='DIR',
+                        help='directory for compiled scenarios shared with the workers (default: temporary)')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        state = args.state or temporary
+        os.makedirs(state, exist_ok=True)
+
+        RequestHandler.service = service = PlacementService(args.jobs, args.queue or 4 * args.jobs, state)
+
+        if args.socket:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            server = UnixHTTPServer(args.socket, RequestHandler)
+            logging.info(f'Listening on {args.socket}')
+        else:
+            server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+            logging.info(f'Listening on {args.host}:{server.server_port}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,21 @@
-from solvers.cpsat import CPSATSolver
-from solvers.pso import PSOSolver
+import importlib
+
+# solver classes are imported on first use, so that only the selected solver's dependencies are loaded
+_CLASSES = {
+    'CPSATSolver': 'solvers.cpsat',
+    'AggregatedCPSATSolver': 'solvers.cpsat',
+    'PSOSolver': 'solvers.pso',
+    'IslandPSOSolver': 'solvers.pso',
+    'VectorizedPSOSolver': 'solvers.vpso',
+    'DecompositionSolver': 'solvers.decomposition',
+    'GreedySolver': 'solvers.greedy',
+    'PortfolioSolver': 'solvers.portfolio'
+}
+
+__all__ = list(_CLASSES)
+
+
+def __getattr__(name):
+    if name in _CLASSES:
+        return getattr(importlib.import_module(_CLASSES[name]), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,35 +1,50 @@
 import logging
 
+import numpy as np
+
 from itertools import product
 from ortools.sat.python import cp_model
 
+from model.bounds import gap
 from model.solver import Solver, NoSolutionError
+from model.trace import tracer
 
 
 class CPSATSolver(Solver):
-    def __init__(self, scenario):
+    def __init__(self, scenario, time_limit=None, workers=None, initial=None, budget=None, symmetry=True):
         self.solver = cp_model.CpSolver()
         self.model = cp_model.CpModel()
         super().__init__(scenario)
-        self.__m_range = range(len(self.scenario.micros))
-        self.__n_range = range(len(self.scenario.nodes))
 
-    def __variables(self):
+        self.initial = initial
+        self.budget = budget
+        # an initial placement tells interchangeable nodes apart
+        self.symmetry = symmetry and initial is None
+
+        if time_limit is not None:
+            self.solver.parameters.max_time_in_seconds = time_limit
+        if workers is not None:
+            self.solver.parameters.num_workers = workers
+
+        self._m_range = range(len(self.scenario.micros))
+        self._n_range = range(len(self.scenario.nodes))
+
+    def _variables(self):
         self.used = {}  # does node have any containers scheduled
         self.sched = {}  # is container scheduled on a node
-        for k in self.__n_range:
-            for i in self.__m_range:
+        for k in self._n_range:
+            for i in self._m_range:
                 for j in range(self.micro(i).containers):
                     self.sched[i, j, k] = self.model.NewBoolVar('sched')
 
             self.used[k] = self.model.NewBoolVar('used')
             self.model.AddMaxEquality(self.used[k],
-                                      [self.sched[i, j, k] for i in self.__m_range
+                                      [self.sched[i, j, k] for i in self._m_range
                                        for j in range(self.micro(i).containers)])
 
         self.schedx2 = {}  # product of two sched variables
-        for k1, k2 in product(self.__n_range, self.__n_range):
-            for i1, i2 in product(self.__m_range, self.__m_range):
+        for k1, k2 in product(self._n_range, self._n_range):
+            for i1, i2 in product(self._m_range, self._m_range):
                 prod = product(range(self.micro(i1).containers), range(self.micro(i2).containers))
                 for j1, j2 in prod:
                     self.schedx2[i1, j1, k1, i2, j2, k2] = self.model.NewBoolVar('schedx2')
@@ -37,40 +52,40 @@ class CPSATSolver(Solver):
 
         logging.debug('Variables are successfuly defined')
 
-    def __constraints(self):
+    def _constraints(self):
         # Every container is scheduled exactly once
-        for i in self.__m_range:
+        for i in self._m_range:
             for j in range(self.micro(i).containers):
-                self.model.AddExactlyOne(self.sched[i, j, k] for k in self.__n_range)
+                self.model.AddExactlyOne(self.sched[i, j, k] for k in self._n_range)
 
-        for k in self.__n_range:
+        for k in self._n_range:
             # Container limit
-            self.model.Add(sum(self.sched[i, j, k] for i in self.__m_range
+            self.model.Add(sum(self.sched[i, j, k] for i in self._m_range
                                for j in range(self.micro(i).containers)) <= self.node(k).contlim)
 
             # CPU limit
-            self.model.Add(sum(self.sched[i, j, k] * self.micro(i).cpureq for i in self.__m_range
+            self.model.Add(sum(self.sched[i, j, k] * self.micro(i).cpureq for i in self._m_range
                                for j in range(self.micro(i).containers)) <= self.node(k).cpulim)
 
             # Memory limit
-            self.model.Add(sum(self.sched[i, j, k] * self.micro(i).memreq for i in self.__m_range
+            self.model.Add(sum(self.sched[i, j, k] * self.micro(i).memreq for i in self._m_range
                                for j in range(self.micro(i).containers)) <= self.node(k).memlim)
 
         logging.debug('Constraints are successfuly defined')
 
-    def __objectives(self):
+    def _objectives(self):
         node_costs, data_costs = [], []
 
-        for k in self.__n_range:
+        for k in self._n_range:
             node_costs.append(
                 cp_model.LinearExpr.Term(self.used[k], self.node(k).cost))
 
-        for k1, k2 in product(self.__n_range, self.__n_range):
-            for i1, i2 in product(self.__m_range, self.__m_range):
+        for k1, k2 in product(self._n_range, self._n_range):
+            for i1, i2 in product(self._m_range, self._m_range):
                 prod = product(range(self.micro(i1).containers), range(self.micro(i2).containers))
                 for j1, j2 in prod:
-                    ndc = self.scenario.data_cost(self.node(k1).name, self.node(k2).name)
-                    data = self.scenario.data_rate(self.micro(i1).name, self.micro(i2).name)
+                    ndc = self.scenario.compiled.transfer[k1, k2]
+                    data = self.scenario.compiled.datarate[i1, i2]
                     coef = ndc * data / self.micro(i1).containers / self.micro(i2).containers
                     data_costs.append(cp_model.LinearExpr.Term(self.schedx2[i1, j1, k1, i2, j2, k2], coef))
 
@@ -81,33 +96,258 @@ class CPSATSolver(Solver):
 
         logging.debug('Objective is successfuly defined')
 
+    def _warm_start(self, counts):
+        # j-th container of a microservice starts on the j-th node hosting it in the hinted placement
+        for i in self._m_range:
+            nodes = np.repeat(np.arange(len(self._n_range)), counts[:, i]).tolist()
+            for j, k0 in enumerate(nodes):
+                for k in self._n_range:
+                    self.model.AddHint(self.sched[i, j, k], k == k0)
+
+        self.warm_start(counts)
+
+    def _count(self, i, k):
+        return sum(self.sched[i, j, k] for j in range(self.micro(i).containers))
+
+    def node_terms(self, k):
+        # (variable, microservice) pairs, the containers of a microservice on node k are the sum of its variables
+        return [(self.sched[i, j, k], i) for i in self._m_range for j in range(self.micro(i).containers)]
+
+    def hint(self, counts):
+        # replaces the solution hint of a built model, e.g. with a placement found by another solver
+        self.model.ClearHints()
+        self._warm_start(ordered(self.scenario.compiled, counts) if self.symmetry else counts)
+
+    def warm_start(self, counts):
+        for k in range(len(counts)):
+            self.model.AddHint(self.used[k], bool(counts[k].any()))
+
+    def migration_budget(self, count):
+        # count(i, k) is the model expression for the containers of microservice i on node k;
+        # containers that left their initial node, at most budget of them
+        moved = []
+        for k, i in zip(*np.nonzero(self.initial)):
+            num = int(self.initial[k, i])
+            moved.append(self.model.NewIntVar(0, num, 'moved'))
+            self.model.Add(moved[-1] >= num - count(i, k))
+        self.model.Add(sum(moved) <= self.budget)
+
+        logging.debug('Migration budget is successfuly defined')
+
+    def break_symmetry(self, count):
+        # nodes of a class are interchangeable, so only placements with non-increasing usage are searched
+        m_range = range(len(self.scenario.micros))
+        for nodes in self.scenario.compiled.node_classes:
+            for k1, k2 in zip(nodes, nodes[1:]):
+                self.model.Add(self.used[k1] >= self.used[k2])
+                self.model.Add(sum(count(i, k1) for i in m_range) >= sum(count(i, k2) for i in m_range))
+
+        logging.debug('Symmetry breaking constraints are successfuly defined')
+
     def solution(self):
-        if self.status != cp_model.OPTIMAL:
-            logging.error('CP-SAT failed to find an optimal solution')
-            raise NoSolutionError('CP-SAT failed to find an optimal solution.')
+        if self.status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            logging.error('CP-SAT failed to find a solution')
+            raise NoSolutionError('CP-SAT failed to find a solution.')
 
         self.cost = self.solver.ObjectiveValue()
+        self.bound = self.solver.BestObjectiveBound()
+        self.gap = gap(self.cost, self.bound)
+        self.clear_mapping()
+        self.read_mapping()
+
+        if self.status != cp_model.OPTIMAL:
+            logging.warning(f'CP-SAT stopped with a feasible solution, gap {self.gap:.2%}')
+
+        return super().solution()
 
-        for k in self.__n_range:
+    def read_mapping(self):
+        for k in self._n_range:
             if self.solver.Value(self.used[k]):
-                for i in self.__m_range:
+                for i in self._m_range:
                     for j in range(self.micro(i).containers):
                         scheduled = self.solver.Value(self.sched[i, j, k])
                         self.mapping[self.node(k).name][self.micro(i).name] += scheduled
 
-        return super().solution()
+    def build(self):
+        with tracer.phase('variables'):
+            self._variables()
+        with tracer.phase('constraints'):
+            self._constraints()
+        with tracer.phase('objectives'):
+            self._objectives()
+        if self.initial is not None:
+            with tracer.phase('warm_start'):
+                self._warm_start(self.initial)
+                if self.budget is not None:
+                    self.migration_budget(self._count)
+        if self.symmetry:
+            with tracer.phase('symmetry'):
+                self.break_symmetry(self._count)
 
     def solve(self):
-        self.__variables()
-        self.__constraints()
-        self.__objectives()
+        # the model may have been built beforehand, e.g. to fit the search into what is left of a deadline
+        if not self.model.Proto().variables:
+            self.build()
 
         logging.debug('Starting solving')
-        self.status = self.solver.Solve(self.model)
+        with tracer.phase('search'):
+            self.status = self.solver.Solve(self.model, IncumbentCallback(self.record))
         logging.debug('Finished solving')
 
+        tracer.count('variables', len(self.model.Proto().variables))
+        tracer.count('constraints', len(self.model.Proto().constraints))
+        tracer.count('branches', self.solver.NumBranches())
+        tracer.count('conflicts', self.solver.NumConflicts())
+
     def micro(self, i):
         return self.scenario.micros[self.scenario.micros_tpl[i]]
 
     def node(self, i):
         return self.scenario.nodes[self.scenario.nodes_tpl[i]]
+
+
+class AggregatedCPSATSolver(CPSATSolver):
+    def __init__(self, scenario, time_limit=None, workers=None, initial=None, budget=None, symmetry=True):
+        super().__init__(scenario, time_limit, workers, initial, budget, symmetry)
+
+        zones = self.scenario.compiled.zone
+        self.__zones = tuple(np.flatnonzero(zones == z).tolist() for z in range(zones.max(initial=-1) + 1))
+
+        # microservice pairs that exchange data
+        self.__pairs = self.scenario.compiled.edges
+
+    def _variables(self):
+        self.used = {}  # does node have any containers scheduled
+        self.count = {}  # number of containers of a microservice scheduled on a node
+        self.__ub = {}
+        for k in self._n_range:
+            node = self.node(k)
+            for i in self._m_range:
+                micro = self.micro(i)
+                # a microservice without CPU or memory requests is bounded by the container limit alone
+                self.__ub[i, k] = min(micro.containers, node.contlim,
+                                      node.cpulim // micro.cpureq if micro.cpureq else node.contlim,
+                                      node.memlim // micro.memreq if micro.memreq else node.contlim)
+                self.count[i, k] = self.model.NewIntVar(0, self.__ub[i, k], 'count')
+
+            self.used[k] = self.model.NewBoolVar('used')
+
+        self.zone_count = {}  # number of containers of a microservice scheduled in a zone
+        for i in self._m_range:
+            for z, nodes in enumerate(self.__zones):
+                self.zone_count[i, z] = self.model.NewIntVar(0, self.micro(i).containers, 'zone_count')
+                self.model.Add(self.zone_count[i, z] == sum(self.count[i, k] for k in nodes))
+
+        self.node_prod = {}  # product of two count variables on the same node
+        self.zone_prod = {}  # product of two zone_count variables in the same zone
+        for i1, i2, _ in self.__pairs:
+            ub = self.micro(i1).containers * self.micro(i2).containers
+
+            if self.scenario.intrazone_cost:
+                for k in self._n_range:
+                    self.node_prod[i1, i2, k] = self.model.NewIntVar(0, ub, 'node_prod')
+                    self.model.AddMultiplicationEquality(self.node_prod[i1, i2, k], (self.count[i1, k], self.count[i2, k]))
+
+            if self.scenario.interzone_cost != self.scenario.intrazone_cost:
+                for z in range(len(self.__zones)):
+                    self.zone_prod[i1, i2, z] = self.model.NewIntVar(0, ub, 'zone_prod')
+                    self.model.AddMultiplicationEquality(self.zone_prod[i1, i2, z], (self.zone_count[i1, z], self.zone_count[i2, z]))
+
+        logging.debug('Variables are successfuly defined')
+
+    def _constraints(self):
+        # Every container is scheduled exactly once
+        for i in self._m_range:
+            self.model.Add(sum(self.count[i, k] for k in self._n_range) == self.micro(i).containers)
+
+        for k in self._n_range:
+            conts = sum(self.count[i, k] for i in self._m_range)
+
+            # Node is used if and only if it has containers scheduled
+            self.model.Add(conts >= self.used[k])
+            for i in self._m_range:
+                self.model.Add(self.count[i, k] <= self.__ub[i, k] * self.used[k])
+
+            # Container limit
+            self.model.Add(conts <= self.node(k).contlim)
+
+            # CPU limit
+            self.model.Add(sum(self.count[i, k] * self.micro(i).cpureq for i in self._m_range) <= self.node(k).cpulim)
+
+            # Memory limit
+            self.model.Add(sum(self.count[i, k] * self.micro(i).memreq for i in self._m_range) <= self.node(k).memlim)
+
+        logging.debug('Constraints are successfuly defined')
+
+    def _objectives(self):
+        node_costs, data_costs = [], []
+
+        for k in self._n_range:
+            node_costs.append(
+                cp_model.LinearExpr.Term(self.used[k], self.node(k).cost))
+
+        intra, inter = self.scenario.intrazone_cost, self.scenario.interzone_cost
+
+        # Per pair of microservices, the data cost of all container pairs is
+        #   inter * c1 * c2 - (inter - intra) * sum(zone products) - intra * sum(node products)
+        # scaled by data rate / (c1 * c2), same as the per-container model.
+        offset = 0
+        for i1, i2, rate in self.__pairs:
+            scale = rate / self.micro(i1).containers / self.micro(i2).containers
+            offset += rate * inter
+
+            for k in self._n_range:
+                if (i1, i2, k) in self.node_prod:
+                    data_costs.append(cp_model.LinearExpr.Term(self.node_prod[i1, i2, k], -scale * intra))
+
+            for z in range(len(self.__zones)):
+                if (i1, i2, z) in self.zone_prod:
+                    data_costs.append(cp_model.LinearExpr.Term(self.zone_prod[i1, i2, z], -scale * (inter - intra)))
+
+        nodecost = cp_model.LinearExpr.Sum(node_costs)
+        datacost = cp_model.LinearExpr.Sum(data_costs)
+
+        self.model.Minimize(nodecost + datacost + offset)
+
+        logging.debug('Objective is successfuly defined')
+
+    def _warm_start(self, counts):
+        for k in self._n_range:
+            for i in self._m_range:
+                self.model.AddHint(self.count[i, k], min(int(counts[k, i]), self.__ub[i, k]))
+
+        self.warm_start(counts)
+
+    def _count(self, i, k):
+        return self.count[i, k]
+
+    def node_terms(self, k):
+        return [(self.count[i, k], i) for i in self._m_range]
+
+    def read_mapping(self):
+        for k in self._n_range:
+            for i in self._m_range:
+                self.mapping[self.node(k).name][self.micro(i).name] += self.solver.Value(self.count[i, k])
+
+
+def ordered(sc, counts):
+    # same placement with the nodes of every class sorted by decreasing number of containers,
+    # the only order break_symmetry() admits
+    counts = counts.copy()
+    for nodes in sc.node_classes:
+        nodes = list(nodes)
+        counts[nodes] = counts[nodes][np.argsort(-counts[nodes].sum(axis=1), kind='stable')]
+    return counts
+
+
+class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    def __init__(self, record):
+        super().__init__()
+        self.record = record
+
+    def on_solution_callback(self):
+        cost, bound = self.ObjectiveValue(), self.BestObjectiveBound()
+        self.record(cost)
+        logging.info(f'CP-SAT incumbent at {self.WallTime():.2f}s: '
+                     f'cost {cost:.2f}, bound {bound:.2f}, gap {gap(cost, bound):.2%}')
+
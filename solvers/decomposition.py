@@ -0,0 +1,329 @@
+import logging
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+from multiprocessing import Pool
+
+from model.solver import Solver, NoSolutionError
+from model.trace import tracer
+from model.tracker import PlacementTracker
+
+
+class DecompositionSolver(Solver):
+    def __init__(self,
+                 scenario,
+                 subsolver,
+                 settings,
+                 parts=None,
+                 slack=3.0,
+                 time_limit=None,
+                 passes=10,
+                 initial=None,
+                 budget=None):
+
+        super().__init__(scenario)
+
+        if budget is not None:
+            raise ValueError('Decomposition does not support a migration budget')
+
+        sc = scenario.compiled
+
+        self.subsolver = subsolver
+        self.settings = settings
+        self.parts = parts or math.ceil(len(sc.micro_names) / 10)
+        self.slack = slack
+        self.time_limit = time_limit
+        self.passes = passes
+        self.initial = initial
+
+        self.position = None
+
+    def solve(self):
+        sc = self.scenario.compiled
+
+        with tracer.phase('partition'):
+            groups = partition(sc, self.parts)
+            node_groups = assign_nodes(sc, groups, self.slack)
+
+        logging.debug(f'Microservices split into {len(groups)} groups of sizes {[len(g) for g in groups]}, '
+                      f'nodes per group {[len(n) for n in node_groups]}')
+
+        jobs = []
+        for micros, nodes in zip(groups, node_groups):
+            subscenario = self.scenario.subset([sc.micro_names[i] for i in micros],
+                                               [sc.node_names[k] for k in nodes])
+            settings = dict(self.settings)
+            if self.initial is not None:
+                settings['initial'] = self.initial[np.ix_(nodes, micros)]
+            jobs.append((self.subsolver, subscenario, settings, random.getrandbits(64)))
+
+        processes = min(len(jobs), os.cpu_count())
+        for _, _, settings, _ in jobs:
+            # CP-SAT subproblems share the cores instead of each taking all of them
+            if 'workers' in settings and settings['workers'] is None:
+                settings['workers'] = max(1, os.cpu_count() // processes)
+            # every process solves its share of subproblems in 3/4 of the time, the rest is for refinement
+            if 'time_limit' in settings and self.time_limit is not None:
+                settings['time_limit'] = self.time_limit * 0.75 / math.ceil(len(jobs) / processes)
+
+        with Pool(processes) as pool, tracer.phase('subproblems'):
+            mappings = pool.starmap(solve_part, jobs)
+
+        if any(mapping is None for mapping in mappings):
+            with tracer.phase('retry'):
+                mappings = self.__retry(jobs, mappings, groups)
+
+        if any(mapping is None for mapping in mappings):
+            # a group that fails even with every free node may need nodes other groups took
+            logging.warning('Decomposition failed to solve a subproblem, solving the whole scenario')
+            with tracer.phase('fallback'):
+                settings = dict(jobs[0][2])
+                if self.initial is not None:
+                    settings['initial'] = self.initial
+                if 'time_limit' in settings and self.time_limit is not None:
+                    settings['time_limit'] = max(0.1, self.time_limit * 0.75 - (time.perf_counter() - self.started))
+                mapping = solve_part(self.subsolver, self.scenario, settings, random.getrandbits(64))
+            if mapping is None:
+                logging.error('Decomposition failed to solve the scenario')
+                return
+            mappings = [mapping]
+
+        position = self.__merge(mappings)
+
+        with tracer.phase('refine'):
+            self.__refine(position, groups)
+
+    def __retry(self, jobs, mappings, groups):
+        # failed groups, e.g. without a node big enough for one of their containers, are solved again
+        # one by one with every node the solved groups left unused
+        sc = self.scenario.compiled
+        mappings = list(mappings)
+        free = set(range(len(sc.node_names)))
+        for mapping in mappings:
+            free -= {sc.node_index[n] for n, micros in (mapping or {}).items() if any(micros.values())}
+
+        for g, mapping in enumerate(mappings):
+            if mapping is not None:
+                continue
+
+            nodes = sorted(free)
+            subscenario = self.scenario.subset([sc.micro_names[i] for i in groups[g]],
+                                               [sc.node_names[k] for k in nodes])
+            subsolver, _, settings, seed = jobs[g]
+            if self.initial is not None:
+                settings = settings | {'initial': self.initial[np.ix_(nodes, groups[g])]}
+
+            logging.debug(f'Retrying group {g} with {len(nodes)} free nodes')
+            mappings[g] = solve_part(subsolver, subscenario, settings, seed)
+            if mappings[g] is not None:
+                free -= {sc.node_index[n] for n, micros in mappings[g].items() if any(micros.values())}
+
+        return mappings
+
+    def __merge(self, mappings):
+        sc = self.scenario.compiled
+        nodes = {i: [] for i in range(len(sc.micro_names))}
+
+        for mapping in mappings:
+            for n, micros in mapping.items():
+                for m, num in micros.items():
+                    nodes[sc.micro_index[m]] += [sc.node_index[n]] * num
+
+        return [k for i in range(len(sc.micro_names)) for k in nodes[i]]
+
+    def __refine(self, position, groups):
+        # hill climbing: relocate containers of microservices communicating across groups,
+        # then try to close nodes by moving all their containers to other used nodes
+        sc = self.scenario.compiled
+        tracker = PlacementTracker(self.scenario, position)
+        self.cost = tracker.cost
+        self.record(self.cost)
+
+        group_of = {i: g for g, micros in enumerate(groups) for i in micros}
+        crossing = {i for p, c, _ in sc.edges if group_of[p] != group_of[c] for i in (p, c)}
+        containers = [c for c, i in enumerate(sc.cont_micro.tolist()) if i in crossing]
+
+        logging.debug(f'Merged cost {tracker.cost:.2f}, refining {len(containers)} containers '
+                      f'of {len(crossing)} microservices')
+
+        moves = 0
+        for _ in range(self.passes):
+            moved = 0
+            for c in containers:
+                if self.__timed_out():
+                    break
+                start = tracker.position[c]
+                if relocate(tracker, c) != start:
+                    moved += 1
+
+            for k in sorted(np.flatnonzero(tracker.cont).tolist(), key=lambda k: -sc.cost[k]):
+                if self.__timed_out():
+                    break
+                moved += close_node(tracker, k) or replace_node(tracker, k)
+
+            moves += moved
+            if tracker.cost < self.cost:
+                self.cost = tracker.cost
+                self.record(self.cost)
+            if not moved or self.__timed_out():
+                break
+
+        logging.debug(f'Refinement moved {moves} containers, cost {tracker.cost:.2f}')
+        tracer.count('refine_moves', moves)
+
+        self.position = tracker.position
+        self.cost = tracker.cost
+        self.tracker = tracker
+
+    def __timed_out(self):
+        return self.time_limit is not None and time.perf_counter() - self.started > self.time_limit
+
+    def solution(self):
+        if self.position is None:
+            raise NoSolutionError('Decomposition failed to find a solution.')
+
+        self.clear_mapping()
+        for n, micros in self.tracker.mapping().items():
+            for m, num in micros.items():
+                self.mapping[n][m] += num
+
+        return super().solution()
+
+
+def solve_part(subsolver, scenario, settings, seed):
+    random.seed(seed)
+    solver = subsolver(scenario, **settings)
+    solver.solve()
+
+    try:
+        solver.solution()
+    except NoSolutionError:
+        return None
+
+    return solver.mapping
+
+
+def relocate(tracker, c, exclude=None):
+    # moves a container to the used node where the placement is cheapest, returns that node
+    start = best_node = tracker.position[c]
+    best = tracker.cost if tracker.feasible else float('inf')
+
+    for k in [k for k, cont in enumerate(tracker.cont) if cont and k != start and k != exclude]:
+        cost, feasible = tracker.move(c, k)
+        if feasible and cost < best - 1e-9:
+            best, best_node = cost, k
+
+    tracker.move(c, best_node)
+    return best_node
+
+
+def close_node(tracker, k):
+    # moves every container off node k if that lowers the cost, returns the number of moved containers
+    others = [n for n, cont in enumerate(tracker.cont) if cont and n != k]
+    if not others:
+        return 0
+
+    before = tracker.cost
+    containers = [c for c, node in enumerate(tracker.position) if node == k]
+
+    for c in containers:
+        tracker.move(c, others[0])
+        relocate(tracker, c, exclude=k)
+
+    if tracker.feasible and tracker.cost < before - 1e-9:
+        return len(containers)
+
+    for c in containers:
+        tracker.move(c, k)
+    return 0
+
+
+def replace_node(tracker, k):
+    # moves every container of node k to the unused node where that is cheapest, if any is cheaper
+    sc = tracker.scenario.compiled
+    containers = [c for c, node in enumerate(tracker.position) if node == k]
+    best, best_node = tracker.cost, k
+
+    for n in np.flatnonzero((np.array(tracker.cont) == 0) & (sc.cost < sc.cost[k])).tolist():
+        if tracker.cpu[k] > sc.cpulim[n] or tracker.mem[k] > sc.memlim[n] or tracker.cont[k] > sc.contlim[n]:
+            continue
+
+        for c in containers:
+            tracker.move(c, n)
+        if tracker.feasible and tracker.cost < best - 1e-9:
+            best, best_node = tracker.cost, n
+        for c in containers:
+            tracker.move(c, k)
+
+    for c in containers:
+        tracker.move(c, best_node)
+    return len(containers) if best_node != k else 0
+
+
+def partition(sc, parts):
+    # heaviest communicating microservices are merged first, as long as groups stay balanced
+    demand = sc.containers * (sc.cpureq / sc.cpulim.sum() + sc.memreq / sc.memlim.sum())
+    cap = demand.sum() / parts * 1.1
+
+    weights = {}
+    for p, c, rate in sc.edges:
+        weights[min(p, c), max(p, c)] = weights.get((min(p, c), max(p, c)), 0) + rate
+
+    parent = list(range(len(demand)))
+    size = demand.tolist()
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for (a, b), _ in sorted(weights.items(), key=lambda e: -e[1]):
+        ra, rb = find(a), find(b)
+        if ra != rb and size[ra] + size[rb] <= cap:
+            parent[rb] = ra
+            size[ra] += size[rb]
+
+    components = {}
+    for i in range(len(demand)):
+        components.setdefault(find(i), []).append(i)
+
+    # largest components first, each into the least loaded group
+    groups, loads = [[] for _ in range(parts)], [0] * parts
+    for component in sorted(components.values(), key=lambda c: -size[find(c[0])]):
+        g = loads.index(min(loads))
+        groups[g] += component
+        loads[g] += size[find(component[0])]
+
+    return [sorted(group) for group in groups if group]
+
+
+def assign_nodes(sc, groups, slack):
+    # cheapest nodes per unit of capacity go to the group missing the most capacity,
+    # preferring groups that already have nodes in the same zone
+    need = np.array([[sc.containers[g] @ sc.cpureq[g], sc.containers[g] @ sc.memreq[g], sc.containers[g].sum()]
+                     for g in groups], dtype=float) * slack
+    have = np.zeros_like(need)
+    limits = np.stack([sc.cpulim, sc.memlim, sc.contlim], axis=1)
+
+    capacity = sc.cpulim / max(sc.cpulim.sum(), 1) + sc.memlim / max(sc.memlim.sum(), 1)
+    order = np.argsort(sc.cost / np.maximum(capacity, 1e-12), kind='stable')
+
+    nodes = [[] for _ in groups]
+    zones = [set() for _ in groups]
+    for k in order.tolist():
+        missing = np.max(np.maximum(need - have, 0) / np.maximum(need, 1), axis=1)
+        needy = np.flatnonzero(missing > 0).tolist()
+        if not needy:
+            break
+
+        g = max(needy, key=lambda g: (sc.zone[k] in zones[g], missing[g]))
+        nodes[g].append(k)
+        zones[g].add(sc.zone[k])
+        have[g] += limits[k]
+
+    return [sorted(n) for n in nodes]
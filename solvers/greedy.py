@@ -0,0 +1,235 @@
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+from model.bounds import lower_bound
+from model.solver import Solver, NoSolutionError
+from model.trace import tracer
+from model.tracker import PlacementTracker
+from model.warmstart import initial_position
+from solvers.decomposition import close_node, replace_node
+from solvers.pso import repair
+
+
+# latency budget of the local search when no time limit is given, in seconds
+DEFAULT_TIME_LIMIT = 0.5
+
+# fraction of the time limit the local search may spend descending before it anneals
+DESCENT_SHARE = 0.5
+
+
+class GreedySolver(Solver):
+    def __init__(self,
+                 scenario,
+                 fit='best',
+                 search=False,
+                 time_limit=None,
+                 temperature=0.05,
+                 initial=None,
+                 budget=None):
+
+        super().__init__(scenario)
+
+        if budget is not None:
+            raise ValueError('Greedy solvers do not support a migration budget')
+
+        self.fit = fit
+        self.search = search
+        self.time_limit = time_limit
+        # starting temperature relative to the cost of the constructed placement
+        self.temperature = temperature
+        self.initial = initial
+        self.bound = lower_bound(scenario)
+
+        self.tracker = None
+        self.position = None
+        self.moves = 0
+
+    def solve(self):
+        with tracer.phase('construct'):
+            if self.initial is not None:
+                self.tracker = PlacementTracker(self.scenario, repair(self.scenario, initial_position(self.scenario, self.initial)))
+            else:
+                self.tracker = self.__construct()
+
+        if not self.tracker.feasible or -1 in self.tracker.position:
+            logging.debug('Greedy construction failed to place every container')
+            return
+
+        self.position, self.cost = self.tracker.position[:], self.tracker.cost
+        self.record(self.cost)
+        logging.debug(f'Constructed placement of cost {self.cost:.2f} in {self.__elapsed() * 1000:.1f} ms')
+
+        with tracer.phase('descend'):
+            # plain greedy makes one pass, the local search descends further within its share of the time limit
+            self.__descend(1, self.__limit())
+            if self.search:
+                self.__descend(None, DESCENT_SHARE * self.__limit())
+
+        if self.search:
+            with tracer.phase('search'):
+                self.__anneal()
+
+            logging.debug(f'Local search evaluated {self.moves} moves, cost {self.cost:.2f}')
+            tracer.count('moves', self.moves)
+
+    def __construct(self):
+        sc = self.scenario.compiled
+        tracker = PlacementTracker(self.scenario, [])
+
+        # largest containers first, demand relative to the whole infrastructure
+        demand = sc.cpureq / max(sc.cpulim.sum(), 1) + sc.memreq / max(sc.memlim.sum(), 1)
+        micros = sorted(range(len(sc.micro_names)), key=lambda i: (-demand[i], i))
+
+        # demand of the containers that are not placed yet
+        remaining = np.array([sc.containers @ sc.cpureq, sc.containers @ sc.memreq, sc.containers.sum()], dtype=float)
+        limits = np.stack([sc.cpulim, sc.memlim, sc.contlim], axis=1).astype(float)
+        closed = np.ones(len(sc.node_names), dtype=bool)
+        opened = []
+
+        first = np.concatenate(([0], np.cumsum(sc.containers))).tolist()
+        limit, hurried = self.__limit(), False
+
+        for i in micros:
+            for c in range(first[i], first[i + 1]):
+                def fits(k):
+                    return tracker.cpu[k] + sc.cpureq[i] <= sc.cpulim[k] and \
+                        tracker.mem[k] + sc.memreq[i] <= sc.memlim[k] and \
+                        tracker.cont[k] < sc.contlim[k]
+
+                if not hurried and self.__elapsed() >= limit:
+                    # out of time, the containers left go to the last opened node while they fit (next fit),
+                    # nodes are opened in the order of their current score instead of scoring them each time
+                    hurried = True
+                    order = iter(self.__scores(sc, closed, limits, remaining).argsort().tolist())
+                    logging.debug(f'Time limit reached during construction, '
+                                  f'{tracker.position.count(-1)} containers are placed next fit')
+
+                if hurried:
+                    candidates = opened[-1:] if opened and fits(opened[-1]) else []
+                else:
+                    candidates = [k for k in opened if fits(k)]
+
+                if not candidates:
+                    k = next((k for k in order if closed[k] and fits(k)), None) if hurried else None
+                    if k is None:
+                        k = self.__open(sc, closed, limits, remaining, i)
+                    if k is None:
+                        return tracker
+                    closed[k] = False
+                    opened.append(k)
+                elif self.fit == 'first':
+                    # the node opened first among those with room left
+                    k = candidates[0]
+                else:
+                    k = min(candidates, key=lambda k: tracker.move(c, k)[0])
+
+                tracker.move(c, k)
+                remaining -= (sc.cpureq[i], sc.memreq[i], 1)
+
+        return tracker
+
+    @staticmethod
+    def __open(sc, closed, limits, remaining, i):
+        # node with the lowest cost per unit of capacity the remaining containers can use
+        fits = closed & (sc.cpulim >= sc.cpureq[i]) & (sc.memlim >= sc.memreq[i]) & (sc.contlim >= 1)
+        if not fits.any():
+            return None
+
+        score = np.where(fits, GreedySolver.__scores(sc, closed, limits, remaining), np.inf)
+        return int(np.argmin(score))
+
+    @staticmethod
+    def __scores(sc, closed, limits, remaining):
+        # cost per unit of capacity the remaining containers can use
+        usable = np.sum(np.minimum(limits, remaining) / np.maximum(remaining, 1), axis=1)
+        return sc.cost / np.maximum(usable, 1e-12)
+
+    def __descend(self, passes, limit):
+        # closes nodes or swaps them for cheaper ones while that lowers the cost,
+        # for at most the given number of passes over the used nodes and until limit seconds since the start
+        sc = self.scenario.compiled
+        improved = True
+        while improved and passes != 0 and self.__elapsed() < limit:
+            improved = False
+            passes = passes - 1 if passes is not None else None
+            for k in sorted(np.flatnonzero(self.tracker.cont).tolist(), key=lambda k: -sc.cost[k]):
+                if self.__elapsed() >= limit:
+                    break
+                if close_node(self.tracker, k) or replace_node(self.tracker, k):
+                    improved = True
+
+        if self.tracker.cost < self.cost - 1e-9:
+            self.position, self.cost = self.tracker.position[:], self.tracker.cost
+            self.record(self.cost)
+
+    def __anneal(self):
+        # simulated annealing over relocations and swaps until the time limit
+        sc = self.scenario.compiled
+        tracker = self.tracker
+        cont_micro = sc.cont_micro.tolist()
+        n_len, c_len = len(sc.node_names), len(cont_micro)
+        if not c_len:
+            return
+
+        start, limit = self.__elapsed(), self.__limit()
+        t0 = max(self.temperature * self.cost, 1e-9)
+        temperature = t0
+
+        while True:
+            if self.moves % 64 == 0:
+                progress = (self.__elapsed() - start) / max(limit - start, 1e-9)
+                if progress >= 1:
+                    break
+                temperature = t0 * (1e-4 ** progress)
+
+            self.moves += 1
+            before = tracker.cost
+            c1 = random.randrange(c_len)
+            k1 = tracker.position[c1]
+
+            if random.random() < 0.5:
+                # relocation, mostly to nodes that are already paid for
+                used = tracker.position[random.randrange(c_len)]
+                k2 = used if random.random() < 0.9 else random.randrange(n_len)
+                cost, feasible = tracker.move(c1, k2)
+                undo = ((c1, k1),)
+            else:
+                c2 = random.randrange(c_len)
+                k2 = tracker.position[c2]
+                if cont_micro[c1] == cont_micro[c2] or k1 == k2:
+                    continue
+                cost, feasible = tracker.swap(c1, c2)
+                undo = ((c1, k1), (c2, k2))
+
+            delta = cost - before
+            if not feasible or (delta > 0 and random.random() >= math.exp(-delta / temperature)):
+                for c, k in undo:
+                    tracker.move(c, k)
+                continue
+
+            if cost < self.cost - 1e-9:
+                self.position, self.cost = tracker.position[:], cost
+                self.record(cost)
+
+    def __elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __limit(self):
+        return self.time_limit if self.time_limit is not None else DEFAULT_TIME_LIMIT
+
+    def solution(self):
+        if self.position is None:
+            logging.error('Greedy construction failed to find a solution')
+            raise NoSolutionError('Greedy construction failed to find a solution.')
+
+        self.clear_mapping()
+        for c, k in enumerate(self.position):
+            n = self.scenario.nodes_tpl[k]
+            m = self.scenario.micros_tpl[self.scenario.compiled.cont_micro[c]]
+            self.mapping[n][m] += 1
+
+        return super().solution()
@@ -0,0 +1,220 @@
+import logging
+import multiprocessing
+import queue
+import random
+import time
+
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from model.bounds import lower_bound
+from model.solver import Solver, NoSolutionError
+from model.trace import tracer
+from model.warmstart import initial_position
+from solvers.cpsat import CPSATSolver, IncumbentCallback
+from solvers.pso import PSOSolver, counts
+from solvers.vpso import VectorizedPSOSolver
+
+
+# deadline of the whole portfolio when no time limit is given, in seconds
+DEFAULT_TIME_LIMIT = 10.0
+
+# seconds members get past the deadline to hand over their last placement before they are killed
+GRACE = 2.0
+
+
+class PortfolioSolver(Solver):
+    def __init__(self,
+                 scenario,
+                 members,
+                 time_limit=None,
+                 initial=None,
+                 budget=None):
+
+        super().__init__(scenario)
+
+        if budget is not None:
+            raise ValueError('Portfolio does not support a migration budget')
+
+        # (name, solver class, settings) of every solver run side by side
+        self.members = members
+        self.time_limit = time_limit if time_limit is not None else DEFAULT_TIME_LIMIT
+        self.initial = initial
+        self.bound = lower_bound(scenario)
+
+        self.counts = None
+        self.winner = None
+
+    def solve(self):
+        sc = self.scenario.compiled
+        incumbent = Incumbent(len(sc.node_names), len(sc.micro_names))
+        deadline = time.time() + self.time_limit
+
+        processes = [multiprocessing.Process(target=run_member,
+                                             args=(m, name, solver, settings, self.scenario, self.initial,
+                                                   incumbent, deadline, random.getrandbits(64)))
+                     for m, (name, solver, settings) in enumerate(self.members)]
+
+        with tracer.phase('search'):
+            for process in processes:
+                process.start()
+
+            while any(process.is_alive() for process in processes) and time.time() < deadline + GRACE:
+                self.__collect(incumbent, 0.1)
+
+            for process in processes:
+                if process.is_alive():
+                    logging.warning(f'Portfolio member {self.members[processes.index(process)][0]} '
+                                    f'missed the deadline')
+                    process.terminate()
+                process.join()
+
+            self.__collect(incumbent, 0)
+
+        cost, self.counts, member = incumbent.get()[:3]
+        if self.counts is not None:
+            self.cost = cost
+            self.winner = self.members[member][0]
+            logging.debug(f'Portfolio best cost {cost:.2f} found by {self.winner}')
+            tracer.event('winner', member=self.winner)
+
+    def __collect(self, incumbent, timeout):
+        # improvements are reported by the members as they happen
+        try:
+            while True:
+                cost, member = incumbent.improvements.get(timeout=timeout)
+                if cost < self.cost:
+                    self.cost = cost
+                    self.record(cost)
+                    logging.info(f'Portfolio incumbent from {self.members[member][0]}: cost {cost:.2f}')
+        except queue.Empty:
+            pass
+
+    def solution(self):
+        if self.counts is None:
+            logging.error('Portfolio failed to find a solution')
+            raise NoSolutionError('Portfolio failed to find a solution.')
+
+        self.clear_mapping()
+        sc = self.scenario.compiled
+        for k, i in zip(*np.nonzero(self.counts)):
+            self.mapping[sc.node_names[k]][sc.micro_names[i]] += int(self.counts[k, i])
+
+        return super().solution()
+
+
+class Incumbent:
+    # best placement known to any member, shared between processes
+    def __init__(self, nodes, micros):
+        self.lock = multiprocessing.Lock()
+        self.cost = multiprocessing.RawValue('d', float('inf'))
+        self.member = multiprocessing.RawValue('i', -1)
+        self.version = multiprocessing.RawValue('i', 0)
+        self.counts = multiprocessing.RawArray('q', nodes * micros)
+        self.shape = (nodes, micros)
+        self.improvements = multiprocessing.Queue()
+
+    def offer(self, counts, cost, member):
+        with self.lock:
+            if cost >= self.cost.value - 1e-9:
+                return False
+            self.cost.value, self.member.value = cost, member
+            self.version.value += 1
+            np.frombuffer(self.counts, dtype=np.int64)[:] = counts.reshape(-1)
+
+        self.improvements.put((cost, member))
+        return True
+
+    def get(self):
+        # cost, counts, member and version; counts are None until some member offered a placement
+        with self.lock:
+            if self.member.value < 0:
+                return float('inf'), None, -1, 0
+            counts = np.frombuffer(self.counts, dtype=np.int64).reshape(self.shape).copy()
+            return self.cost.value, counts, self.member.value, self.version.value
+
+
+def run_member(member, name, solver_class, settings, scenario, initial, incumbent, deadline, seed):
+    random.seed(seed)
+    remaining = deadline - time.time()
+
+    try:
+        if issubclass(solver_class, CPSATSolver):
+            solver = solver_class(scenario, **settings | {'time_limit': None}, initial=initial)
+            search_cpsat(solver, member, incumbent, deadline)
+        elif issubclass(solver_class, (PSOSolver, VectorizedPSOSolver)):
+            solver = solver_class(scenario, **settings | {'time_limit': remaining}, initial=initial)
+            search_pso(solver, member, incumbent)
+        else:
+            solver = solver_class(scenario, **settings | ({'time_limit': remaining} if 'time_limit' in settings else {}),
+                                  initial=initial)
+            solver.solve()
+            offer(scenario, solver, member, incumbent)
+    except Exception:
+        logging.exception(f'Portfolio member {name} failed')
+
+
+def offer(scenario, solver, member, incumbent):
+    # placements are compared on the scenario cost, as solver objectives differ
+    try:
+        mapping = solver.solution().mapping
+    except NoSolutionError:
+        return
+    placement = scenario.compiled.counts(mapping)
+    incumbent.offer(placement, scenario.compiled.cost_of(placement), member)
+
+
+def search_pso(solver, member, incumbent):
+    # better placements of other members replace the worst particle between iterations
+    sc = solver.scenario.compiled
+    version = 0
+
+    for i in range(solver.iterations):
+        solver.step(i)
+
+        if solver.cost < (solver.penalty or float('inf')):
+            placement = counts(solver.scenario, solver.position)
+            incumbent.offer(placement, sc.cost_of(placement), member)
+
+        cost, placement, _, latest = incumbent.get()
+        if latest != version and cost < solver.cost - 1e-9:
+            solver.migrate(initial_position(solver.scenario, placement), cost)
+        version = latest
+
+        if solver.stopping.stop(solver, i):
+            break
+
+
+def search_cpsat(solver, member, incumbent, deadline):
+    # CP-SAT cannot take a solution during a search, so it runs in slices of doubling length,
+    # each hinted with the best placement known when it starts
+    sc = solver.scenario.compiled
+    solver.build()
+    length, version = 1.0, 0
+
+    while (remaining := deadline - time.time()) > 0:
+        cost, placement, _, latest = incumbent.get()
+        if latest != version:
+            solver.hint(placement)
+            version = latest
+
+        solver.solver.parameters.max_time_in_seconds = min(length, remaining)
+        solver.status = solver.solver.Solve(solver.model, IncumbentCallback(solver.record))
+        if solver.status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            if solver.status == cp_model.INFEASIBLE:
+                break
+            length *= 2
+            continue
+
+        solver.clear_mapping()
+        solver.read_mapping()
+        placement = sc.counts(solver.mapping)
+        if incumbent.offer(placement, sc.cost_of(placement), member):
+            version = incumbent.get()[3]
+        solver.hint(placement)
+
+        # an optimum of the CP-SAT objective is final, even where it differs from the scenario cost
+        if solver.status == cp_model.OPTIMAL:
+            break
+        length *= 2
@@ -1,28 +1,62 @@
 import logging
+import os
 import random
+import time
 
-from model.solver import Solver, NoSolutionError
+import numpy as np
 
+from multiprocessing import Pool
 
-class PSOSolver(Solver):
-    def solve(self):
-        for i in range(self.iterations):
-            for particle in self.particles:
-                for dim in range(self.scenario.conts):
-                    particle.velocity[dim], particle.position[dim] = self.__update_particle(particle, dim)
+from model.bounds import lower_bound, gap
+from model.solver import Solver, NoSolutionError
+from model.trace import tracer
+from model.warmstart import initial_position
 
-                particle.cost = objective(self.scenario, particle.position)
 
-                if particle.cost < particle.best_cost:
-                    particle.best_position = particle.position[:]
-                    particle.best_cost = particle.cost
+# fraction of the swarm started around an initial placement
+WARM_SHARE = 0.25
 
-                    if particle.best_cost < self.cost:
-                        logging.debug(f"Swarm's best position updated at iteration {i}/{self.iterations}")
-                        self.position = particle.best_position[:]
-                        self.cost = particle.best_cost
 
-        logging.debug('Finished solving')
+class PSOSolver(Solver):
+    def solve(self):
+        with tracer.phase('search'):
+            for i in range(self.iterations):
+                self.step(i)
+                if self.stopping.stop(self, i):
+                    break
+
+        logging.debug(f'Finished solving: {self.evaluations} evaluations, {self.infeasible} infeasible')
+        self.stopping.log(self)
+        tracer.count('evaluations', self.evaluations)
+        tracer.count('infeasible_evaluations', self.infeasible)
+        log_cache(self.cache)
+
+    def step(self, i):
+        for particle in self.particles:
+            for dim in range(self.scenario.conts):
+                particle.velocity[dim], particle.position[dim] = self.__update_particle(particle, dim)
+
+            particle.cost = self.evaluate(particle.position)
+
+            if particle.cost < particle.best_cost:
+                particle.best_position = particle.position[:]
+                particle.best_cost = particle.cost
+
+                if particle.best_cost < self.cost:
+                    logging.debug(f"Swarm's best position updated at iteration {i}/{self.iterations}")
+                    self.position = particle.best_position[:]
+                    self.cost = particle.best_cost
+                    self.record(self.cost)
+
+    def migrate(self, position, cost):
+        # immigrant replaces the particle with the worst personal best
+        particle = max(self.particles, key=lambda p: p.best_cost)
+        particle.position, particle.best_position = position[:], position[:]
+        particle.cost, particle.best_cost = cost, cost
+
+        if cost < self.cost:
+            self.position = position[:]
+            self.cost = cost
 
     def __update_particle(self, part, dim):
         r1, r2 = random.random(), random.random()
@@ -35,12 +69,26 @@ class PSOSolver(Solver):
 
         return self.handle_boundary(dim_velocity, dim_position, len(self.scenario.nodes) - 1)
 
+    def evaluate(self, position):
+        if self.repair:
+            position[:] = repair(self.scenario, position)
+        if self.symmetry:
+            position[:] = canonical(self.scenario, position)
+
+        cost = objective(self.scenario, position, self.penalty, self.initial, self.budget, self.cache)
+
+        self.evaluations += 1
+        self.infeasible += cost >= (self.penalty or float('inf'))
+
+        return cost
+
     def solution(self):
-        if self.cost == float('inf'):
+        if self.cost >= (self.penalty or float('inf')):
             logging.error('Particle Swarm Optimization failed to find a solution')
             raise NoSolutionError(
                 'Particle Swarm Optimization failed to find a solution.')
 
+        self.clear_mapping()
         c = 0
         for m, micro in self.scenario.micros.items():
             for _ in range(micro.containers):
@@ -59,7 +107,17 @@ class PSOSolver(Solver):
                  social,
                  random_init_position,
                  zero_init_velocity,
-                 boundary_handling):
+                 boundary_handling,
+                 repair=False,
+                 penalty=False,
+                 initial=None,
+                 budget=None,
+                 symmetry=False,
+                 cache=None,
+                 time_limit=None,
+                 stagnation=None,
+                 target_gap=None,
+                 max_evaluations=None):
 
         super().__init__(scenario)
 
@@ -73,20 +131,37 @@ class PSOSolver(Solver):
         self.cognitive = cognitive
         self.social = social
         self.handle_boundary = handling_methods[boundary_handling]
+        self.repair = repair
+        # infeasible positions cost more than the most expensive feasible placement
+        self.penalty = scenario.compiled.max_cost() + 1 if penalty else None
+        self.initial = initial
+        self.budget = budget
+        # interchangeable nodes are not told apart once the placement has to stay close to an initial one
+        self.symmetry = symmetry and initial is None
+        self.cache = cache
+        self.stopping = Stopping(scenario, time_limit, stagnation, target_gap, max_evaluations)
+        self.bound = self.stopping.bound
 
         self.position = None
+        self.evaluations, self.infeasible = 0, 0
 
         logging.debug('Starting solving')
 
+        positions = warm_positions(scenario, initial, particles) if initial is not None else []
+        positions += [None] * (particles - len(positions))
+
         self.particles = [Particle(scenario,
                                    random_init_position,
-                                   zero_init_velocity) for _ in range(particles)]
+                                   zero_init_velocity,
+                                   self.evaluate,
+                                   position) for position in positions]
 
         best_particle = min(self.particles, key = lambda p: p.best_cost)
 
         if best_particle.best_cost < self.cost:
             self.position = best_particle.best_position[:]
             self.cost = best_particle.best_cost
+            self.record(self.cost)
 
         if self.position is None:
             logging.info('No viable solutions were generated on init')
@@ -110,19 +185,215 @@ class PSOSolver(Solver):
         return vel, pos
 
 
+class IslandPSOSolver(Solver):
+    def solve(self):
+        processes = min(len(self.islands), os.cpu_count())
+
+        with Pool(processes) as pool, tracer.phase('search'):
+            for start in range(0, self.iterations, self.migration_interval):
+                stop = min(start + self.migration_interval, self.iterations)
+                self.islands = pool.starmap(Island.evolve, [(island, start, stop) for island in self.islands])
+
+                cost = min(island.solver.cost for island in self.islands)
+                if cost < self.cost:
+                    self.cost = cost
+                    self.record(cost)
+                self.evaluations = sum(island.solver.evaluations for island in self.islands)
+
+                # stopping rules are checked between epochs, every epoch being one step of the archipelago
+                if self.stopping.stop(self, stop - 1):
+                    break
+
+                if stop < self.iterations:
+                    self.__migrate()
+                self.__share_cache()
+
+        self.best = min(self.islands, key=lambda island: island.solver.cost).solver
+        self.position, self.cost = self.best.position, self.best.cost
+        self.infeasible = sum(island.solver.infeasible for island in self.islands)
+        self.stopping.log(self)
+
+        tracer.count('evaluations', self.evaluations)
+        tracer.count('infeasible_evaluations', self.infeasible)
+        log_cache(self.cache)
+
+        logging.debug('Finished solving')
+
+    def __migrate(self):
+        # ring topology: every island receives the best position of its predecessor
+        bests = [(island.solver.position, island.solver.cost) for island in self.islands]
+
+        for island, (position, cost) in zip(self.islands, bests[-1:] + bests[:-1]):
+            if cost < float('inf'):
+                island.solver.migrate(position, cost)
+
+        logging.debug(f'Islands exchanged best positions, costs: {[round(c, 2) for _, c in bests]}')
+
+    def __share_cache(self):
+        # every island receives the evaluations the other islands made during the last epoch
+        if self.cache is None:
+            return
+
+        if any(island.solver is None for island in self.islands):
+            for island in self.islands:
+                island.settings['cache'] = self.cache.fork()
+            return
+
+        fresh = [self.cache.merge(island.solver.cache) for island in self.islands]
+        for i, island in enumerate(self.islands):
+            for j, entries in enumerate(fresh):
+                if i != j:
+                    island.solver.cache.add(entries)
+
+    def solution(self):
+        self.best.solution()
+        self.mapping = self.best.mapping
+        return super().solution()
+
+    def __init__(self,
+                 scenario,
+                 islands,
+                 migration_interval,
+                 particles,
+                 iterations,
+                 inertia,
+                 cognitive,
+                 social,
+                 random_init_position,
+                 zero_init_velocity,
+                 boundary_handling,
+                 repair=False,
+                 penalty=False,
+                 initial=None,
+                 budget=None,
+                 symmetry=False,
+                 cache=None,
+                 time_limit=None,
+                 stagnation=None,
+                 target_gap=None,
+                 max_evaluations=None,
+                 island_params=None,
+                 vectorized=False):
+
+        super().__init__(scenario)
+
+        self.iterations = iterations
+        self.migration_interval = migration_interval
+        self.stopping = Stopping(scenario, time_limit, stagnation, target_gap, max_evaluations)
+        self.bound = self.stopping.bound
+        self.evaluations = 0
+
+        settings = {'particles': particles,
+                    'iterations': iterations,
+                    'inertia': inertia,
+                    'cognitive': cognitive,
+                    'social': social,
+                    'random_init_position': random_init_position,
+                    'zero_init_velocity': zero_init_velocity,
+                    'boundary_handling': boundary_handling,
+                    'repair': repair,
+                    'penalty': penalty,
+                    'initial': initial,
+                    'budget': budget,
+                    'symmetry': symmetry}
+        island_params = island_params or [{}]
+
+        # island seeds are drawn from the global generator so that --seed covers all islands
+        self.islands = [Island(scenario,
+                               settings | island_params[i % len(island_params)],
+                               random.getrandbits(64),
+                               vectorized) for i in range(islands)]
+
+        self.cache = cache
+        self.__share_cache()
+
+        self.position = None
+
+
+class Stopping:
+    def __init__(self, scenario, time_limit=None, stagnation=None, target_gap=None, max_evaluations=None):
+        self.time_limit = time_limit
+        self.stagnation = stagnation
+        self.target_gap = target_gap
+        self.max_evaluations = max_evaluations
+        self.bound = lower_bound(scenario)
+
+        self.best, self.improved = float('inf'), 0
+        self.reason = None
+
+    def stop(self, solver, i):
+        # reason to end the search after iteration i, None to go on
+        if solver.cost < self.best:
+            self.best, self.improved = solver.cost, i
+
+        elapsed = time.perf_counter() - solver.started
+        achieved = gap(solver.cost, self.bound)
+
+        if self.target_gap is not None and achieved is not None and achieved <= self.target_gap:
+            self.reason = f'gap {achieved:.2%} reached the target'
+        elif self.stagnation is not None and i - self.improved >= self.stagnation:
+            self.reason = f'no improvement for {i - self.improved} iterations'
+        elif self.time_limit is not None and elapsed >= self.time_limit:
+            self.reason = f'time limit of {self.time_limit}s reached'
+        elif self.max_evaluations is not None and solver.evaluations >= self.max_evaluations:
+            self.reason = f'{solver.evaluations} evaluations done'
+
+        if self.reason is not None:
+            logging.debug(f'Stopping at iteration {i}: {self.reason}')
+            tracer.event('stop', iteration=i, reason=self.reason)
+        return self.reason is not None
+
+    def log(self, solver):
+        achieved = gap(solver.cost, self.bound)
+        if achieved is not None:
+            logging.info(f'Best cost {solver.cost:.2f}, lower bound {self.bound:.2f}, gap {achieved:.2%}')
+
+
+class Island:
+    def __init__(self, scenario, settings, seed, vectorized):
+        self.scenario = scenario
+        self.settings = settings
+        self.vectorized = vectorized
+        self.random_state = random.Random(seed).getstate()
+        self.solver = None
+
+    def evolve(self, start, stop):
+        random.setstate(self.random_state)
+
+        if self.solver is None:
+            self.solver = self.__solver_class()(self.scenario, **self.settings)
+
+        for i in range(start, stop):
+            self.solver.step(i)
+
+        self.random_state = random.getstate()
+        return self
+
+    def __solver_class(self):
+        if self.vectorized:
+            # imported here as solvers.vpso depends on this module
+            from solvers.vpso import VectorizedPSOSolver
+            return VectorizedPSOSolver
+        return PSOSolver
+
+
 class Particle:
-    def __init__(self, scenario, random_init_position, zero_init_velocity):
+    def __init__(self, scenario, random_init_position, zero_init_velocity, evaluate, position=None):
         n_len = len(scenario.nodes)
         c_len = scenario.conts
 
-        self.velocity = [0] * c_len if zero_init_velocity else \
+        # particles seeded with a position always get moving, otherwise they stay on it
+        self.velocity = [0] * c_len if zero_init_velocity and position is None else \
                         random.choices(range(-n_len + 1, n_len), k=c_len)
 
-        self.position = Particle.random_position(n_len, c_len) if random_init_position \
-                        else Particle.viable_position(scenario)
+        if position is not None:
+            self.position = position
+        else:
+            self.position = Particle.random_position(n_len, c_len) if random_init_position \
+                            else Particle.viable_position(scenario)
         self.best_position = self.position
 
-        self.cost = objective(scenario, self.position)
+        self.cost = evaluate(self.position)
         self.best_cost = self.cost
 
     @staticmethod
@@ -160,24 +431,143 @@ class Particle:
         return position
 
 
-def objective(scenario, position):
-    mapping = {n: {m: 0 for m in scenario.micros} for n in scenario.nodes}
+def repair(scenario, position):
+    # usage is kept in local arrays, so that evaluations never touch the scenario's nodes
+    sc = scenario.compiled
+    nodes = np.asarray(position)
+    if nodes.min(initial=0) >= 0:
+        micros = sc.cont_micro
+        n_len = len(sc.node_names)
+        if (np.bincount(nodes, sc.cpureq[micros], n_len) <= sc.cpulim).all() and \
+                (np.bincount(nodes, sc.memreq[micros], n_len) <= sc.memlim).all() and \
+                (np.bincount(nodes, minlength=n_len) <= sc.contlim).all():
+            return position
+
+    cpureq, memreq = sc.cpureq.tolist(), sc.memreq.tolist()
+    cpulim, memlim, contlim = sc.cpulim.tolist(), sc.memlim.tolist(), sc.contlim.tolist()
+    cont_micro = sc.cont_micro.tolist()
+    cpu, mem, cont = [0] * len(cpulim), [0] * len(cpulim), [0] * len(cpulim)
+
+    def fits(k, i):
+        return cpu[k] + cpureq[i] <= cpulim[k] and mem[k] + memreq[i] <= memlim[k] and cont[k] + 1 <= contlim[k]
+
+    def add(k, i):
+        cpu[k] += cpureq[i]
+        mem[k] += memreq[i]
+        cont[k] += 1
+
+    overflowing = []
+    for c, k in enumerate(position):
+        if k >= 0 and fits(k, cont_micro[c]):
+            add(k, cont_micro[c])
+        else:
+            overflowing.append(c)
+
+    if not overflowing:
+        return position
+
+    repaired = list(position)
+    by_cost = np.argsort(sc.cost, kind='stable').tolist()
+
+    for c in overflowing:
+        i = cont_micro[c]
+
+        # nodes that are already paid for come first, then the cheapest unused ones
+        k = next((k for k in by_cost if cont[k] and fits(k, i)), None)
+        if k is None:
+            fallback = repaired[c] if repaired[c] >= 0 else by_cost[0]
+            k = next((k for k in by_cost if fits(k, i)), fallback)
+
+        repaired[c] = k
+        add(k, i)
+
+    return repaired
+
+
+def warm_positions(scenario, initial, particles):
+    # positions of the seeded part of the swarm: the first keeps the initial placement, the others relocate
+    # ~10% of containers; the rest of the swarm starts as without an initial placement and keeps exploring
+    n_len = len(scenario.nodes)
+    position = repair(scenario, initial_position(scenario, initial))
+
+    seeded = max(1, round(particles * WARM_SHARE))
+    return [position] + [repair(scenario, [random.randrange(n_len) if random.random() < 0.1 else k for k in position])
+                         for _ in range(seeded - 1)]
+
+
+def log_cache(cache):
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    logging.debug(f'Objective cache: {stats["hits"]} hits, {stats["misses"]} misses, {stats["size"]} entries')
+    tracer.count('cache_hits', stats['hits'])
+    tracer.count('cache_misses', stats['misses'])
+
+
+def canonical(scenario, position):
+    # nodes of every class are relabeled in the order of their first use, so that placements
+    # differing only by a permutation of interchangeable nodes get the same position
+    sc = scenario.compiled
+    if len(sc.node_classes) == len(sc.node_names):
+        return position
+
+    relabel, used = {}, {}
+    for k in position:
+        if k not in relabel:
+            c = sc.node_class[k]
+            relabel[k] = sc.node_classes[c][used.get(c, 0)]
+            used[c] = used.get(c, 0) + 1
+
+    return [relabel[k] for k in position]
+
+
+def counts(scenario, position):
+    sc = scenario.compiled
+    res = np.zeros((len(sc.node_names), len(sc.micro_names)), dtype=np.int64)
+    np.add.at(res, (np.asarray(position), sc.cont_micro), 1)
+    return res
+
+
+def violation(sc, counts, initial=None, budget=None):
+    # overflow of every node limit and of the migration budget, relative to the limit
+    return overflow(sc, counts @ sc.cpureq, counts @ sc.memreq, counts.sum(axis=-1)) + \
+        overrun(counts, initial, budget)
+
+
+def overflow(sc, cpu, mem, cont):
+    # CPU, memory and containers taken on every node beyond its limits, relative to the limit
+    def excess(load, lim):
+        return np.maximum(load - lim, 0) / np.maximum(lim, 1)
+
+    return np.sum(excess(cpu, sc.cpulim) + excess(mem, sc.memlim) + excess(cont, sc.contlim), axis=-1)
+
 
-    c = 0
-    for m in scenario.micros_tpl:
-        micro = scenario.micros[m]
-        for _ in range(micro.containers):
-            n = scenario.nodes_tpl[position[c]]
-            node = scenario.nodes[n]
+def overrun(counts, initial, budget):
+    # containers moved off their initial node beyond the migration budget, relative to the budget
+    if initial is None or budget is None:
+        return 0
+    return np.maximum(np.maximum(initial - counts, 0).sum(axis=(-2, -1)) - budget, 0) / max(budget, 1)
 
-            if not node.fits(micro):
-                scenario.reset_nodes()
-                return float('inf')
 
-            node.add(micro, 1)
-            mapping[n][m] += 1
-            c += 1
+def objective(scenario, position, penalty=None, initial=None, budget=None, cache=None):
+    sc = scenario.compiled
+    placement = counts(scenario, position)
 
-    scenario.reset_nodes()
+    if cache is not None:
+        key = cache.key(placement)
+        value = cache.get(key)
+        if value is None:
+            value = (float(violation(sc, placement)), sc.cost_of(placement))
+            cache.put(key, value)
+        excess = value[0] + overrun(placement, initial, budget)
+        cost = value[1]
+    else:
+        excess = violation(sc, placement, initial, budget)
+        cost = sc.cost_of(placement) if not excess or penalty is not None else None
 
-    return scenario.cost(mapping)
+    if not excess:
+        return cost
+    if penalty is None:
+        return float('inf')
+    return penalty * (1 + excess) + cost
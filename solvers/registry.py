@@ -0,0 +1,205 @@
+import importlib
+import logging
+
+from importlib.metadata import entry_points
+
+from model.profiles import DEFAULT_PSO
+
+
+# entry point group of solvers provided by other packages, each entry point names a SolverSpec
+ENTRY_POINTS = 'container_placement.solvers'
+
+
+class Param:
+    def __init__(self, default=None, type=None, help='', choices=None, arg=None):
+        self.default = default
+        self.type = type or (default.__class__ if default is not None else str)
+        self.help = help
+        self.choices = choices
+        self.arg = arg  # solver constructor argument, when named differently
+
+    def parse(self, text):
+        # value given as text on the command line
+        if self.type is bool:
+            if text.lower() not in ('1', 'true', 'yes', 'on', '0', 'false', 'no', 'off'):
+                raise ValueError(f'"{text}" is not a boolean')
+            return text.lower() in ('1', 'true', 'yes', 'on')
+        if self.type is tuple:
+            return tuple(text.split(','))
+        return self.type(text)
+
+    def check(self, name, value):
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f'Invalid {name} "{value}", expected one of {", ".join(map(str, self.choices))}')
+        return value
+
+
+class SolverSpec:
+    # a solver by name: where its class lives, the parameters it takes and their defaults;
+    # the class is imported only when the solver is made
+    def __init__(self, name, target, description='', params=None, fixed=None, prepare=None):
+        self.name = name
+        self.target = target  # "module:Class"
+        self.description = description
+        self.params = params or {}
+        self.fixed = fixed or {}  # constructor arguments that are not parameters
+        self.prepare = prepare  # completes the constructor arguments, e.g. with other solvers
+
+    def load(self):
+        module, _, name = self.target.partition(':')
+        return getattr(importlib.import_module(module), name)
+
+    def settings(self, options):
+        # constructor arguments from the given options, defaults for the rest
+        settings = dict(self.fixed)
+        for name, param in self.params.items():
+            value = options.get(name)
+            settings[param.arg or name] = param.check(name, value) if value is not None else param.default
+        if self.prepare is not None:
+            self.prepare(settings, options)
+        return settings
+
+
+def decomposition(settings, options):
+    name = settings['subsolver']
+    if name not in SUBSOLVERS:
+        raise ValueError(f'Invalid subsolver "{name}", expected one of {", ".join(SUBSOLVERS)}')
+    settings['subsolver'] = SOLVERS[name].load()
+    # objective caches are tied to a scenario, subproblems are different scenarios
+    settings['settings'] = {k: v for k, v in SOLVERS[name].settings(options).items() if k != 'cache'}
+
+
+def portfolio(settings, options):
+    if unknown := [name for name in settings['members'] if name not in members()]:
+        raise ValueError(f'Unknown portfolio members: {", ".join(unknown)}')
+    # objective caches stay in the process that made them, members run in processes of their own
+    settings['members'] = [(name, SOLVERS[name].load(),
+                            {k: v for k, v in SOLVERS[name].settings(options).items() if k != 'cache'})
+                           for name in settings['members']]
+
+
+TIME_LIMIT = Param(None, float, 'wall-clock limit for the search in seconds')
+
+CPSAT = {
+    'time_limit': TIME_LIMIT,
+    'workers': Param(None, int, 'number of parallel search workers'),
+    'symmetry': Param(True, help='order interchangeable nodes')
+}
+
+PSO = {
+    'particles': Param(DEFAULT_PSO['particles'], help='swarm size'),
+    'iterations': Param(DEFAULT_PSO['iterations'], help='number of iterations'),
+    'inertia': Param(DEFAULT_PSO['inertia'], help='inertia weight'),
+    'cognitive': Param(DEFAULT_PSO['cognitive'], help='cognitive coefficient'),
+    'social': Param(DEFAULT_PSO['social'], help='social coefficient'),
+    'boundary_handling': Param(DEFAULT_PSO['boundary_handling'], help='positions leaving the search space',
+                               choices=('absorbing', 'reflecting')),
+    'repair': Param(False, help='move containers off overflowing nodes before evaluation'),
+    'penalty': Param(False, help='grade infeasible positions by violation instead of discarding them'),
+    'canonical': Param(False, help='relabel interchangeable nodes in the order of first use', arg='symmetry'),
+    'cache': Param(None, object, 'objective cache'),
+    'time_limit': TIME_LIMIT,
+    'stagnation': Param(None, int, 'stop after this many iterations without improvement'),
+    'target_gap': Param(None, float, 'stop once the cost is within this fraction of the lower bound'),
+    'max_evaluations': Param(None, int, 'stop after this many objective evaluations')
+}
+
+GREEDY = {
+    'fit': Param('best', help='first open node with room or cheapest placement',
+                 choices=('first', 'best')),
+    'time_limit': TIME_LIMIT
+}
+
+BUILTIN = (
+    SolverSpec('cpsat', 'solvers.cpsat:CPSATSolver', 'CP-SAT with a variable per container', CPSAT),
+    SolverSpec('cpsat-agg', 'solvers.cpsat:AggregatedCPSATSolver',
+               'CP-SAT with a variable per microservice and node', CPSAT),
+    SolverSpec('pso', 'solvers.pso:PSOSolver', 'PSO', PSO,
+               {'random_init_position': True, 'zero_init_velocity': False}),
+    SolverSpec('mpso', 'solvers.pso:PSOSolver', 'PSO starting from a cheap placement', PSO,
+               {'random_init_position': False, 'zero_init_velocity': False}),
+    SolverSpec('vpso', 'solvers.vpso:VectorizedPSOSolver', 'vectorized PSO', PSO,
+               {'random_init_position': True, 'zero_init_velocity': False}),
+    SolverSpec('vmpso', 'solvers.vpso:VectorizedPSOSolver', 'vectorized PSO starting from a cheap placement', PSO,
+               {'random_init_position': False, 'zero_init_velocity': False}),
+    SolverSpec('ipso', 'solvers.pso:IslandPSOSolver', 'island PSO', PSO | {
+                   'islands': Param(8, help='number of swarms')
+               }, {'random_init_position': False, 'zero_init_velocity': False, 'migration_interval': 10,
+                   'vectorized': True}),
+    SolverSpec('greedy', 'solvers.greedy:GreedySolver', 'greedy construction with descent', GREEDY),
+    SolverSpec('greedy-ls', 'solvers.greedy:GreedySolver', 'greedy construction with annealing', GREEDY | {
+                   'temperature': Param(0.05, help='initial annealing temperature relative to the cost')
+               }, {'search': True}),
+    SolverSpec('decomp', 'solvers.decomposition:DecompositionSolver', 'decomposition into microservice groups', {
+                   'subsolver': Param('cpsat-agg', help='solver for decomposition subproblems'),
+                   'parts': Param(None, int, 'number of microservice groups (default: one per 10 microservices)'),
+                   'slack': Param(3.0, help='node capacity given to a group relative to its demand'),
+                   'passes': Param(10, help='relocation passes over containers of cross-group microservices'),
+                   'time_limit': TIME_LIMIT
+               }, prepare=decomposition),
+    SolverSpec('portfolio', 'solvers.portfolio:PortfolioSolver', 'solvers run side by side', {
+                   'members': Param(('cpsat-agg', 'vmpso', 'greedy-ls'), tuple, 'comma-separated solvers'),
+                   'time_limit': TIME_LIMIT
+               }, prepare=portfolio)
+)
+
+# solvers that can run inside decomposition worker processes
+SUBSOLVERS = ('cpsat', 'cpsat-agg', 'pso', 'mpso', 'vpso', 'vmpso', 'greedy', 'greedy-ls')
+
+
+def plugins():
+    for entry_point in entry_points(group=ENTRY_POINTS):
+        try:
+            spec = entry_point.load()
+        except Exception:
+            logging.exception(f'Failed to load solver plugin {entry_point.name}')
+            continue
+        if not isinstance(spec, SolverSpec):
+            logging.warning(f'Solver plugin {entry_point.name} is not a SolverSpec, ignoring it')
+            continue
+        yield spec
+
+
+SOLVERS = {spec.name: spec for spec in BUILTIN}
+SOLVERS |= {spec.name: spec for spec in plugins() if spec.name not in SOLVERS}
+
+
+def members():
+    # solvers that can run side by side in a portfolio
+    return tuple(name for name in SOLVERS if name != 'portfolio')
+
+
+def params():
+    # every parameter by name, the first solver declaring it decides its type
+    result = {}
+    for spec in SOLVERS.values():
+        for name, param in spec.params.items():
+            result.setdefault(name, param)
+    return result
+
+
+def parse(assignments):
+    # NAME=VALUE strings, e.g. from the command line
+    known = params()
+    options = {}
+    for assignment in assignments:
+        name, sep, text = assignment.partition('=')
+        name = name.replace('-', '_')
+        if not sep:
+            raise ValueError(f'Expected NAME=VALUE, got "{assignment}"')
+        if name not in known or known[name].type is object:
+            raise ValueError(f'Unknown solver parameter "{name}"')
+        options[name] = known[name].parse(text)
+    return options
+
+
+def make_solver(name, scenario, time_limit=None, workers=None, initial=None, budget=None, **options):
+    if name not in SOLVERS:
+        raise ValueError(f'Unknown solver "{name}"')
+    if unknown := set(options) - set(params()):
+        raise ValueError(f'Unknown solver parameters: {", ".join(sorted(unknown))}')
+
+    spec = SOLVERS[name]
+    settings = spec.settings(options | {k: v for k, v in (('time_limit', time_limit), ('workers', workers))
+                                        if v is not None})
+    return spec.load()(scenario, **settings, initial=initial, budget=budget)
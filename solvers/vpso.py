@@ -0,0 +1,286 @@
+import logging
+import random
+
+import numpy as np
+
+from model.solver import Solver, NoSolutionError
+from model.trace import tracer
+from solvers.pso import Particle, Stopping, repair, violation, overflow, overrun, warm_positions, log_cache
+
+
+class VectorizedPSOSolver(Solver):
+    def solve(self):
+        with tracer.phase('search'):
+            for i in range(self.iterations):
+                self.step(i)
+                if self.stopping.stop(self, i):
+                    break
+
+        logging.debug(f'Finished solving: {self.evaluations} evaluations, {self.infeasible} infeasible')
+        self.stopping.log(self)
+        tracer.count('evaluations', self.evaluations)
+        tracer.count('infeasible_evaluations', self.infeasible)
+        log_cache(self.cache)
+
+    def step(self, i):
+        self.__update_swarm()
+
+        self.cost_vec = self.evaluate(self.positions)
+
+        improved = self.cost_vec < self.best_costs
+        self.best_positions[improved] = self.positions[improved]
+        self.best_costs[improved] = self.cost_vec[improved]
+
+        best = np.argmin(self.best_costs)
+        if self.best_costs[best] < self.cost:
+            logging.debug(f"Swarm's best position updated at iteration {i}/{self.iterations}")
+            self.position = self.best_positions[best].copy()
+            self.cost = float(self.best_costs[best])
+            self.record(self.cost)
+
+    def migrate(self, position, cost):
+        # immigrant replaces the particle with the worst personal best
+        worst = np.argmax(self.best_costs)
+        self.positions[worst] = self.best_positions[worst] = position
+        self.cost_vec[worst] = self.best_costs[worst] = cost
+
+        if cost < self.cost:
+            self.position = np.array(position)
+            self.cost = cost
+
+    def __update_swarm(self):
+        r1 = self.rng.random(self.positions.shape)
+        r2 = self.rng.random(self.positions.shape)
+
+        self.velocities = self.inertia * self.velocities + \
+            self.cognitive * r1 * (self.best_positions - self.positions) + \
+            self.social * r2 * (self.position - self.positions)
+
+        positions = np.rint(self.positions + self.velocities).astype(np.int64)
+
+        self.velocities, self.positions = self.handle_boundary(self.velocities, positions,
+                                                               len(self.scenario.nodes) - 1)
+
+    def evaluate(self, positions):
+        if self.symmetry:
+            positions[:] = canonical(self.scenario, positions)
+
+        costs = objective(self.scenario, positions, self.penalty, self.initial, self.budget, self.cache)
+        infeasible = costs >= (self.penalty or np.inf)
+
+        if self.repair and infeasible.any():
+            for p in np.flatnonzero(infeasible):
+                positions[p] = repair(self.scenario, positions[p].tolist())
+
+            if self.symmetry:
+                positions[infeasible] = canonical(self.scenario, positions[infeasible])
+            costs[infeasible] = objective(self.scenario, positions[infeasible], self.penalty,
+                                          self.initial, self.budget, self.cache)
+            infeasible = costs >= (self.penalty or np.inf)
+
+        self.evaluations += len(positions)
+        self.infeasible += int(infeasible.sum())
+
+        return costs
+
+    def solution(self):
+        if self.cost >= (self.penalty or float('inf')):
+            logging.error('Particle Swarm Optimization failed to find a solution')
+            raise NoSolutionError(
+                'Particle Swarm Optimization failed to find a solution.')
+
+        self.clear_mapping()
+        c = 0
+        for m, micro in self.scenario.micros.items():
+            for _ in range(micro.containers):
+                n = self.scenario.nodes_tpl[self.position[c]]
+                self.mapping[n][m] += 1
+                c += 1
+
+        return super().solution()
+
+    def __init__(self,
+                 scenario,
+                 particles,
+                 iterations,
+                 inertia,
+                 cognitive,
+                 social,
+                 random_init_position,
+                 zero_init_velocity,
+                 boundary_handling,
+                 repair=False,
+                 penalty=False,
+                 initial=None,
+                 budget=None,
+                 symmetry=False,
+                 cache=None,
+                 time_limit=None,
+                 stagnation=None,
+                 target_gap=None,
+                 max_evaluations=None):
+
+        super().__init__(scenario)
+
+        handling_methods = {
+            'absorbing': VectorizedPSOSolver.absorbing,
+            'reflecting': VectorizedPSOSolver.reflecting
+        }
+
+        self.iterations = iterations
+        self.inertia = inertia
+        self.cognitive = cognitive
+        self.social = social
+        self.handle_boundary = handling_methods[boundary_handling]
+        self.repair = repair
+        # infeasible positions cost more than the most expensive feasible placement
+        self.penalty = scenario.compiled.max_cost() + 1 if penalty else None
+        self.initial = initial
+        self.budget = budget
+        # interchangeable nodes are not told apart once the placement has to stay close to an initial one
+        self.symmetry = symmetry and initial is None
+        self.cache = cache
+        self.stopping = Stopping(scenario, time_limit, stagnation, target_gap, max_evaluations)
+        self.bound = self.stopping.bound
+        self.evaluations, self.infeasible = 0, 0
+
+        # derive the NumPy generator from the global one so that --seed covers both
+        self.rng = np.random.default_rng(random.getrandbits(64))
+
+        n_len = len(scenario.nodes)
+        shape = (particles, scenario.conts)
+
+        logging.debug('Starting solving')
+
+        self.velocities = np.zeros(shape) if zero_init_velocity else \
+            self.rng.integers(-n_len + 1, n_len, size=shape).astype(float)
+
+        seeded = np.array(warm_positions(scenario, initial, particles) if initial is not None else [],
+                          dtype=np.int64).reshape(-1, scenario.conts)
+        rest = (particles - len(seeded), scenario.conts)
+        if random_init_position:
+            positions = self.rng.integers(0, n_len, size=rest)
+        else:
+            positions = np.array([Particle.viable_position(scenario) for _ in range(rest[0])],
+                                 dtype=np.int64).reshape(rest)
+        self.positions = np.concatenate((seeded, positions))
+
+        if zero_init_velocity and len(seeded):
+            # particles seeded with a position always get moving, otherwise they stay on it
+            self.velocities[:len(seeded)] = self.rng.integers(-n_len + 1, n_len, size=seeded.shape)
+
+        self.cost_vec = self.evaluate(self.positions)
+        self.best_positions = self.positions.copy()
+        self.best_costs = self.cost_vec.copy()
+
+        best = np.argmin(self.best_costs)
+        self.position = self.best_positions[best].copy()
+
+        if self.best_costs[best] < self.cost:
+            self.cost = float(self.best_costs[best])
+            self.record(self.cost)
+        else:
+            logging.info('No viable solutions were generated on init')
+
+    @staticmethod
+    def absorbing(vel, pos, max_pos):
+        out = (pos < 0) | (pos > max_pos)
+        return np.where(out, 0, vel), np.clip(pos, 0, max_pos)
+
+    @staticmethod
+    def reflecting(vel, pos, max_pos):
+        out = (pos < 0) | (pos > max_pos)
+        return np.where(out, -vel, vel), np.clip(pos, 0, max_pos)
+
+
+def canonical(scenario, positions):
+    # batched solvers.pso.canonical: every row gets a node relabeling table of its own
+    sc = scenario.compiled
+    if len(sc.node_classes) == len(sc.node_names):
+        return positions
+
+    p_len, c_len = positions.shape
+    rows = np.arange(p_len)[:, None]
+
+    first = np.full((p_len, len(sc.node_names)), c_len)
+    np.minimum.at(first, (rows, positions), np.arange(c_len))
+
+    table = np.tile(np.arange(len(sc.node_names)), (p_len, 1))
+    for nodes in sc.node_classes:
+        if len(nodes) > 1:
+            nodes = np.array(nodes)
+            table[rows, nodes[np.argsort(first[:, nodes], axis=1, kind='stable')]] = nodes
+
+    return np.take_along_axis(table, positions, axis=1)
+
+
+def objective(scenario, positions, penalty=None, initial=None, budget=None, cache=None):
+    sc = scenario.compiled
+    p_len = len(positions)
+    n_len, m_len = len(sc.node_names), len(sc.micro_names)
+
+    # flat (particle, node) and (particle, node, microservice) index of every container
+    nodes = positions + n_len * np.arange(p_len)[:, None]
+    slots = (nodes * m_len + sc.cont_micro).ravel()
+
+    if cache is None and (initial is None or budget is None):
+        # without cache keys or a migration budget the container counts are not needed, node usage
+        # and microservice presence are scattered from the positions instead
+        micros = np.tile(sc.cont_micro, p_len)
+        nodes = nodes.ravel()
+        excess = overflow(sc, *(np.bincount(nodes, weights, p_len * n_len).reshape(p_len, n_len)
+                                for weights in (sc.cpureq[micros], sc.memreq[micros], None)))
+
+        present = np.zeros(p_len * n_len * m_len, dtype=bool)
+        present[slots] = True
+        cost = placement_cost(sc, present.reshape(p_len, n_len, m_len))
+        return np.where(excess == 0, cost, np.inf if penalty is None else penalty * (1 + excess) + cost)
+
+    placement = np.bincount(slots, minlength=p_len * n_len * m_len).reshape(p_len, n_len, m_len)
+
+    if cache is not None:
+        keys = [cache.key(counts) for counts in placement]
+        values = [cache.get(key) for key in keys]
+
+        missing = [p for p, value in enumerate(values) if value is None]
+        if missing:
+            computed = zip(violation(sc, placement[missing]).tolist(), placement_cost(sc, placement[missing]).tolist())
+            for p, value in zip(missing, computed):
+                values[p] = value
+                cache.put(keys[p], value)
+
+        excess, cost = np.array(values, dtype=float).reshape(-1, 2).T
+        excess = excess + overrun(placement, initial, budget)
+    else:
+        excess = violation(sc, placement, initial, budget)
+        cost = placement_cost(sc, placement)
+
+    if penalty is None:
+        return np.where(excess == 0, cost, np.inf)
+    return np.where(excess == 0, cost, penalty * (1 + excess) + cost)
+
+
+def placement_cost(sc, placement):
+    # placement is a particle x node x microservice array of container counts or of presence
+    present = placement > 0
+
+    infra_cost = present.any(axis=2) @ sc.cost
+    if not sc.edges:
+        return infra_cost
+
+    # transfer costs interzone between zones, intrazone within one and nothing within a node, so the
+    # data cost of every communicating pair splits into counts of nodes, of zones and of nodes shared
+    # by the pair, instead of a node x node product per particle
+    producer, consumer, rate = (np.array(values) for values in zip(*sc.edges))
+    zones = np.zeros((sc.zone.max(initial=-1) + 1, len(sc.node_names)))
+    zones[sc.zone, np.arange(len(sc.node_names))] = 1
+
+    per_node = present.sum(axis=1)
+    per_zone = zones @ present
+    shared_node = np.sum(present[:, :, producer] & present[:, :, consumer], axis=1)
+    shared_zone = np.sum(per_zone[:, :, producer] * per_zone[:, :, consumer], axis=1)
+
+    data_cost = (sc.interzone * per_node[:, producer] * per_node[:, consumer] -
+                 (sc.interzone - sc.intrazone) * shared_zone -
+                 sc.intrazone * shared_node) @ rate
+    return infra_cost + data_cost
@@ -0,0 +1,302 @@
+import logging
+import os
+import time
+
+import numpy as np
+
+from google.protobuf import text_format
+from multiprocessing import Pool
+from ortools.sat.python import cp_model
+
+from model.trace import tracer
+from model.warmstart import moved, trimmed
+
+
+STATUS = {cp_model.OPTIMAL: 'optimal',
+          cp_model.FEASIBLE: 'feasible',
+          cp_model.INFEASIBLE: 'infeasible',
+          cp_model.MODEL_INVALID: 'invalid',
+          cp_model.UNKNOWN: 'unknown'}
+
+# model shared by the calls of one worker process
+_model = None
+
+
+class Perturbation:
+    def __init__(self, name, remove_nodes=(), capacity=None, containers=None):
+        self.name = name
+        self.remove_nodes = tuple(remove_nodes)
+        self.capacity = capacity or {}  # node -> factor of its CPU and memory limits
+        self.containers = containers or {}  # microservice -> new number of containers
+
+
+def perturbations(scenario, nodes=False, zones=False, capacity=None, scale=None, specs=()):
+    # node:NAME, zone:NAME, capacity:NODE:FACTOR and scale:MICROSERVICE:CONTAINERS perturbations
+    result = []
+    if nodes:
+        result += [Perturbation(f'node:{n}', remove_nodes=(n,)) for n in scenario.nodes]
+    if zones:
+        result += [parse(scenario, f'zone:{z}') for z in scenario.compiled.zone_names]
+    if capacity is not None:
+        result += [Perturbation(f'capacity:{n}:{capacity}', capacity={n: capacity}) for n in scenario.nodes]
+    if scale is not None:
+        result += [Perturbation(f'scale:{m}:{num}', containers={m: num})
+                   for m, micro in scenario.micros.items() if (num := max(1, round(micro.containers * scale)))]
+    return result + [parse(scenario, spec) for spec in specs]
+
+
+def parse(scenario, spec):
+    kind, _, rest = spec.partition(':')
+
+    if kind == 'node' and rest in scenario.nodes:
+        return Perturbation(spec, remove_nodes=(rest,))
+    if kind == 'zone' and rest in scenario.compiled.zone_names:
+        return Perturbation(spec, remove_nodes=[n for n, node in scenario.nodes.items() if node.zone == rest])
+
+    name, _, value = rest.rpartition(':')
+    if kind == 'capacity' and name in scenario.nodes:
+        return Perturbation(spec, capacity={name: float(value)})
+    if kind == 'scale' and name in scenario.micros:
+        return Perturbation(spec, containers={name: int(value)})
+
+    raise ValueError(f'Invalid perturbation "{spec}"')
+
+
+class WhatIfAnalysis:
+    def __init__(self, scenario, solver_class, time_limit=None, workers=None, processes=None, symmetry=True):
+        self.scenario = scenario
+        self.solver_class = solver_class
+        self.time_limit = time_limit
+        self.workers = workers
+        self.processes = processes or os.cpu_count()
+        self.symmetry = symmetry
+
+    def run(self, perturbations):
+        # baseline row and one row per perturbation with status, cost, cost change and moved containers
+        sc = self.scenario.compiled
+
+        # a node with less capacity is no longer interchangeable with the rest of its class
+        symmetry = self.symmetry and not any(p.capacity for p in perturbations)
+
+        with tracer.phase('build'):
+            solver = self.solver_class(self.scenario, self.time_limit, self.workers, symmetry=symmetry)
+            solver.build()
+            model = Model.of(solver)
+
+        with tracer.phase('baseline'):
+            baseline = model.solve(sc, self.time_limit, self.workers)
+        if baseline['counts'] is None:
+            logging.error('Baseline placement has no solution, perturbations are solved without a hint')
+
+        rows = [None] * len(perturbations)
+        jobs = []
+        for p, perturbation in enumerate(perturbations):
+            if baseline['counts'] is not None and unaffected(sc, perturbation, baseline['counts']):
+                rows[p] = baseline | {'status': 'unaffected', 'time': 0.0}
+            else:
+                jobs.append(p)
+
+        logging.debug(f'{len(perturbations) - len(jobs)} perturbations leave the baseline placement valid, '
+                      f'solving {len(jobs)}')
+
+        if jobs:
+            # perturbations share the cores instead of each CP-SAT search taking all of them
+            processes = min(len(jobs), self.processes)
+            workers = self.workers or max(1, os.cpu_count() // processes)
+            with Pool(processes, initializer=load, initargs=(model, self.scenario, self.solver_class, symmetry)) \
+                    as pool, tracer.phase('perturbations'):
+                results = pool.starmap(evaluate, [(perturbations[p], baseline['hint'], baseline['counts'],
+                                                   self.time_limit, workers) for p in jobs])
+            for p, result in zip(jobs, results):
+                rows[p] = result
+
+        return [summary('baseline', baseline, baseline)] + \
+            [summary(perturbation.name, row, baseline) for perturbation, row in zip(perturbations, rows)]
+
+
+class Model:
+    # CP-SAT model in text form with the variables a perturbation acts on, so that workers can load it;
+    # older OR-Tools releases expose the model as a protobuf message, newer ones as a wrapper of their own
+    def __init__(self, text, used, terms, symmetry):
+        self.text = text
+        self.used = used  # variable index of every node's used flag
+        self.terms = terms  # (variable index, microservice) pairs of every node
+        self.symmetry = symmetry
+        self.model = None
+
+    @classmethod
+    def of(cls, solver):
+        n_range = range(len(solver.scenario.nodes))
+        self = cls(str(solver.model.Proto()),
+                   [solver.used[k].Index() for k in n_range],
+                   [[(var.Index(), i) for var, i in solver.node_terms(k)] for k in n_range],
+                   solver.symmetry)
+        self.model = solver.model
+        return self
+
+    def __getstate__(self):
+        return self.text, self.used, self.terms, self.symmetry
+
+    def __setstate__(self, state):
+        self.text, self.used, self.terms, self.symmetry = state
+        self.model = cp_model.CpModel()
+        proto = self.model.Proto()
+        if hasattr(proto, 'parse_text_format'):
+            proto.parse_text_format(self.text)
+        else:
+            text_format.Parse(self.text, proto)
+
+    def perturb(self, sc, perturbation):
+        # copy of the model with removed nodes bounded to be unused and reduced capacities added as constraints
+        model = cp_model.CpModel()
+        proto = model.Proto()
+        if hasattr(proto, 'copy_from'):
+            proto.copy_from(self.model.Proto())
+        else:
+            proto.CopyFrom(self.model.Proto())
+
+        for k in removed(sc, perturbation, self.symmetry):
+            domain = model.Proto().variables[self.used[k]].domain
+            domain[len(domain) - 1] = 0
+
+        for n, factor in perturbation.capacity.items():
+            k = sc.node_index[n]
+            terms = [(model.GetIntVarFromProtoIndex(v), i) for v, i in self.terms[k]]
+            model.Add(sum(var * int(sc.cpureq[i]) for var, i in terms) <= int(sc.cpulim[k] * factor))
+            model.Add(sum(var * int(sc.memreq[i]) for var, i in terms) <= int(sc.memlim[k] * factor))
+
+        return model
+
+    def solve(self, sc, time_limit, workers, model=None, hint=None):
+        model = model if model is not None else self.model
+        if hint:
+            model.ClearHints()
+            for v, value in hint.items():
+                model.AddHint(model.GetIntVarFromProtoIndex(v), value)
+
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        if workers is not None:
+            solver.parameters.num_workers = workers
+
+        start = time.perf_counter()
+        status = solver.Solve(model)
+        row = {'status': STATUS.get(status, 'unknown'), 'cost': None, 'counts': None, 'hint': None,
+               'time': time.perf_counter() - start}
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            counts = np.zeros((len(sc.node_names), len(sc.micro_names)), dtype=np.int64)
+            hint = {}
+            for k, terms in enumerate(self.terms):
+                hint[self.used[k]] = solver.Value(model.GetIntVarFromProtoIndex(self.used[k]))
+                for v, i in terms:
+                    hint[v] = solver.Value(model.GetIntVarFromProtoIndex(v))
+                    counts[k, i] += hint[v]
+            row |= {'cost': sc.cost_of(counts), 'counts': counts, 'hint': hint}
+
+        return row
+
+
+def removed(sc, perturbation, symmetry):
+    # with symmetry breaking only the last nodes of a class may be unused, so they stand in for the removed ones
+    nodes = [sc.node_index[n] for n in perturbation.remove_nodes]
+    if not symmetry:
+        return nodes
+
+    result = []
+    for c in sorted({sc.node_class[k] for k in nodes}):
+        num = sum(sc.node_class[k] == c for k in nodes)
+        result += sc.node_classes[c][-num:]
+    return result
+
+
+def unaffected(sc, perturbation, counts):
+    # the baseline stays valid, and so optimal, when it does not use what the perturbation takes away
+    if perturbation.containers:
+        return False
+    if any(counts[sc.node_index[n]].any() for n in perturbation.remove_nodes):
+        return False
+    for n, factor in perturbation.capacity.items():
+        k = sc.node_index[n]
+        if counts[k] @ sc.cpureq > sc.cpulim[k] * factor or counts[k] @ sc.memreq > sc.memlim[k] * factor:
+            return False
+    return True
+
+
+def load(model, scenario, solver_class, symmetry):
+    global _model
+    _model = model, scenario, solver_class, symmetry
+
+
+def evaluate(perturbation, hint, baseline, time_limit, workers):
+    model, scenario, solver_class, symmetry = _model
+
+    if perturbation.containers:
+        # container counts shape the variables and the objective, the model is built anew
+        # and hinted with the baseline placement scaled to the new counts
+        scenario = scenario.perturbed(containers=perturbation.containers)
+        solver = solver_class(scenario, time_limit, workers, symmetry=symmetry)
+        solver.build()
+        if baseline is not None:
+            baseline = trimmed(scenario.compiled, baseline)
+            solver.hint(baseline)
+        model, hint = Model.of(solver), None
+
+    sc = scenario.compiled
+    perturbed = model.perturb(sc, perturbation)
+    if hint is not None:
+        # nodes taken away keep their hinted values out of the model
+        gone = {model.used[k] for k in removed(sc, perturbation, model.symmetry)} | \
+               {v for k in removed(sc, perturbation, model.symmetry) for v, _ in model.terms[k]}
+        hint = {v: value for v, value in hint.items() if v not in gone}
+
+    row = model.solve(sc, time_limit, workers, perturbed, hint)
+    if row['counts'] is not None and model.symmetry:
+        row['counts'] = relabel(sc, perturbation, row['counts'])
+        if perturbation.containers and baseline is not None:
+            row['counts'] = matched(sc, row['counts'], baseline)
+    if perturbation.containers and baseline is not None:
+        # containers a microservice is scaled down by are removed rather than moved
+        row['baseline'] = baseline
+    return row
+
+
+def relabel(sc, perturbation, counts):
+    # interchangeable nodes are renamed so that the removed nodes, not their stand-ins, are the unused ones
+    counts = counts.copy()
+    gone = {sc.node_index[n] for n in perturbation.remove_nodes}
+
+    for c in sorted({sc.node_class[k] for k in gone}):
+        nodes = list(sc.node_classes[c])
+        num = sum(k in gone for k in nodes)
+        kept = [k for k in nodes if k not in gone]
+        counts[kept] = counts[nodes[:len(nodes) - num]]
+        counts[[k for k in nodes if k in gone]] = 0
+
+    return counts
+
+
+def matched(sc, counts, baseline):
+    # interchangeable nodes are renamed so that each takes the containers closest to a baseline node's,
+    # otherwise a rebuilt model may put the same placement on other nodes of a class
+    result = counts.copy()
+    for nodes in sc.node_classes:
+        free = list(nodes)
+        for b in sorted(nodes, key=lambda k: -baseline[k].sum()):
+            a = max(free, key=lambda k: np.minimum(counts[k], baseline[b]).sum())
+            free.remove(a)
+            result[b] = counts[a]
+    return result
+
+
+def summary(name, row, baseline):
+    cost = row['cost']
+    initial = row.get('baseline', baseline['counts'])
+    return {'perturbation': name,
+            'status': row['status'],
+            'cost': cost,
+            'delta': cost - baseline['cost'] if cost is not None and baseline['cost'] is not None else None,
+            'moved': moved(initial, row['counts'])
+            if row['counts'] is not None and initial is not None and row['counts'].shape == initial.shape else None,
+            'time': row['time']}
@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+# the tests import the scripts and packages of the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import generate_scenario  # noqa: E402
+from model import Scenario  # noqa: E402
+
+SCENARIOS = os.path.join(ROOT, 'scenarios')
+
+# shipped scenarios with and without communication, one and several zones
+SAMPLES = ('2_two_services', '4_datarate', 'm4c7n15', 'm9c5n15')
+
+
+def load(name):
+    with open(os.path.join(SCENARIOS, f'{name}.yaml'), 'rb') as f:
+        return Scenario(f)
+
+
+def generated(seed, micros, nodes, zones=2, containers=3):
+    # small random scenario, named micro-0, node-0, ...
+    random.seed(seed)
+    m_names = [f'micro-{i}' for i in range(micros)]
+    n_names = [f'node-{k}' for k in range(nodes)]
+    return Scenario.from_dict(generate_scenario.scenario(m_names, 1, containers, False, 1, 10, n_names, zones))
+
+
+def duplicated(name, copies=3):
+    # scenario with every node repeated, so that each forms a class of interchangeable nodes
+    scenario = load(name).to_dict()
+    scenario['nodes'] = {f'{n}-{j}': dict(node) for n, node in scenario['nodes'].items() for j in range(copies)}
+    return Scenario.from_dict(scenario)
+
+
+def random_positions(scenario, num, seed=0):
+    # container -> node positions, most of them overflowing some node
+    rng = np.random.default_rng(seed)
+    return rng.integers(len(scenario.nodes), size=(num, scenario.conts))
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+    np.random.seed(0)
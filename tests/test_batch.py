@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import batch
+
+from conftest import ROOT, SCENARIOS
+
+
+run = batch.run
+
+
+def crashing(job, *args):
+    # stands in for batch.run in the worker processes, the process dies on one scenario
+    if 'one_container' in job['scenario']:
+        os._exit(1)
+    return run(job, *args)
+
+
+def manifest(directory, names):
+    for name in names:
+        shutil.copy(os.path.join(SCENARIOS, f'{name}.yaml'), directory)
+    with open(os.path.join(directory, 'manifest.jsonl'), 'w') as f:
+        f.writelines(json.dumps({'scenario': f'{name}.yaml', 'solver': 'greedy'}) + '\n' for name in names)
+    return os.path.join(directory, 'manifest.jsonl')
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path):
+    path = manifest(tmp_path, ['2_two_services', '3_two_nodes'])
+    jobs = list(batch.jobs([path], 'cpsat-agg', 5))
+
+    assert [job['scenario'] for job in jobs] == [os.path.join(tmp_path, '2_two_services.yaml'),
+                                                 os.path.join(tmp_path, '3_two_nodes.yaml')]
+    assert all(job['solver'] == 'greedy' and job['time_limit'] == 5 for job in jobs)
+
+
+def test_directories_skip_partial_scenarios():
+    jobs = list(batch.jobs([SCENARIOS], 'greedy', None))
+    assert jobs and not any(os.path.basename(job['scenario']).startswith('_') for job in jobs)
+
+
+def test_results_of_every_job(tmp_path):
+    path = manifest(tmp_path, ['0_fail', '2_two_services', '3_two_nodes', '4_datarate'])
+    results = {os.path.basename(r['scenario']): r for r in batch.results(batch.jobs([path], None, None), 2,
+                                                                         1, None, None)}
+
+    assert results['0_fail.yaml']['status'] == 'no_solution'
+    for name in ('2_two_services.yaml', '3_two_nodes.yaml', '4_datarate.yaml'):
+        assert results[name]['status'] == 'solved' and results[name]['mapping']
+
+
+def test_crashed_worker_gives_an_error_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'run', crashing)
+    path = manifest(tmp_path, ['2_two_services', '1_one_container', '3_two_nodes', '4_datarate'])
+    results = {os.path.basename(r['scenario']): r for r in batch.results(batch.jobs([path], None, None), 2,
+                                                                         1, None, None)}
+
+    assert len(results) == 4
+    assert results['1_one_container.yaml']['status'] == 'error'
+    assert results['1_one_container.yaml']['error'] == 'worker process crashed'
+    for name in ('2_two_services.yaml', '3_two_nodes.yaml', '4_datarate.yaml'):
+        assert results[name]['status'] == 'solved'
+
+
+def test_command_line(tmp_path):
+    path = manifest(tmp_path, ['2_two_services', '3_two_nodes'])
+    process = subprocess.run([sys.executable, os.path.join(ROOT, 'batch.py'), '-j', '2', path],
+                             capture_output=True, text=True, cwd=tmp_path.parent)
+    lines = [json.loads(line) for line in process.stdout.splitlines()]
+
+    assert process.returncode == 0
+    assert sorted(line['cost'] for line in lines) == [6.86, 10.47]
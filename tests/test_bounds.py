@@ -0,0 +1,99 @@
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import SAMPLES, generated, load
+from model import Scenario
+from model.bounds import gap, lower_bound
+from solvers import AggregatedCPSATSolver
+from solvers.pso import Stopping
+from solvers.registry import make_solver
+
+
+def optimum(scenario):
+    solver = AggregatedCPSATSolver(scenario, workers=1)
+    solver.solve()
+    return solver.solution().cost
+
+
+@pytest.mark.parametrize('name', SAMPLES[:3])
+def test_bound_below_shipped_optima(name):
+    scenario = load(name)
+    assert 0 < lower_bound(scenario) <= optimum(scenario) + 1e-9
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_bound_below_generated_optima(seed):
+    scenario = generated(seed, micros=6, nodes=8)
+    assert lower_bound(scenario) <= optimum(scenario) + 1e-9
+
+
+def test_bound_of_unplaceable_and_empty_scenarios():
+    scenario = load('2_two_services').to_dict()
+    for micro in scenario['microservices'].values():
+        micro['containers'] = 1000
+    assert lower_bound(Scenario.from_dict(scenario)) == float('inf')
+
+    for micro in scenario['microservices'].values():
+        micro['containers'] = 0
+    assert lower_bound(Scenario.from_dict(scenario)) == 0
+
+
+def test_gap():
+    assert gap(10, 8) == pytest.approx(0.2)
+    assert gap(10, 12) == 0
+    assert gap(float('inf'), 8) is None
+    assert gap(10, None) is None
+
+
+def stopping(**rules):
+    rules = Stopping(load('2_two_services'), **rules)
+    rules.bound = 90
+    return rules
+
+
+def solver(cost, evaluations=0, elapsed=0):
+    return SimpleNamespace(cost=cost, evaluations=evaluations, started=time.perf_counter() - elapsed)
+
+
+def test_no_rules_never_stop():
+    rules = stopping()
+    assert not any(rules.stop(solver(100, 10 ** 9, 10 ** 3), i) for i in range(100))
+
+
+def test_stagnation():
+    rules = stopping(stagnation=3)
+    assert not rules.stop(solver(100), 0)
+    assert not rules.stop(solver(99), 1)
+    assert not rules.stop(solver(99), 3)
+    assert rules.stop(solver(99), 4)
+    assert 'no improvement' in rules.reason
+
+
+def test_target_gap():
+    rules = stopping(target_gap=0.1)
+    assert not rules.stop(solver(110), 0)
+    assert rules.stop(solver(100), 1)
+    assert 'gap' in rules.reason
+
+
+def test_time_limit_and_evaluations():
+    assert not stopping(time_limit=1).stop(solver(100, elapsed=0.5), 0)
+    assert stopping(time_limit=1).stop(solver(100, elapsed=1), 0)
+
+    assert not stopping(max_evaluations=100).stop(solver(100, 99), 0)
+    assert stopping(max_evaluations=100).stop(solver(100, 100), 0)
+
+
+@pytest.mark.parametrize('name', ('pso', 'vpso', 'ipso'))
+def test_solvers_stop_early(name):
+    scenario = load('m4c7n15')
+    solver = make_solver(name, scenario, max_evaluations=200, particles=20, iterations=1000)
+    solver.solve()
+
+    assert solver.stopping.reason is not None
+    assert solver.evaluations < 20 * 1000
+    assert solver.bound == lower_bound(scenario)
+    assert solver.solution().cost >= solver.bound
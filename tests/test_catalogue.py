@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pytest
+import yaml
+
+from conftest import SCENARIOS, load, random_positions
+from model import Scenario
+from solvers import pso
+from solvers.registry import make_solver
+
+
+ARRAYS = ('cpulim', 'memlim', 'contlim', 'cost', 'zone', 'node_class', 'cpureq', 'memreq', 'containers',
+          'datarate', 'cont_micro', 'transfer')
+
+
+@pytest.fixture
+def scenarios(tmp_path):
+    # m4c7n15 as shipped and with its nodes moved to a catalogue next to it
+    with open(os.path.join(SCENARIOS, 'm4c7n15.yaml')) as f:
+        data = yaml.safe_load(f)
+
+    with open(tmp_path / 'fleet.yaml', 'w') as f:
+        yaml.safe_dump({'nodes': data['nodes'], 'data_cost': data['data_cost']}, f, sort_keys=False)
+    with open(tmp_path / 'scenario.yaml', 'w') as f:
+        yaml.safe_dump({'infrastructure': 'fleet.yaml',
+                        'microservices': data['microservices'],
+                        'datarate': data['datarate']}, f, sort_keys=False)
+
+    with open(tmp_path / 'scenario.yaml', 'rb') as f:
+        return load('m4c7n15'), Scenario(f)
+
+
+def test_catalogue_is_compiled_next_to_it(scenarios, tmp_path):
+    assert (tmp_path / 'fleet.catalogue').exists()
+
+
+def test_catalogue_scenario_matches_inline_nodes(scenarios):
+    inline, backed = scenarios
+    assert backed.nodes_tpl == inline.nodes_tpl
+    assert backed.compiled.zone_names == inline.compiled.zone_names
+    assert backed.compiled.node_classes == inline.compiled.node_classes
+    assert backed.compiled.fingerprint() == inline.compiled.fingerprint()
+    for name in ARRAYS:
+        assert np.array_equal(getattr(backed.compiled, name), getattr(inline.compiled, name)), name
+
+    for n, node in inline.nodes.items():
+        assert (backed.nodes[n].cost, backed.nodes[n].cpulim, backed.nodes[n].memlim, backed.nodes[n].contlim,
+                backed.nodes[n].zone) == (node.cost, node.cpulim, node.memlim, node.contlim, node.zone)
+
+
+def test_catalogue_scenario_costs_match_inline_nodes(scenarios):
+    inline, backed = scenarios
+    for position in random_positions(inline, 20):
+        position = position.tolist()
+        assert backed.compiled.cost_of(pso.counts(backed, position)) == \
+            pytest.approx(inline.compiled.cost_of(pso.counts(inline, position)))
+        assert pso.objective(backed, position, 10.0) == pytest.approx(pso.objective(inline, position, 10.0))
+
+
+def test_catalogue_scenario_solves_like_inline_nodes(scenarios):
+    results = []
+    for scenario in scenarios:
+        solver = make_solver('cpsat-agg', scenario, workers=1)
+        solver.solve()
+        results.append(solver.solution())
+
+    assert results[0].cost == pytest.approx(results[1].cost)
+    assert results[0].objective == pytest.approx(results[1].objective)
+
+
+def test_compiled_catalogue_scenario_keeps_the_catalogue(scenarios, tmp_path):
+    _, backed = scenarios
+    with open(tmp_path / 'scenario.npz', 'wb') as f:
+        backed.compiled.save(f)
+    with open(tmp_path / 'scenario.npz', 'rb') as f:
+        loaded = Scenario(f)
+
+    assert loaded.nodes_tpl == backed.nodes_tpl
+    assert loaded.compiled.fingerprint() == backed.compiled.fingerprint()
+
+
+def test_multiprocess_solvers_on_a_catalogue(scenarios):
+    # catalogues are attached again by the processes of island PSO and decomposition
+    _, backed = scenarios
+    for name, options in (('ipso', {'islands': 2, 'particles': 10, 'iterations': 20}), ('decomp', {'parts': 2})):
+        solver = make_solver(name, backed, workers=1, **options)
+        solver.solve()
+        result = solver.solution()
+        assert backed.compiled.violations(backed.compiled.counts(result.mapping)) == [], name
+
+
+def cheaper(path):
+    # the catalogue with every node at half its cost, written a second later
+    with open(path) as f:
+        data = yaml.safe_load(f)
+    for node in data['nodes'].values():
+        node['cost'] /= 2
+    with open(path, 'w') as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+    later = os.path.getmtime(path) + 1
+    os.utime(path, (later, later))
+
+
+def test_edited_catalogue_is_recompiled(scenarios, tmp_path):
+    inline, _ = scenarios
+    with open(tmp_path / 'scenario.yaml') as f:
+        data = yaml.safe_load(f)
+    with open(tmp_path / 'compiled.yaml', 'w') as f:
+        yaml.safe_dump(data | {'infrastructure': 'fleet.catalogue'}, f, sort_keys=False)
+
+    cheaper(tmp_path / 'fleet.yaml')
+    for name in ('scenario.yaml', 'compiled.yaml'):
+        with open(tmp_path / name, 'rb') as f:
+            assert np.allclose(Scenario(f).compiled.cost, inline.compiled.cost / 2), name
+
+
+def test_cache_entries_follow_the_catalogue(scenarios, tmp_path):
+    inline, backed = scenarios
+    cache = str(tmp_path / 'cache')
+
+    # the same scenario next to a catalogue with other costs
+    os.mkdir(tmp_path / 'other')
+    for name in ('fleet.yaml', 'scenario.yaml'):
+        with open(tmp_path / name) as f, open(tmp_path / 'other' / name, 'w') as g:
+            g.write(f.read())
+    cheaper(tmp_path / 'other' / 'fleet.yaml')
+
+    def loaded(path):
+        with open(path, 'rb') as f:
+            return Scenario(f, cache).compiled.cost
+
+    for _ in range(2):
+        assert np.allclose(loaded(tmp_path / 'scenario.yaml'), inline.compiled.cost)
+        assert np.allclose(loaded(tmp_path / 'other' / 'scenario.yaml'), inline.compiled.cost / 2)
+    assert len(os.listdir(cache)) == 2
+
+    cheaper(tmp_path / 'fleet.yaml')
+    assert np.allclose(loaded(tmp_path / 'scenario.yaml'), inline.compiled.cost / 2)
+    assert len(os.listdir(cache)) == 3
@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLES, load, random_positions
+from model.compiled import CompiledScenario
+
+
+def scalar_cost(scenario, mapping):
+    # cost of a mapping summed node by node and node pair by node pair, as the scenario defines it
+    used = [n for n, micros in mapping.items() if any(micros.values())]
+    infra_cost = sum(scenario.nodes[n].cost for n in used)
+
+    data_cost = 0
+    for p in scenario.micros:
+        for c in scenario.micros:
+            rate = scenario.data_rate(p, c)
+            if rate:
+                data_cost += sum(rate * scenario.data_cost(n1, n2)
+                                 for n1 in used if mapping[n1].get(p)
+                                 for n2 in used if mapping[n2].get(c))
+    return infra_cost + data_cost
+
+
+def mapping_of(scenario, position):
+    sc = scenario.compiled
+    mapping = {}
+    for c, k in enumerate(position):
+        micros = mapping.setdefault(sc.node_names[k], {})
+        m = sc.micro_names[sc.cont_micro[c]]
+        micros[m] = micros.get(m, 0) + 1
+    return mapping
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_cost_matches_scalar_cost(name):
+    scenario = load(name)
+    for position in random_positions(scenario, 20):
+        mapping = mapping_of(scenario, position.tolist())
+        assert scenario.cost(mapping) == pytest.approx(scalar_cost(scenario, mapping))
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_transfer_matches_data_cost(name):
+    scenario = load(name)
+    sc = scenario.compiled
+    expected = [[scenario.data_cost(n1, n2) for n2 in sc.node_names] for n1 in sc.node_names]
+    assert np.array_equal(sc.transfer, expected)
+    assert sc.max_cost() >= scenario.cost({n: {m: 1 for m in scenario.micros} for n in scenario.nodes})
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_save_and_load(name):
+    sc = load(name).compiled
+    buffer = io.BytesIO()
+    sc.save(buffer)
+    buffer.seek(0)
+    loaded = CompiledScenario.load(buffer)
+
+    assert loaded.fingerprint() == sc.fingerprint()
+    assert loaded.micro_names == sc.micro_names and loaded.node_names == sc.node_names
+    assert loaded.edges == sc.edges and loaded.node_classes == sc.node_classes
+
+
+def test_violations():
+    scenario = load('m4c7n15')
+    sc = scenario.compiled
+    counts = np.zeros((len(sc.node_names), len(sc.micro_names)), dtype=np.int64)
+    counts[0] = sc.containers
+
+    problems = sc.violations(counts)
+    assert problems and all(f'node "{sc.node_names[0]}" exceeds' in problem for problem in problems)
+
+    counts[0, 0] -= 1
+    assert f'microservice "{sc.micro_names[0]}" has {sc.containers[0] - 1} containers' in \
+        ' '.join(sc.violations(counts))
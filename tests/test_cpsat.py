@@ -0,0 +1,39 @@
+import pytest
+
+from ortools.sat.python import cp_model
+
+from conftest import generated, load
+from model import Scenario
+from solvers import AggregatedCPSATSolver, CPSATSolver
+
+
+def optimum(solver_class, scenario, **settings):
+    solver = solver_class(scenario, workers=1, **settings)
+    solver.solve()
+    assert solver.status == cp_model.OPTIMAL
+    return solver.solution()
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_aggregated_model_reaches_the_same_optimum(seed):
+    scenario = generated(seed, micros=6, nodes=8)
+    expected = optimum(CPSATSolver, scenario)
+    result = optimum(AggregatedCPSATSolver, scenario)
+    assert result.objective == pytest.approx(expected.objective)
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+
+
+@pytest.mark.parametrize('name', ('2_two_services', '3_two_nodes', '4_datarate'))
+def test_shipped_optima(name):
+    scenario = load(name)
+    assert optimum(AggregatedCPSATSolver, scenario).objective == \
+        pytest.approx(optimum(CPSATSolver, scenario).objective)
+
+
+def test_microservices_without_requests():
+    scenario = load('2_two_services').to_dict()
+    scenario['microservices']['API'] |= {'cpureq': 0, 'memreq': 0}
+    scenario = Scenario.from_dict(scenario)
+
+    assert optimum(AggregatedCPSATSolver, scenario).objective == \
+        pytest.approx(optimum(CPSATSolver, scenario).objective)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from conftest import generated, load
+from model import NoSolutionError, Scenario
+from solvers.decomposition import assign_nodes, partition
+from solvers.registry import make_solver
+
+
+def lopsided(huge=1):
+    # many cheap small nodes and one big node, the only one a huge container fits on
+    nodes = {f'small-{k}': {'cost': 1, 'cpulim': 1000, 'memlim': 1024, 'contlim': 4, 'zone': 'alpha'}
+             for k in range(40)}
+    nodes['big'] = {'cost': 30, 'cpulim': 8000, 'memlim': 8192, 'contlim': 8, 'zone': 'alpha'}
+    return Scenario.from_dict({'microservices': {'huge': {'cpureq': 6000, 'memreq': 512, 'containers': huge},
+                                                 'tiny': {'cpureq': 250, 'memreq': 128, 'containers': 6}},
+                               'datarate': {}, 'nodes': nodes,
+                               'data_cost': {'intrazone': 0.01, 'interzone': 0.02}})
+
+
+def valid(scenario, result):
+    return scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+
+
+def test_groups_and_nodes_are_disjoint():
+    sc = generated(1, micros=30, nodes=60, zones=3).compiled
+    groups = partition(sc, 3)
+    assert sorted(i for group in groups for i in group) == list(range(len(sc.micro_names)))
+
+    nodes = assign_nodes(sc, groups, 3.0)
+    assigned = [k for group in nodes for k in group]
+    assert len(assigned) == len(set(assigned))
+    for group, group_nodes in zip(groups, nodes):
+        assert sc.cpulim[group_nodes].sum() >= sc.containers[group] @ sc.cpureq[group]
+
+
+@pytest.mark.parametrize('subsolver', ('cpsat-agg', 'greedy'))
+def test_solution_is_valid(subsolver):
+    scenario = load('m5c4n40')
+    solver = make_solver('decomp', scenario, subsolver=subsolver, parts=2, time_limit=5)
+    solver.solve()
+    result = solver.solution()
+
+    assert valid(scenario, result)
+    assert result.cost == pytest.approx(solver.cost)
+
+
+def test_group_without_a_fitting_node_is_retried():
+    scenario = lopsided()
+    groups = partition(scenario.compiled, 2)
+    nodes = assign_nodes(scenario.compiled, groups, 3.0)
+    big = scenario.compiled.node_index['big']
+    huge = scenario.compiled.micro_index['huge']
+    assert not any(big in n and huge in g for g, n in zip(groups, nodes))
+
+    solver = make_solver('decomp', scenario, parts=2)
+    solver.solve()
+    result = solver.solution()
+    assert valid(scenario, result)
+    assert result.mapping['big']['huge'] == 1
+
+
+def test_infeasible_scenario_has_no_solution():
+    solver = make_solver('decomp', lopsided(huge=2), parts=2)
+    solver.solve()
+    with pytest.raises(NoSolutionError):
+        solver.solution()
+
+
+def test_initial_placement_is_kept_within_groups():
+    scenario = load('m5c4n40')
+    first = make_solver('greedy', scenario)
+    first.solve()
+    initial = scenario.compiled.counts(first.solution().mapping)
+
+    solver = make_solver('decomp', scenario, subsolver='greedy', parts=2, initial=initial)
+    solver.solve()
+    assert valid(scenario, solver.solution())
+    assert np.isfinite(solver.cost)
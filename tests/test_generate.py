@@ -0,0 +1,60 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+import generate_scenario
+
+from conftest import ROOT
+from model import Scenario
+
+
+def generate(tmp_path, *args):
+    path = tmp_path / 'scenario.yaml'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'generate_scenario.py'), *args, '-o', str(path)], check=True)
+    return path
+
+
+@pytest.mark.parametrize('indexed', (False, True))
+def test_command_line_matches_scenario(tmp_path, indexed):
+    path = generate(tmp_path, '--seed', '3', '-m', '6', '-n', '9', *(['--indexed-names'] if indexed else []))
+    with open(path) as f:
+        generated = yaml.safe_load(f)
+
+    random.seed(3)
+    m_names = list(generate_scenario.unique_names('micro', 2, 6, indexed))
+    n_names = list(generate_scenario.unique_names('node', 1, 9, indexed))
+    assert generated == generate_scenario.scenario(m_names, 1, 10, False, 1, 10, n_names, 3)
+
+
+def test_same_seed_gives_the_same_scenario(tmp_path):
+    first = generate(tmp_path, '--seed', '5', '-m', '20', '-n', '50').read_text()
+    assert generate(tmp_path, '--seed', '5', '-m', '20', '-n', '50').read_text() == first
+    assert generate(tmp_path, '--seed', '6', '-m', '20', '-n', '50').read_text() != first
+
+
+@pytest.mark.parametrize('graph', ('tree', 'fanout', 'density', 'powerlaw'))
+def test_graphs(tmp_path, graph):
+    with open(generate(tmp_path, '--seed', '1', '-m', '30', '-n', '20', '--graph', graph), 'rb') as f:
+        scenario = Scenario(f)
+    assert len(scenario.micros) == 30 and len(scenario.nodes) == 20
+    assert scenario.compiled.edges
+
+
+def test_compiled_output(tmp_path):
+    yaml_path = generate(tmp_path, '--seed', '2', '-m', '10', '-n', '30')
+    compiled_path = tmp_path / 'scenario.npz'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'generate_scenario.py'), '--seed', '2', '-m', '10',
+                    '-n', '30', '--format', 'compiled', '-o', str(compiled_path)], check=True)
+
+    with open(yaml_path, 'rb') as f, open(compiled_path, 'rb') as g:
+        assert Scenario(f).compiled.fingerprint() == Scenario(g).compiled.fingerprint()
+
+
+def test_names_are_unique():
+    random.seed(0)
+    names = list(generate_scenario.unique_names('node', 1, 2000))
+    assert len(set(names)) == 2000
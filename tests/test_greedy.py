@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from conftest import SAMPLES, generated, load
+from model import Scenario
+from model.warmstart import initial_counts
+from solvers import GreedySolver
+from solvers.registry import make_solver
+
+
+def solved(name, scenario, **settings):
+    solver = make_solver(name, scenario, **settings)
+    solver.solve()
+    result = solver.solution()
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+    return result
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+@pytest.mark.parametrize('fit', ('first', 'best'))
+def test_construction_is_valid(name, fit):
+    scenario = load(name)
+    result = solved('greedy', scenario, fit=fit)
+    assert result.cost == pytest.approx(scenario.cost(result.mapping))
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_local_search_never_worse(name):
+    scenario = load(name)
+    assert solved('greedy-ls', scenario, time_limit=0.2).cost <= solved('greedy', scenario).cost + 1e-9
+
+
+def test_initial_placement_is_kept_when_it_is_cheap():
+    scenario = load('m4c7n15')
+    first = solved('greedy', scenario)
+    result = solved('greedy', scenario, initial=initial_counts(scenario, first.mapping))
+    assert result.cost <= first.cost + 1e-9
+
+
+def test_construction_stops_at_the_time_limit():
+    # every container is still placed, next fit once the time is up
+    scenario = generated(0, micros=400, nodes=4000, containers=5)
+    solver = GreedySolver(scenario, time_limit=0.01)
+    solver.solve()
+    elapsed = time.perf_counter() - solver.started
+
+    result = solver.solution()
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+    assert elapsed < 0.15
+
+
+def test_scenario_without_containers():
+    scenario = load('2_two_services').to_dict()
+    for micro in scenario['microservices'].values():
+        micro['containers'] = 0
+    scenario = Scenario.from_dict(scenario)
+
+    assert solved('greedy-ls', scenario, time_limit=0.05).cost == 0
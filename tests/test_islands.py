@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from conftest import load
+from solvers import IslandPSOSolver
+from solvers.registry import make_solver
+
+
+def island_solver(scenario, vectorized, **settings):
+    return IslandPSOSolver(scenario, **{'islands': 3, 'migration_interval': 5, 'particles': 10, 'iterations': 20,
+                                        'inertia': 0.9, 'cognitive': 2.5, 'social': 2.5,
+                                        'random_init_position': False, 'zero_init_velocity': False,
+                                        'boundary_handling': 'absorbing', 'vectorized': vectorized} | settings)
+
+
+@pytest.mark.parametrize('vectorized', (False, True))
+def test_solution_is_the_best_island(vectorized):
+    scenario = load('m4c7n15')
+    solver = island_solver(scenario, vectorized)
+    solver.solve()
+    result = solver.solution()
+
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+    assert result.cost == pytest.approx(min(island.solver.cost for island in solver.islands))
+    assert solver.evaluations == sum(island.solver.evaluations for island in solver.islands)
+
+
+def test_islands_receive_the_best_position_of_their_predecessor():
+    scenario = load('m4c7n15')
+    solver = island_solver(scenario, False)
+    solver.islands = [island.evolve(0, 5) for island in solver.islands]
+
+    before = [island.solver.cost for island in solver.islands]
+    solver._IslandPSOSolver__migrate()
+    after = [island.solver.cost for island in solver.islands]
+
+    for i, cost in enumerate(after):
+        assert cost == min(before[i], before[i - 1])
+        assert min(p.best_cost for p in solver.islands[i].solver.particles) == cost
+
+
+def test_seed_gives_the_same_result():
+    scenario = load('m4c7n15')
+    costs = []
+    for _ in range(2):
+        random.seed(7)
+        solver = island_solver(scenario, False)
+        solver.solve()
+        costs.append(solver.cost)
+    assert costs[0] == costs[1]
+
+
+def test_registry_runs_islands():
+    scenario = load('m4c7n15')
+    solver = make_solver('ipso', scenario, iterations=10, islands=2)
+    solver.solve()
+    assert solver.solution().cost < float('inf')
@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+from conftest import SAMPLES, duplicated, load, random_positions
+from model import ObjectiveCache
+from solvers import pso, vpso
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_cached_objective_matches_objective(name):
+    scenario = load(name)
+    positions = random_positions(scenario, 10)
+    positions[1] = positions[0]
+    cache = ObjectiveCache(scenario)
+
+    expected = vpso.objective(scenario, positions, 10.0)
+    assert vpso.objective(scenario, positions, 10.0, cache=cache) == pytest.approx(expected)
+    assert vpso.objective(scenario, positions, 10.0, cache=cache) == pytest.approx(expected)
+    assert [pso.objective(scenario, position.tolist(), 10.0, cache=cache) for position in positions] == \
+        pytest.approx(expected)
+    assert cache.stats()['hits'] >= 20
+
+
+def test_interchangeable_nodes_share_a_key():
+    scenario = duplicated('m4c7n15')
+    sc = scenario.compiled
+    cache = ObjectiveCache(scenario)
+    nodes = next(nodes for nodes in sc.node_classes if len(nodes) > 1)
+
+    other = next(k for k in range(len(sc.node_names)) if k not in nodes)
+
+    position = [nodes[0]] * 2 + [other] * (scenario.conts - 2)
+    swapped = [nodes[1]] * 2 + [other] * (scenario.conts - 2)
+    assert cache.key(pso.counts(scenario, position)) == cache.key(pso.counts(scenario, swapped))
+    assert cache.key(pso.counts(scenario, position)) != cache.key(pso.counts(scenario, [other] * scenario.conts))
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = ObjectiveCache(load('m4c7n15'), maxsize=2)
+    cache.put(b'a', (0, 1.0))
+    cache.put(b'b', (0, 2.0))
+    cache.get(b'a')
+    cache.put(b'c', (0, 3.0))
+
+    assert len(cache) == 2 and cache.get(b'b') is None and cache.get(b'a') == (0, 1.0)
+
+
+def test_fork_and_merge():
+    scenario = load('m4c7n15')
+    cache = ObjectiveCache(scenario)
+    cache.put(b'a', (0, 1.0))
+
+    fork = cache.fork()
+    assert fork.get(b'a') == (0, 1.0)
+    fork.put(b'b', (0, 2.0))
+
+    assert cache.merge(fork) == {b'b': (0, 2.0)}
+    assert cache.get(b'b') == (0, 2.0) and cache.merge(fork) == {}
+
+    with pytest.raises(ValueError):
+        cache.merge(ObjectiveCache(load('m9c5n15')))
+
+
+def test_save_and_load():
+    scenario = load('m4c7n15')
+    cache = ObjectiveCache(scenario)
+    vpso.objective(scenario, random_positions(scenario, 5), 10.0, cache=cache)
+
+    buffer = io.BytesIO()
+    cache.save(buffer)
+    buffer.seek(0)
+    loaded = ObjectiveCache(scenario)
+    loaded.load(buffer)
+    assert len(loaded) == len(cache)
+
+    buffer.seek(0)
+    other = ObjectiveCache(load('m9c5n15'))
+    other.load(buffer)
+    assert len(other) == 0
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+
+from conftest import load
+from solvers import AggregatedCPSATSolver
+from solvers.portfolio import GRACE, Incumbent, search_pso
+from solvers.registry import make_solver
+
+
+def optimum(scenario):
+    solver = AggregatedCPSATSolver(scenario, workers=1)
+    solver.solve()
+    return solver.solution()
+
+
+def test_portfolio_finds_the_optimum():
+    scenario = load('m4c7n15')
+    solver = make_solver('portfolio', scenario, time_limit=2, workers=1)
+    solver.solve()
+    result = solver.solution()
+
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+    assert result.cost == pytest.approx(optimum(scenario).cost)
+    assert solver.winner in ('cpsat-agg', 'vmpso', 'greedy-ls')
+
+
+def test_portfolio_keeps_its_deadline():
+    scenario = load('m9c5n15')
+    solver = make_solver('portfolio', scenario, time_limit=1, members=('cpsat', 'vmpso'))
+    start = time.perf_counter()
+    solver.solve()
+
+    # members still running at the deadline get the grace period, then they are killed
+    assert time.perf_counter() - start < 1 + GRACE + 0.5
+    assert solver.solution().cost == pytest.approx(scenario.cost(solver.mapping))
+
+
+def test_unknown_member():
+    with pytest.raises(ValueError):
+        make_solver('portfolio', load('m4c7n15'), members=('cpsat', 'simplex'))
+
+
+def test_incumbent_takes_improvements_only():
+    incumbent = Incumbent(2, 3)
+    assert incumbent.get() == (float('inf'), None, -1, 0)
+
+    assert incumbent.offer(np.ones((2, 3), dtype=np.int64), 10.0, 1)
+    assert not incumbent.offer(np.zeros((2, 3), dtype=np.int64), 10.0, 0)
+    assert incumbent.offer(np.full((2, 3), 2, dtype=np.int64), 5.0, 0)
+
+    cost, counts, member, version = incumbent.get()
+    assert (cost, member, version) == (5.0, 0, 2)
+    assert (counts == 2).all()
+    assert [incumbent.improvements.get(timeout=1) for _ in range(2)] == [(10.0, 1), (5.0, 0)]
+
+
+@pytest.mark.parametrize('name', ('pso', 'vpso'))
+def test_pso_members_take_the_shared_incumbent(name):
+    # a placement offered by another member replaces a particle and becomes the swarm's best
+    scenario = load('m4c7n15')
+    best = optimum(scenario)
+    placement = scenario.compiled.counts(best.mapping)
+
+    incumbent = Incumbent(*placement.shape)
+    incumbent.offer(placement, best.cost, 1)
+
+    solver = make_solver(name, scenario, iterations=2, particles=5)
+    search_pso(solver, 0, incumbent)
+    assert solver.solution().cost == pytest.approx(best.cost)
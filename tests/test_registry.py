@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+import pytest
+
+import solvers
+
+from conftest import ROOT, load
+from solvers.registry import SOLVERS, Param, SolverSpec, make_solver, members, parse
+
+
+def test_parse():
+    assert parse(['particles=10', 'inertia=0.5', 'repair=yes', 'members=cpsat,greedy', 'boundary-handling=reflecting']) == \
+        {'particles': 10, 'inertia': 0.5, 'repair': True, 'members': ('cpsat', 'greedy'),
+         'boundary_handling': 'reflecting'}
+
+    for assignments in (['particles'], ['speed=1'], ['cache=1'], ['repair=maybe'], ['particles=many']):
+        with pytest.raises(ValueError):
+            parse(assignments)
+
+
+def test_param():
+    assert Param(False).parse('off') is False
+    assert Param(None, float).parse('1.5') == 1.5
+    assert Param('a', choices=('a', 'b')).check('x', 'b') == 'b'
+    with pytest.raises(ValueError):
+        Param('a', choices=('a', 'b')).check('x', 'c')
+
+
+def test_make_solver():
+    scenario = load('m4c7n15')
+    solver = make_solver('vmpso', scenario, time_limit=1, iterations=7, canonical=True)
+    assert isinstance(solver, solvers.VectorizedPSOSolver)
+    assert solver.iterations == 7 and solver.symmetry and solver.stopping.time_limit == 1
+
+    # parameters of other solvers are accepted and ignored
+    assert isinstance(make_solver('greedy', scenario, particles=7), solvers.GreedySolver)
+
+    with pytest.raises(ValueError):
+        make_solver('simplex', scenario)
+    with pytest.raises(ValueError):
+        make_solver('pso', scenario, speed=1)
+    with pytest.raises(ValueError):
+        make_solver('pso', scenario, boundary_handling='wrapping')
+    with pytest.raises(ValueError):
+        make_solver('decomp', scenario, subsolver='portfolio')
+
+
+def test_spec_loads_its_class_on_demand():
+    spec = SolverSpec('custom', 'solvers.greedy:GreedySolver', params={'fit': Param('first')}, fixed={'search': True})
+    assert spec.load() is solvers.GreedySolver
+    assert spec.settings({}) == {'search': True, 'fit': 'first'}
+    assert spec.settings({'fit': 'best'}) == {'search': True, 'fit': 'best'}
+
+
+def test_every_builtin_solver_loads():
+    for name, spec in SOLVERS.items():
+        assert isinstance(spec.load(), type), name
+    assert 'portfolio' not in members()
+
+
+def test_solvers_are_imported_lazily():
+    code = 'import sys, solvers.registry, solvers; print(sorted(m for m in sys.modules if m.startswith(("ortools", "solvers."))))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "['solvers.registry']"
+
+    with pytest.raises(AttributeError):
+        solvers.SimplexSolver
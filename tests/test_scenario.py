@@ -0,0 +1,56 @@
+import glob
+import os
+
+import pytest
+
+from conftest import SAMPLES, SCENARIOS
+from model import Scenario
+
+
+def read(path, cache=None):
+    with open(path, 'rb') as f:
+        return Scenario(f, cache)
+
+
+def same(a, b):
+    return a.compiled.fingerprint() == b.compiled.fingerprint() and a.to_dict() == b.to_dict() and \
+        a.nodes_tpl == b.nodes_tpl and a.micros_tpl == b.micros_tpl
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_cached_scenario_matches_yaml(name, tmp_path):
+    path = os.path.join(SCENARIOS, f'{name}.yaml')
+    scenario = read(path)
+
+    assert same(read(path, tmp_path), scenario)
+    assert len(glob.glob(str(tmp_path / '*.npz'))) == 1
+    assert same(read(path, tmp_path), scenario)
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = os.path.join(SCENARIOS, 'm4c7n15.yaml')
+    scenario = read(path, tmp_path)
+    entry, = glob.glob(str(tmp_path / '*.npz'))
+    with open(entry, 'wb') as f:
+        f.write(b'PK\x03\x04 not an archive')
+
+    assert same(read(path, tmp_path), scenario)
+
+
+def test_changed_scenario_gets_a_new_entry(tmp_path):
+    with open(os.path.join(SCENARIOS, '2_two_services.yaml')) as f:
+        text = f.read()
+    (tmp_path / 'a.yaml').write_text(text)
+    (tmp_path / 'b.yaml').write_text(text.replace('containers: 3', 'containers: 4'))
+
+    a, b = read(tmp_path / 'a.yaml', tmp_path / 'cache'), read(tmp_path / 'b.yaml', tmp_path / 'cache')
+    assert a.micros['API'].containers == 3 and b.micros['API'].containers == 4
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+
+
+def test_compiled_scenario_files(tmp_path):
+    scenario = read(os.path.join(SCENARIOS, 'm9c5n15.yaml'))
+    with open(tmp_path / 'm9c5n15.npz', 'wb') as f:
+        scenario.compiled.save(f)
+
+    assert same(read(tmp_path / 'm9c5n15.npz'), scenario)
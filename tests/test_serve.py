@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from conftest import SCENARIOS, load
+from serve import PlacementService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = PlacementService(jobs=1, limit=2, state=str(tmp_path))
+    yield service
+    service.shutdown()
+
+
+def registered(service, name='m4c7n15'):
+    return service.register({'path': os.path.join(SCENARIOS, f'{name}.yaml')})['id']
+
+
+def test_register_is_idempotent(service):
+    key = registered(service)
+    assert registered(service) == key
+    assert service.info()['scenarios'] == [key]
+
+    service.unregister(key)
+    assert service.info()['scenarios'] == []
+
+
+@pytest.mark.parametrize('solver, options', [
+    ('greedy', {}),
+    ('ipso', {'islands': 2, 'particles': 10}),
+    ('decomp', {'parts': 2}),
+    ('portfolio', {}),
+])
+def test_solvers_with_and_without_processes(service, solver, options):
+    key = registered(service)
+    status, result = service.solve({'scenario': key, 'solver': solver, 'time_limit': 1, 'workers': 1,
+                                    'options': options, 'seed': 0})
+
+    assert status == 200 and result['status'] == 'solved', result.get('error')
+    scenario = load('m4c7n15')
+    assert scenario.compiled.violations(scenario.compiled.counts(result['mapping'])) == []
+    assert result['cost'] == pytest.approx(scenario.cost(result['mapping']))
+
+
+def test_warm_start_uses_the_last_placement(service):
+    key = registered(service)
+    _, first = service.solve({'scenario': key, 'solver': 'greedy'})
+    _, second = service.solve({'scenario': key, 'solver': 'greedy', 'warm_start': True})
+    assert second['moved'] == 0 and second['cost'] <= first['cost'] + 1e-9
+
+
+def test_missed_deadline_restarts_the_worker(service):
+    key = registered(service)
+    status, result = service.solve({'scenario': key, 'solver': 'cpsat', 'deadline': 0})
+    assert status in (200, 504)
+    assert result['status'] == 'deadline_exceeded'
+
+    # the service keeps answering
+    status, result = service.solve({'scenario': key, 'solver': 'greedy'})
+    assert status == 200 and result['status'] == 'solved'
+
+
+def test_unknown_solver(service):
+    with pytest.raises(ValueError):
+        service.solve({'scenario': registered(service), 'solver': 'simplex'})
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from ortools.sat.python import cp_model
+
+from conftest import duplicated, load, random_positions
+from solvers import AggregatedCPSATSolver, CPSATSolver, pso, vpso
+from solvers.cpsat import ordered
+
+
+def test_node_classes():
+    scenario = duplicated('3_two_nodes')
+    sc = scenario.compiled
+    assert len(sc.node_classes) == len(load('3_two_nodes').nodes)
+    for nodes in sc.node_classes:
+        attributes = {(sc.cost[k], sc.cpulim[k], sc.memlim[k], sc.contlim[k], sc.zone[k]) for k in nodes}
+        assert len(nodes) == 3 and len(attributes) == 1
+    assert scenario.node_classes[0] == ('nano-0', 'nano-1', 'nano-2')
+
+
+@pytest.mark.parametrize('name', ('m4c7n15', 'm5c4n40'))
+def test_canonical_positions_keep_the_objective(name):
+    scenario = load(name)
+    positions = random_positions(scenario, 20)
+    canonical = vpso.canonical(scenario, positions)
+
+    for position, relabeled in zip(positions.tolist(), canonical.tolist()):
+        assert relabeled == pso.canonical(scenario, position)
+        assert pso.objective(scenario, relabeled, 10.0) == pytest.approx(pso.objective(scenario, position, 10.0))
+        assert pso.canonical(scenario, relabeled) == relabeled
+
+
+def test_ordered_counts_keep_the_cost():
+    scenario = duplicated('m4c7n15', 2)
+    sc = scenario.compiled
+    for position in random_positions(scenario, 10).tolist():
+        counts = pso.counts(scenario, position)
+        assert sc.cost_of(ordered(sc, counts)) == pytest.approx(sc.cost_of(counts))
+
+
+@pytest.mark.parametrize('solver_class', (CPSATSolver, AggregatedCPSATSolver))
+@pytest.mark.parametrize('name', ('2_two_services', '4_datarate'))
+def test_symmetry_breaking_keeps_the_optimum(solver_class, name):
+    scenario = duplicated(name)
+    objectives = []
+    for symmetry in (True, False):
+        solver = solver_class(scenario, workers=1, symmetry=symmetry)
+        solver.solve()
+        assert solver.status == cp_model.OPTIMAL
+        objectives.append(solver.solution().objective)
+    assert objectives[0] == pytest.approx(objectives[1])
+    assert np.isfinite(objectives[0])
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLES, load, random_positions
+from model import PlacementTracker
+from solvers import pso
+
+
+def check(tracker, scenario):
+    # the tracked costs, feasibility and mapping agree with a full recompute of the placed containers
+    sc = scenario.compiled
+    counts = np.zeros((len(sc.node_names), len(sc.micro_names)), dtype=np.int64)
+    for c, k in enumerate(tracker.position):
+        if k >= 0:
+            counts[k, sc.cont_micro[c]] += 1
+
+    assert tracker.cost == pytest.approx(sc.cost_of(counts))
+    assert tracker.feasible == (pso.overflow(sc, *sc.usage(counts)) == 0)
+    assert (sc.counts(tracker.mapping()) == counts).all()
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_moves_and_swaps_match_recompute(name):
+    scenario = load(name)
+    n_len = len(scenario.nodes)
+
+    tracker = PlacementTracker(scenario, random_positions(scenario, 1)[0].tolist())
+    for step in range(300):
+        if random.random() < 0.5:
+            tracker.move(random.randrange(scenario.conts), random.randrange(n_len))
+        else:
+            tracker.swap(random.randrange(scenario.conts), random.randrange(scenario.conts))
+        if step % 10 == 0:
+            check(tracker, scenario)
+
+
+def test_places_unplaced_containers():
+    scenario = load('m4c7n15')
+    tracker = PlacementTracker(scenario, [-1] * scenario.conts)
+    assert tracker.cost == 0
+
+    for c, k in enumerate(random_positions(scenario, 1)[0].tolist()):
+        tracker.move(c, k)
+    check(tracker, scenario)
+
+
+def test_swap_with_unplaced_container():
+    scenario = load('m4c7n15')
+    position = random_positions(scenario, 1)[0].tolist()
+    position[0] = -1
+    tracker = PlacementTracker(scenario, position)
+
+    tracker.swap(0, 1)
+    assert tracker.position[:2] == [position[1], -1]
+    check(tracker, scenario)
+
+    tracker.move(0, -1)
+    assert tracker.position[:2] == [-1, -1]
+    check(tracker, scenario)
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from conftest import SCENARIOS
+from model.profiles import DEFAULT_PSO, load_profile, save_profile
+from tune import SPACE, Race, candidates, run
+
+
+def text(name):
+    with open(os.path.join(SCENARIOS, f'{name}.yaml')) as f:
+        return f.read()
+
+
+def test_candidates_include_the_default_profile():
+    configs = candidates(8)
+    assert len(configs) == 8 and configs[0] == DEFAULT_PSO
+    for config in configs[1:]:
+        assert set(config) == set(SPACE)
+        for name, values in SPACE.items():
+            if isinstance(values[0], float):
+                assert values[0] <= config[name] <= values[1]
+            else:
+                assert config[name] in values
+
+
+def test_run_spends_its_budget_on_restarts():
+    cost, elapsed, restarts = run(DEFAULT_PSO | {'iterations': 5, 'particles': 5}, 'vmpso', 'm4c7n15',
+                                  text('m4c7n15'), 0, 0.5)
+    assert cost < float('inf')
+    assert restarts > 1
+    assert 0.5 <= elapsed < 1.0
+
+
+def test_race_keeps_the_best_configurations():
+    # three configurations, two after the first round and the winner after the second
+    configs = [DEFAULT_PSO | {'iterations': 5, 'particles': 5},
+               DEFAULT_PSO | {'iterations': 1, 'particles': 1},
+               DEFAULT_PSO | {'iterations': 5, 'particles': 5, 'inertia': 0.4}]
+    race = Race(configs, 'vmpso', {'m4c7n15': text('m4c7n15')}, budget=0.1, eta=2, jobs=1)
+    alive = race.run(3)
+
+    assert len(alive) == 1
+    report = race.report(alive)
+    assert report[0]['runs'] == 3 and report[0]['score'] >= 1.0
+    assert race.score(alive[0]) == min(race.score(c) for c in range(len(configs)))
+
+
+def test_profiles(tmp_path):
+    path = str(tmp_path / 'profiles.yaml')
+    assert load_profile('default', path) == DEFAULT_PSO
+    with pytest.raises(ValueError):
+        load_profile('tuned', path)
+
+    save_profile('tuned', {'particles': 80}, path)
+    save_profile('other', {'inertia': 0.5}, path)
+    assert load_profile('tuned', path) == DEFAULT_PSO | {'particles': 80}
+    assert load_profile('other', path) == DEFAULT_PSO | {'inertia': 0.5}
+
+    save_profile('broken', {'speed': 1}, path)
+    with pytest.raises(ValueError):
+        load_profile('broken', path)
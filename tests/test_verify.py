@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from conftest import ROOT, SCENARIOS, load
+from solvers.registry import make_solver
+from verify import verify
+
+
+TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope='module')
+def solved():
+    scenario = load('m4c7n15')
+    solver = make_solver('greedy', scenario)
+    solver.solve()
+    return scenario, solver.solution().to_dict()
+
+
+def test_accepts_solver_results(solved):
+    scenario, result = solved
+    problems, cost = verify(scenario, result, TOLERANCE)
+    assert problems == []
+    assert cost == pytest.approx(result['cost'])
+
+
+def test_accepts_bare_mappings(solved):
+    scenario, result = solved
+    assert verify(scenario, result['mapping'], TOLERANCE)[0] == []
+
+
+def test_accepts_objective_other_than_cost(solved):
+    # the solver objective may weigh costs differently, only the cost has to match
+    scenario, result = solved
+    assert verify(scenario, result | {'objective': result['cost'] * 2}, TOLERANCE)[0] == []
+
+
+def test_rejects_missing_containers(solved):
+    scenario, result = solved
+    mapping = json.loads(json.dumps(result['mapping']))
+    n = next(iter(mapping))
+    m = next(iter(mapping[n]))
+    mapping[n][m] -= 1
+
+    problems, _ = verify(scenario, mapping, TOLERANCE)
+    assert len(problems) == 1 and f'microservice "{m}"' in problems[0]
+
+
+def test_rejects_overflowing_nodes(solved):
+    scenario, _ = solved
+    n = next(iter(scenario.nodes))
+    mapping = {n: {m: micro.containers for m, micro in scenario.micros.items()}}
+
+    problems, _ = verify(scenario, mapping, TOLERANCE)
+    assert problems and all(f'node "{n}" exceeds' in problem for problem in problems)
+
+
+def test_rejects_unknown_names(solved):
+    scenario, _ = solved
+    problems, cost = verify(scenario, {'nowhere': {'nothing': 1}}, TOLERANCE)
+    assert problems == ['unknown node "nowhere"', 'unknown microservice "nothing"'] and cost is None
+
+    problems, cost = verify(scenario, {'mapping': {'node': 1}}, TOLERANCE)
+    assert problems == ['not a {node: {microservice: containers}} mapping'] and cost is None
+
+
+def test_rejects_wrong_cost(solved):
+    scenario, result = solved
+    problems, _ = verify(scenario, result | {'cost': result['cost'] + 1}, TOLERANCE)
+    assert len(problems) == 1 and 'reported cost' in problems[0]
+
+    breakdown = result['breakdown'] | {'data': result['breakdown']['data'] + 1}
+    problems, _ = verify(scenario, result | {'breakdown': breakdown}, TOLERANCE)
+    assert len(problems) == 1 and 'breakdown' in problems[0]
+
+
+def test_exit_status_of_batch_output(solved, tmp_path):
+    _, result = solved
+    scenario = os.path.join(SCENARIOS, 'm4c7n15.yaml')
+    lines = [result | {'scenario': scenario},
+             {'scenario': scenario, 'status': 'no_solution', 'mapping': None},
+             result | {'scenario': scenario, 'cost': result['cost'] + 1}]
+
+    def run(lines):
+        with open(tmp_path / 'results.jsonl', 'w') as f:
+            f.writelines(json.dumps(line) + '\n' for line in lines)
+        return subprocess.run([sys.executable, os.path.join(ROOT, 'verify.py'), '--format', 'jsonl',
+                               str(tmp_path / 'results.jsonl')], capture_output=True, text=True)
+
+    process = run(lines[:2])
+    assert process.returncode == 0
+    assert [json.loads(line)['valid'] for line in process.stdout.splitlines()] == [True]
+
+    process = run(lines)
+    assert process.returncode == 1
+    assert [json.loads(line)['valid'] for line in process.stdout.splitlines()] == [True, False]
+
+
+def test_result_recomputes_the_cost():
+    # the count-weighted CP-SAT objective is reported apart from the scenario cost
+    scenario = load('m4c7n15')
+    solver = make_solver('cpsat-agg', scenario, workers=1)
+    solver.solve()
+    result = solver.solution()
+
+    assert result.cost == pytest.approx(scenario.cost(result.mapping))
+    assert result.cost == pytest.approx(result.infra_cost + result.data_cost)
+    assert sum(node['containers'] for node in result.nodes.values()) == scenario.conts
+    assert yaml.safe_load(result.to_yaml()) == json.loads(result.to_json())
+    assert verify(scenario, json.loads(result.to_json()), TOLERANCE)[0] == []
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from conftest import SAMPLES, load, random_positions
+from solvers import pso, vpso
+from solvers.registry import make_solver
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+@pytest.mark.parametrize('penalty', (None, 10.0))
+def test_objective_matches_pso_objective(name, penalty):
+    scenario = load(name)
+    positions = random_positions(scenario, 30)
+    # a feasible placement too, so that not every value is a penalty
+    positions[0] = pso.repair(scenario, positions[0].tolist())
+
+    expected = [pso.objective(scenario, position.tolist(), penalty) for position in positions]
+    assert vpso.objective(scenario, positions, penalty) == pytest.approx(expected)
+    assert np.isfinite(expected[0])
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+def test_objective_with_migration_budget(name):
+    scenario = load(name)
+    positions = random_positions(scenario, 10)
+    initial = pso.counts(scenario, positions[0].tolist())
+
+    expected = [pso.objective(scenario, position.tolist(), 10.0, initial, 2) for position in positions]
+    assert vpso.objective(scenario, positions, 10.0, initial, 2) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('solver_name', ('vpso', 'vmpso'))
+def test_solution_is_valid(solver_name):
+    scenario = load('m4c7n15')
+    solver = make_solver(solver_name, scenario, iterations=20)
+    solver.solve()
+    result = solver.solution()
+
+    assert scenario.compiled.violations(scenario.compiled.counts(result.mapping)) == []
+    assert result.cost == pytest.approx(solver.cost)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from conftest import load
+from model.warmstart import displaced, initial_counts, initial_position, moved
+from solvers import pso
+from solvers.registry import make_solver
+
+
+@pytest.fixture(scope='module')
+def placed():
+    # m4c7n15 with a greedy placement as the running cluster
+    scenario = load('m4c7n15')
+    solver = make_solver('greedy', scenario)
+    solver.solve()
+    result = solver.solution()
+    return scenario, result.mapping, initial_counts(scenario, result.mapping), result.cost
+
+
+def test_initial_counts(placed):
+    scenario, mapping, counts, _ = placed
+    assert (counts == scenario.compiled.counts(mapping)).all()
+    assert displaced(scenario, mapping, counts) == 0
+
+    position = initial_position(scenario, counts)
+    assert (pso.counts(scenario, position) == counts).all()
+
+
+def test_nodes_missing_from_the_scenario(placed):
+    scenario, mapping, _, _ = placed
+    n = max(mapping, key=lambda n: sum(mapping[n].values()))
+    drained = scenario.perturbed(remove_nodes=[n])
+    counts = initial_counts(drained, mapping)
+
+    assert displaced(drained, mapping, counts) == sum(mapping[n].values())
+    assert initial_position(drained, counts).count(-1) == sum(mapping[n].values())
+
+
+def test_scaled_down_microservices_are_trimmed(placed):
+    scenario, mapping, _, _ = placed
+    m = max(scenario.micros, key=lambda m: scenario.micros[m].containers)
+    scaled = scenario.perturbed(containers={m: 1})
+    counts = initial_counts(scaled, mapping)
+
+    assert (counts.sum(axis=0) <= scaled.compiled.containers).all()
+    assert counts[:, scaled.compiled.micro_index[m]].sum() == 1
+    assert displaced(scaled, mapping, counts) == 0
+
+
+def test_only_part_of_the_swarm_is_seeded(placed):
+    scenario, _, counts, _ = placed
+    positions = pso.warm_positions(scenario, counts, 20)
+
+    assert len(positions) == round(20 * pso.WARM_SHARE)
+    assert (pso.counts(scenario, positions[0]) == counts).all()
+    assert all(pso.objective(scenario, position) < float('inf') for position in positions)
+
+
+@pytest.mark.parametrize('solver_name', ('pso', 'vpso', 'vmpso', 'greedy-ls', 'cpsat-agg'))
+def test_warm_start_is_never_worse(placed, solver_name):
+    scenario, _, counts, cost = placed
+    solver = make_solver(solver_name, scenario, time_limit=1, initial=counts,
+                         **({'iterations': 10} if 'pso' in solver_name else {}))
+    solver.solve()
+    assert solver.solution().cost <= cost + 1e-9
+
+
+@pytest.mark.parametrize('solver_name', ('pso', 'vmpso', 'cpsat-agg'))
+@pytest.mark.parametrize('budget', (0, 3))
+def test_migration_budget(placed, solver_name, budget):
+    scenario, _, counts, _ = placed
+    solver = make_solver(solver_name, scenario, time_limit=1, initial=counts, budget=budget,
+                         **({'iterations': 10} if 'pso' in solver_name else {}))
+    solver.solve()
+    result = scenario.compiled.counts(solver.solution().mapping)
+    assert moved(counts, result) <= budget
+    assert not np.any(result < 0)
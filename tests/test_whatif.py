@@ -0,0 +1,56 @@
+import pytest
+
+from ortools.sat.python import cp_model
+
+from conftest import load
+from model import NoSolutionError
+from solvers import AggregatedCPSATSolver
+from solvers.whatif import WhatIfAnalysis, perturbations
+
+
+def fresh(scenario, perturbation):
+    # the perturbed scenario solved from scratch
+    scenario = scenario.perturbed(perturbation.remove_nodes, perturbation.containers, perturbation.capacity)
+    solver = AggregatedCPSATSolver(scenario, workers=1)
+    solver.solve()
+    return solver.status == cp_model.OPTIMAL, solver.solution().cost
+
+
+@pytest.mark.parametrize('name', ('m4c7n15', 'm4c8n14'))
+def test_whatif_matches_fresh_solves(name):
+    scenario = load(name)
+    nodes = list(scenario.nodes)
+    micros = list(scenario.micros)
+    cases = perturbations(scenario, zones=True, specs=[
+        f'node:{nodes[0]}', f'node:{nodes[-1]}',
+        f'capacity:{nodes[1]}:0.5',
+        f'scale:{micros[0]}:{scenario.micros[micros[0]].containers + 2}',
+        f'scale:{micros[-1]}:1'])
+
+    rows = WhatIfAnalysis(scenario, AggregatedCPSATSolver, workers=1, processes=2).run(cases)
+    assert [row['perturbation'] for row in rows] == ['baseline'] + [p.name for p in cases]
+
+    for perturbation, row in zip(cases, rows[1:]):
+        if row['status'] == 'infeasible':
+            with pytest.raises(NoSolutionError):
+                fresh(scenario, perturbation)
+            continue
+
+        assert row['status'] in ('optimal', 'unaffected'), perturbation.name
+        optimal, cost = fresh(scenario, perturbation)
+        assert optimal
+        assert row['cost'] == pytest.approx(cost), perturbation.name
+        assert row['delta'] == pytest.approx(cost - rows[0]['cost'])
+
+
+def test_whatif_reports_moved_containers():
+    scenario = load('m4c7n15')
+    cases = perturbations(scenario, nodes=True)
+    rows = WhatIfAnalysis(scenario, AggregatedCPSATSolver, workers=1, processes=2).run(cases)
+
+    assert rows[0]['moved'] == 0
+    for row in rows[1:]:
+        if row['status'] == 'unaffected':
+            assert row['moved'] == 0 and row['delta'] == 0
+        else:
+            assert row['moved'] > 0
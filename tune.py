@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark import shipped
+from model import Scenario, NoSolutionError
+from model.profiles import PROFILES, DEFAULT_PSO, save_profile
+from solvers.registry import make_solver
+
+
+# values every candidate configuration draws its PSO settings from
+SPACE = {
+    'particles': (10, 20, 30, 50, 80),
+    'iterations': (50, 100, 200, 400),
+    'inertia': (0.4, 0.95),
+    'cognitive': (0.5, 2.5),
+    'social': (0.5, 2.5),
+    'boundary_handling': ('absorbing', 'reflecting')
+}
+
+# scenarios every worker process keeps compiled between runs
+_scenarios = {}
+
+
+def candidates(num):
+    # the default profile always takes part, so the winner is never worse on the tuning set
+    result = [dict(DEFAULT_PSO)]
+    while len(result) < num:
+        config = {}
+        for name, values in SPACE.items():
+            if isinstance(values[0], float):
+                config[name] = round(random.uniform(*values), 2)
+            else:
+                config[name] = random.choice(values)
+        result.append(config)
+    return result
+
+
+def run(config, solver_name, name, text, seed, budget):
+    # the configuration restarts with new seeds until the wall-clock budget is spent, so a fast one
+    # makes up for worse single runs with more of them
+    random.seed(seed)
+    if name not in _scenarios:
+        _scenarios[name] = Scenario(io.StringIO(text))
+
+    best, restarts = float('inf'), 0
+    start = time.perf_counter()
+    while restarts == 0 or (remaining := budget - (time.perf_counter() - start)) > 0:
+        solver = make_solver(solver_name, _scenarios[name], remaining if restarts else budget, **config)
+        solver.solve()
+        restarts += 1
+        try:
+            solver.solution()
+            best = min(best, solver.cost)
+        except NoSolutionError:
+            pass
+
+    return best, time.perf_counter() - start, restarts
+
+
+class Race:
+    def __init__(self, configs, solver_name, scenarios, budget, eta, jobs):
+        self.configs = configs
+        self.solver_name = solver_name
+        self.scenarios = scenarios
+        self.budget = budget
+        self.eta = eta
+        self.jobs = jobs
+
+        self.results = [[] for _ in configs]  # (scenario, best cost, restarts) of every run
+        self.best = {}  # scenario -> lowest cost of any run, the reference of the scores
+
+    def run(self, rounds):
+        # successive halving: every round runs the survivors once more on each scenario with a new seed,
+        # then only the best 1/eta of them go on
+        alive = list(range(len(self.configs)))
+
+        with ProcessPoolExecutor(self.jobs) as pool:
+            for r in range(rounds):
+                seed = random.getrandbits(32)
+                runs = [(c, name) for c in alive for name in self.scenarios]
+                futures = [pool.submit(run, self.configs[c], self.solver_name, name, self.scenarios[name],
+                                       seed, self.budget) for c, name in runs]
+
+                for (c, name), future in zip(runs, futures):
+                    cost, elapsed, restarts = future.result()
+                    self.results[c].append((name, cost, restarts))
+                    self.best[name] = min(self.best.get(name, float('inf')), cost)
+
+                alive = sorted(alive, key=self.score)
+                logging.info(f'Round {r + 1}: {len(alive)} configurations, best score {self.score(alive[0])[1]:.4f}')
+                if len(alive) == 1 or r == rounds - 1:
+                    break
+                alive = alive[:max(1, math.ceil(len(alive) / self.eta))]
+
+        return alive
+
+    def relative(self, name, cost):
+        # scenarios no configuration solves, or solves at no cost, do not tell configurations apart
+        if self.best[name] in (0, float('inf')):
+            return 1.0
+        return cost / self.best[name]
+
+    def score(self, c):
+        # configurations that ran more rounds come first, then by the mean cost within the budget
+        # relative to the best known cost of each scenario
+        runs = self.results[c]
+        return -len(runs), sum(self.relative(name, cost) for name, cost, _ in runs) / len(runs)
+
+    def report(self, ranking):
+        return [{'config': self.configs[c],
+                 'runs': len(self.results[c]),
+                 'score': self.score(c)[1],
+                 'restarts': sum(restarts for _, _, restarts in self.results[c]) / len(self.results[c])}
+                for c in ranking]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune PSO settings by racing configurations on scenarios.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('-o', '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='ranking of the configurations as JSON')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='random number generator seed')
+    parser.add_argument('--solver',
+                        choices=('pso', 'mpso', 'vpso', 'vmpso'),
+                        default='vmpso',
+                        help='PSO variant to tune')
+    parser.add_argument('--scenarios',
+                        default='scenarios',
+                        help='directory with the scenarios to tune on')
+    parser.add_argument('-n', '--candidates',
+                        type=int,
+                        default=16,
+                        help='number of configurations, the default profile included')
+    parser.add_argument('--budget',
+                        type=float,
+                        default=1.0,
+                        help='wall-clock seconds of every configuration on every scenario')
+    parser.add_argument('--eta',
+                        type=float,
+                        default=2,
+                        help='fraction of configurations dropped after every round is 1 - 1/ETA')
+    parser.add_argument('--rounds',
+                        type=int,
+                        help='maximum number of rounds (default: until one configuration is left)')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='number of runs in parallel')
+    parser.add_argument('--profile',
+                        default='tuned',
+                        help='name the winning settings are saved under')
+    parser.add_argument('--profiles',
+                        metavar='FILE',
+                        default=PROFILES,
+                        help='file with PSO profiles')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    random.seed(args.seed)
+
+    scenarios = dict(shipped(args.scenarios))
+    if not scenarios:
+        parser.error(f'no scenarios in {args.scenarios}')
+
+    configs = candidates(args.candidates)
+    rounds = args.rounds or max(1, math.ceil(math.log(len(configs), args.eta)))
+
+    race = Race(configs, args.solver, scenarios, args.budget, args.eta, args.jobs)
+    ranking = race.run(rounds)
+    # eliminated configurations follow the survivors, each group in its own order
+    ranking += sorted((c for c in range(len(configs)) if c not in ranking), key=race.score)
+
+    save_profile(args.profile, configs[ranking[0]], args.profiles)
+    logging.info(f'Saved profile "{args.profile}" to {args.profiles}')
+
+    json.dump(race.report(ranking), args.output, indent=2)
+    print(file=args.output)
+
+
+if __name__ == '__main__':
+    main()
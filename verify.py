@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import sys
+
+import numpy as np
+
+from yaml import load
+
+from model import Scenario
+from model.scenario import SafeLoader
+
+
+def placements(inputs, scenario):
+    # JSONL lines carry their own scenario, e.g. batch.py output; other files are YAML/JSON placements
+    for path in inputs:
+        with open(path) as f:
+            if path.endswith('.jsonl'):
+                for number, line in enumerate(filter(str.strip, f), 1):
+                    data = json.loads(line)
+                    yield f'{path}:{number}', data.get('scenario', scenario), data
+            else:
+                yield path, scenario, load(f, Loader=SafeLoader) or {}
+
+
+def verify(scenario, data, tolerance):
+    # problems of one placement, checked on the whole node x microservice count matrix at once
+    sc = scenario.compiled
+    mapping = data.get('mapping', data)
+    if not all(isinstance(micros, dict) for micros in mapping.values()):
+        return ['not a {node: {microservice: containers}} mapping'], None
+
+    unknown = [f'unknown node "{n}"' for n in mapping if n not in sc.node_index] + \
+              [f'unknown microservice "{m}"' for n in mapping for m in mapping[n] if m not in sc.micro_index]
+    if unknown:
+        return list(dict.fromkeys(unknown)), None
+
+    counts = sc.counts(mapping)
+    problems = sc.violations(counts)
+    infra_cost, data_cost = sc.cost_breakdown(counts)
+
+    # reported costs and breakdowns use the same cost model, solver objectives are reported apart
+    reported = data.get('breakdown')
+    if reported is not None and not np.allclose([reported['infrastructure'], reported['data']],
+                                                [infra_cost, data_cost], rtol=tolerance, atol=tolerance):
+        problems.append(f'reported cost breakdown {reported} differs from the recomputed '
+                        f'infrastructure {infra_cost:.2f} and data {data_cost:.2f}')
+    reported = data.get('cost')
+    if reported is not None and not np.isclose(reported, infra_cost + data_cost, rtol=tolerance, atol=tolerance):
+        problems.append(f'reported cost {reported:.2f} differs from the recomputed {infra_cost + data_cost:.2f}')
+
+    return problems, infra_cost + data_cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check node-container placements against their scenarios.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('-o', '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='output file')
+    parser.add_argument('--format',
+                        choices=('text', 'jsonl'),
+                        default='text',
+                        help='report format')
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=1e-6,
+                        help='allowed difference between reported and recomputed costs')
+    parser.add_argument('--cache',
+                        metavar='DIR',
+                        help='directory for compiled scenarios, reused across runs')
+    parser.add_argument('-s', '--scenario',
+                        help='scenario of placements that do not name one')
+    parser.add_argument('inputs',
+                        nargs='+',
+                        help='placement YAML/JSON files, results of place.py or batch.py JSONL output')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    scenarios = {}
+    invalid = 0
+
+    for name, path, data in placements(args.inputs, args.scenario):
+        if not isinstance(data, dict):
+            data = {'mapping': {'': data}}
+        if data.get('status', 'solved') != 'solved':
+            continue
+        if path is None:
+            parser.error(f'{name} does not name a scenario, use --scenario')
+
+        if path not in scenarios:
+            with open(path, 'rb') as f:
+                scenarios[path] = Scenario(f, args.cache)
+
+        problems, cost = verify(scenarios[path], data, args.tolerance)
+        invalid += bool(problems)
+
+        if args.format == 'jsonl':
+            print(json.dumps({'placement': name, 'scenario': path, 'valid': not problems,
+                              'cost': cost, 'problems': problems}), file=args.output)
+        elif problems:
+            print(f'{name}: INVALID', *(f'  - {problem}' for problem in problems), sep='\n', file=args.output)
+        else:
+            print(f'{name}: OK, cost {cost:.2f}', file=args.output)
+
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import logging
+import random
+import sys
+
+from model import Scenario, tracer
+from solvers import CPSATSolver, AggregatedCPSATSolver
+from solvers.whatif import WhatIfAnalysis, perturbations
+
+
+SOLVERS = {
+    'cpsat': CPSATSolver,
+    'cpsat-agg': AggregatedCPSATSolver
+}
+
+COLUMNS = ('perturbation', 'status', 'cost', 'delta', 'moved', 'time')
+
+
+def table(rows):
+    def cell(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.2f}'
+        return str(value)
+
+    cells = [COLUMNS] + [tuple(cell(row[column]) for column in COLUMNS) for row in rows]
+    widths = [max(len(line[c]) for line in cells) for c in range(len(COLUMNS))]
+    return '\n'.join('  '.join(value.ljust(width) if c == 0 else value.rjust(width)
+                               for c, (value, width) in enumerate(zip(line, widths))) for line in cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost of node-container placement under node failures and changes.')
+    parser.add_argument('--log-file',
+                        type=argparse.FileType('a'),
+                        default=sys.stderr,
+                        help='log file')
+    parser.add_argument('--log-level',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                        default='WARNING',
+                        help='logging level')
+    parser.add_argument('-o', '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='output file')
+    parser.add_argument('--format',
+                        choices=('text', 'csv', 'json'),
+                        default='text',
+                        help='table format')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='random number generator seed')
+    parser.add_argument('--solver',
+                        choices=tuple(SOLVERS),
+                        default='cpsat-agg',
+                        help='CP-SAT model shared by all perturbations')
+    parser.add_argument('--time-limit',
+                        type=float,
+                        help='wall-clock limit for every perturbation in seconds')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='number of parallel search workers per perturbation')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        help='number of perturbations solved in parallel (default: number of CPUs)')
+    parser.add_argument('--no-symmetry-breaking',
+                        dest='symmetry',
+                        action='store_false',
+                        help='do not order interchangeable nodes')
+    parser.add_argument('--nodes',
+                        action='store_true',
+                        help='remove every node in turn (N-1)')
+    parser.add_argument('--zones',
+                        action='store_true',
+                        help='remove every zone in turn')
+    parser.add_argument('--capacity',
+                        type=float,
+                        metavar='FACTOR',
+                        help='scale CPU and memory of every node in turn by FACTOR')
+    parser.add_argument('--scale',
+                        type=float,
+                        metavar='FACTOR',
+                        help='scale containers of every microservice in turn by FACTOR')
+    parser.add_argument('-p', '--perturbation',
+                        action='append',
+                        default=[],
+                        metavar='SPEC',
+                        help='node:NAME, zone:NAME, capacity:NODE:FACTOR or scale:MICROSERVICE:CONTAINERS, repeatable')
+    parser.add_argument('--cache',
+                        metavar='DIR',
+                        help='directory for compiled scenarios, reused across runs')
+    parser.add_argument('--trace',
+                        type=argparse.FileType('w'),
+                        help='write per-phase timings to a JSON file')
+    parser.add_argument('scenario',
+                        type=argparse.FileType('rb'),
+                        help='scenario YAML or compiled file, - for standard input')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    if args.trace:
+        tracer.enable()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=args.log_level,
+                        stream=args.log_file)
+
+    try:
+        with tracer.phase('load'):
+            scenario = Scenario(args.scenario, args.cache)
+
+        try:
+            batch = perturbations(scenario, args.nodes, args.zones, args.capacity, args.scale, args.perturbation)
+        except ValueError as e:
+            parser.error(str(e))
+        if not batch:
+            parser.error('no perturbations, use --nodes, --zones, --capacity, --scale or --perturbation')
+
+        analysis = WhatIfAnalysis(scenario, SOLVERS[args.solver], args.time_limit, args.workers, args.jobs,
+                                  args.symmetry)
+        rows = analysis.run(batch)
+
+        if args.format == 'json':
+            json.dump(rows, args.output, indent=2)
+            print(file=args.output)
+        elif args.format == 'csv':
+            writer = csv.DictWriter(args.output, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            print(table(rows), file=args.output)
+    finally:
+        if args.trace:
+            tracer.export(args.trace)
+
+
+if __name__ == '__main__':
+    main()